@@ -1,42 +1,58 @@
-import sys
-import csv
-import datetime
-
-class excel_semicolon(csv.excel):
-    delimiter = ';'
-
-dataset = sys.argv[1]
-filePath = sys.argv[2]
+import argparse
+import numpy as np
+import pandas as pd
 
 caseIdColName = "Case ID"
 durationColName = "Duration"
+timeStampColName = "Complete Timestamp"
+timeStampFormat = '%Y/%m/%d %H:%M:%S.%f'
 
-writeFilePath = filePath.replace(".csv","_duration.csv")
-print(writeFilePath)
 
-timeStampColName = "Complete Timestamp"
+def _annotate_chunk(chunk, dataset, previousCase, previousTimeStamp):
+    """Durations of the events of one chunk, the last event of the previous chunk is given by previousCase and previousTimeStamp"""
+    if dataset == "bpic2017":
+        # bpic2017 has no start timestamps, its events are annotated with a duration of 0
+        return np.zeros(len(chunk)), previousCase, previousTimeStamp
+    timeStamps = pd.to_datetime(chunk[timeStampColName], format=timeStampFormat).to_numpy()
+    caseIDs = chunk[caseIdColName].to_numpy()
+    # every event gets the time since the event before it, an event that starts a new case 0
+    sameCase = np.concatenate(([caseIDs[0] == previousCase], caseIDs[1:] == caseIDs[:-1]))
+    durations = np.diff(timeStamps, prepend=np.datetime64(previousTimeStamp if previousCase is not None else timeStamps[0]))
+    durations = np.where(sameCase, durations / np.timedelta64(1, "s"), 0.0)
+    return durations, caseIDs[-1], timeStamps[-1]
+
+
+def annotate_duration(filePath, writeFilePath, dataset, chunksize=None):
+    """Writes the event log with a Duration column (seconds since the previous event of the case)
+
+    All other columns are written as they are in the input. With chunksize the log is processed
+    in chunks of that many events, so it does not have to fit in memory.
+    """
+    reader = pd.read_csv(filePath, delimiter=";", dtype=str, keep_default_na=False, chunksize=chunksize)
+    if chunksize is None:
+        reader = [reader]
+    previousCase = None
+    previousTimeStamp = None
+    header = True
+    with open(writeFilePath, 'w', newline='') as writeFile:
+        for chunk in reader:
+            if len(chunk) == 0:
+                continue
+            durations, previousCase, previousTimeStamp = _annotate_chunk(chunk, dataset, previousCase, previousTimeStamp)
+            chunk[durationColName] = [str(duration) for duration in durations.tolist()]
+            chunk.to_csv(writeFile, sep=";", index=False, header=header, lineterminator="\r\n")
+            header = False
+        if header:
+            writeFile.write(";".join(pd.read_csv(filePath, delimiter=";", nrows=0).columns.tolist() + [durationColName]) + "\r\n")
+
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Annotate an event log with the duration of every event")
+    parser.add_argument("dataset")
+    parser.add_argument("filePath")
+    parser.add_argument("--chunksize", type=int, default=None, help="Process the log in chunks of this many events")
+    args = parser.parse_args()
 
-with open(filePath) as csvfile:
-    with open(writeFilePath,'w') as writeFile:
-        reader = csv.DictReader(csvfile,delimiter=";")
-        fieldNamesWrite = reader.fieldnames
-        fieldNamesWrite.append(durationColName)
-        writer = csv.DictWriter(writeFile, fieldnames=fieldNamesWrite,dialect=excel_semicolon)
-        writer.writeheader()
-        currentCase = ""
-        for row in reader:
-            if dataset != "bpic2017":
-                newTimeStamp = datetime.datetime.strptime(row[timeStampColName], '%Y/%m/%d %H:%M:%S.%f')
-                if currentCase != row[caseIdColName]:
-                    currentCase = row[caseIdColName]
-                    duration = 0.0
-                else:
-                    duration = (newTimeStamp - oldTimeStamp).total_seconds()
-                oldTimeStamp = newTimeStamp
-            else:
-                startTimeStamp = datetime.datetime.strptime(row[timeStampColName], '%Y/%m/%d %H:%M:%S.%f')
-                endTimeStamp = datetime.datetime.strptime(row[timeStampColName], '%Y/%m/%d %H:%M:%S.%f')
-                duration = (endTimeStamp - startTimeStamp).total_seconds()
-            row[durationColName] = duration
-            writer.writerow(row)
\ No newline at end of file
+    writeFilePath = args.filePath.replace(".csv","_duration.csv")
+    print(writeFilePath)
+    annotate_duration(args.filePath, writeFilePath, args.dataset, chunksize=args.chunksize)
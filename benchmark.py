@@ -0,0 +1,225 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import traceback
+import numpy as np
+import pandas as pd
+from event_log_loader import load_event_log
+from pretsa import Pretsa
+from pretsa_sweep import ALGORITHMS
+from synthetic_log import generate_synthetic_log
+
+BENCHMARK_VERSION = 1
+
+# PRETSA with differential privacy against the earlier years of the same dataset, like runDiffPretsa.py
+DP_ALGORITHM = "pretsa_dp"
+DP_EPSILON = 0.1
+
+DEFAULT_ALGORITHMS = ["pretsa", "heuristic_pretsa", "pretsa_star", DP_ALGORITHM]
+DEFAULT_POINTS = [(4, 1.0), (16, 0.5)]
+# (variants, trace length) grid of the synthetic scaling curves, all with the same number of cases
+DEFAULT_SYNTHETIC_GRID = [(variants, traceLength) for variants in (10, 50, 200) for traceLength in (5, 10, 20)]
+DEFAULT_SYNTHETIC_CASES = 2000
+# Phases reported by Pretsa.stats() that the benchmark keeps
+PHASES = ["tree_build", "distance_matrix", "pruning", "reassignment", "search", "differential_privacy", "export"]
+
+_yearPattern = re.compile(r"^(?P<dataset>.+)_dataset_(?P<year>\d{4})\.csv$")
+
+
+def find_yearly_logs(root="yearly_logs", datasets=None):
+    """All <dataset>_dataset_<year>.csv logs under root (also in released/), with the logs of the earlier years of the dataset"""
+    logs = []
+    for filePath in sorted(glob.glob(os.path.join(root, "*", "*.csv")) + glob.glob(os.path.join(root, "*", "released", "*.csv"))):
+        match = _yearPattern.match(os.path.basename(filePath))
+        if match and (datasets is None or match.group("dataset") in datasets):
+            logs.append((match.group("dataset"), int(match.group("year")), filePath))
+    logs.sort()
+    return [{"name": "%s_%d" % (dataset, year), "filePath": filePath,
+             "previousFilePaths": [other for otherDataset, otherYear, other in logs if otherDataset == dataset and otherYear < year]}
+            for dataset, year, filePath in logs]
+
+
+def run_case(eventLog, algorithm, k, t, previousLogs=None, seed=0):
+    """Builds the model, runs the algorithm and exports the log once, returns the phase timings and the result"""
+    np.random.seed(seed)
+    start = time.perf_counter()
+    if algorithm == DP_ALGORITHM:
+        pretsa = Pretsa(eventLog, previous_logs=previousLogs)
+        pretsa.set_privacy_parameters(epsilon=DP_EPSILON)
+        cutOutCases, distanceLog = pretsa.runPretsa(int(k), float(t), differentialPrivacy=True)
+    else:
+        algorithmClass, initArguments, runArguments = ALGORITHMS[algorithm]
+        pretsa = algorithmClass(eventLog, **initArguments)
+        cutOutCases, distanceLog = pretsa.runPretsa(int(k), float(t), **runArguments)
+    privateEventLog = pretsa.getPrivatisedEventLog()
+    total = time.perf_counter() - start
+    stats = pretsa.stats()
+    phases = {phase: stats["phases"][phase]["seconds"] for phase in PHASES if phase in stats["phases"]}
+    phases["total"] = total
+    return {"phases": phases, "counters": stats["counters"], "cases": len(cutOutCases),
+            "inflictedChanges": distanceLog, "events": len(privateEventLog)}
+
+
+def _run_case_in_child(connection, eventLog, algorithm, k, t, previousLogs, repeat):
+    sys.stdout = open(os.devnull, "w")     # the progress prints of the algorithms would drown the results
+    try:
+        runs = []
+        for _ in range(repeat):
+            runs.append(run_case(eventLog, algorithm, k, t, previousLogs))
+        # the fastest repeat of every phase, the least disturbed measurement
+        result = runs[0]
+        result["phases"] = {phase: min(run["phases"][phase] for run in runs) for phase in result["phases"]}
+        result["status"] = "finished"
+    except Exception:
+        result = {"status": "failed", "error": traceback.format_exc()}
+    connection.send(result)
+    connection.close()
+
+
+def run_case_with_timeout(eventLog, algorithm, k, t, previousLogs=None, repeat=1, timeout=None):
+    """run_case in a forked process that is killed after timeout seconds"""
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_case_in_child, args=(sender, eventLog, algorithm, k, t, previousLogs, repeat))
+    process.start()
+    sender.close()
+    if receiver.poll(timeout):
+        result = receiver.recv()
+    else:
+        process.kill()
+        result = {"status": "timeout"}
+    process.join()
+    return result
+
+
+def _case_id(suite, logName, algorithm, k, t):
+    return "%s/%s/%s/k%s_t%s" % (suite, logName, algorithm, k, t)
+
+
+def run_real_suite(root, datasets, algorithms, points, repeat, timeout):
+    results = []
+    for log in find_yearly_logs(root, datasets):
+        eventLog = load_event_log(log["filePath"])
+        previousLogs = [load_event_log(filePath) for filePath in log["previousFilePaths"]]
+        for algorithm in algorithms:
+            if algorithm == DP_ALGORITHM and not previousLogs:
+                continue
+            for k, t in points:
+                result = run_case_with_timeout(eventLog, algorithm, k, t, previousLogs, repeat, timeout)
+                result.update({"id": _case_id("real", log["name"], algorithm, k, t), "suite": "real", "log": log["name"],
+                               "algorithm": algorithm, "k": k, "t": t, "traces": int(eventLog["Case ID"].nunique())})
+                _print_result(result)
+                results.append(result)
+    return results
+
+
+def run_synthetic_suite(grid, cases, algorithms, points, repeat, timeout):
+    results = []
+    for variants, traceLength in grid:
+        eventLog = generate_synthetic_log(cases=cases, variants=variants, traceLength=traceLength)
+        logName = "v%d_l%d_c%d" % (variants, traceLength, cases)
+        for algorithm in algorithms:
+            if algorithm == DP_ALGORITHM:
+                continue
+            for k, t in points:
+                result = run_case_with_timeout(eventLog, algorithm, k, t, None, repeat, timeout)
+                result.update({"id": _case_id("synthetic", logName, algorithm, k, t), "suite": "synthetic", "log": logName,
+                               "algorithm": algorithm, "k": k, "t": t, "traces": cases, "variants": variants, "traceLength": traceLength})
+                _print_result(result)
+                results.append(result)
+    return results
+
+
+def _print_result(result):
+    if result["status"] == "finished":
+        print("%s: %.3fs" % (result["id"], result["phases"]["total"]))
+    else:
+        print("%s: %s" % (result["id"], result["status"]))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment():
+    return {"commit": _git_commit(), "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "machine": platform.machine(), "processor": platform.processor(),
+            "cpus": os.cpu_count()}
+
+
+def compare_results(results, baseline, threshold=1.25, minimumSeconds=0.05):
+    """Regressions of results against the results of a baseline run
+
+    A phase regresses if it takes more than threshold times as long as in the baseline and at least
+    minimumSeconds longer. A case whose number of modified cases or inflicted changes differs from the
+    baseline, or that finished in the baseline but not now, is reported as well.
+    """
+    baselineResults = {result["id"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = baselineResults.get(result["id"], None)
+        if old is None or old["status"] != "finished":
+            continue
+        if result["status"] != "finished":
+            regressions.append({"id": result["id"], "kind": "status", "baseline": old["status"], "current": result["status"]})
+            continue
+        for phase, seconds in result["phases"].items():
+            oldSeconds = old["phases"].get(phase, None)
+            if oldSeconds is not None and seconds > oldSeconds * threshold and seconds - oldSeconds >= minimumSeconds:
+                regressions.append({"id": result["id"], "kind": "time", "phase": phase, "baseline": oldSeconds, "current": seconds})
+        for key in ("cases", "inflictedChanges"):
+            if result[key] != old[key]:
+                regressions.append({"id": result["id"], "kind": "result", "value": key, "baseline": old[key], "current": result[key]})
+    return regressions
+
+
+def _parse_point(point):
+    k, t = point.split(":")
+    return int(k), float(t)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PRETSA, heuristic PRETSA and PRETSA* on the yearly logs and on synthetic logs")
+    parser.add_argument("--suite", nargs="+", choices=["real", "synthetic"], default=["real", "synthetic"])
+    parser.add_argument("--root", default="yearly_logs", help="Directory with the <dataset>/<dataset>_dataset_<year>.csv logs")
+    parser.add_argument("--datasets", nargs="+", default=None, help="Only these datasets (default: all)")
+    parser.add_argument("--algorithms", nargs="+", choices=DEFAULT_ALGORITHMS, default=DEFAULT_ALGORITHMS)
+    parser.add_argument("--points", nargs="+", type=_parse_point, default=DEFAULT_POINTS, help="k:t points (default: 4:1.0 16:0.5)")
+    parser.add_argument("--synthetic_cases", type=int, default=DEFAULT_SYNTHETIC_CASES)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case, the fastest run of every phase is kept")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds per case before it is killed")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Results of an earlier run to flag regressions against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown factor that counts as a regression")
+    args = parser.parse_args()
+    sys.setrecursionlimit(3000)
+
+    results = []
+    if "real" in args.suite:
+        results += run_real_suite(args.root, args.datasets, args.algorithms, args.points, args.repeat, args.timeout)
+    if "synthetic" in args.suite:
+        results += run_synthetic_suite(DEFAULT_SYNTHETIC_GRID, args.synthetic_cases, args.algorithms, args.points, args.repeat, args.timeout)
+    report = {"version": BENCHMARK_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": get_environment(),
+              "repeat": args.repeat, "results": results}
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            report["regressions"] = compare_results(results, json.load(baselineFile), threshold=args.threshold)
+    with open(args.output, "w") as outputFile:
+        json.dump(report, outputFile, indent=2)
+    print("Results written to " + args.output)
+    if args.baseline:
+        for regression in report["regressions"]:
+            print("REGRESSION " + json.dumps(regression))
+        if report["regressions"]:
+            sys.exit(1)
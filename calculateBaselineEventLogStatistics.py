@@ -6,7 +6,7 @@ dictPath = sys.argv[1]
 caseIDColName = "Case ID"
 
 datasets = ["Road_Traffic_Fine_Management_Process","CoSeLoG","Sepsis"]
-df = pd.DataFrame(columns=['Dataset', 'k', 'method','variants','cases'])
+rows = []
 for dataset in datasets:
     for k in range(1,9):
         k = 2**k
@@ -24,7 +24,7 @@ for dataset in datasets:
             row['method'] = "baseline"
             row['variants'] = number_variants.size
             row['cases'] = len(traces)
-            df = df.append(row,ignore_index=True)
+            rows.append(row)
             #print("Number of variants: " + str(number_variants.size))
             #print("Min cases for Variant: " + str(min(variants)))
             #print("Max cases for Variant: " + str(max(variants)))
@@ -36,4 +36,5 @@ for dataset in datasets:
 
             #print(variants.sort_values())
 csvPath = dictPath + "baseline_event_logs_statistics.csv"
+df = pd.DataFrame(rows, columns=['Dataset', 'k', 'method','variants','cases'])
 df.to_csv(sep=";",path_or_buf=csvPath)
\ No newline at end of file
@@ -1,26 +1,18 @@
 import sys
 import pandas as pd
+from event_log_variants import extract_variants
 dictPath = sys.argv[1]
 
 caseIDColName = "Case ID"
 
 datasets = ["CoSeLoG", "Sepsis","Road_Traffic_Fine_Management_Process"]
-df = pd.DataFrame(columns=['Dataset', 'k', 'method','variants','cases'])
+rows = []
 for dataset in datasets:
     for k in range(1,9):
         k = 2**k
         filePath = dictPath + dataset + "_duration_t1.0_k" + str(k) + "_pretsa.csv"
         eventLog = pd.read_csv(filePath, delimiter=";")
-        variants = set()
-        caseId = ""
-        sequence = ""
-        for ind in eventLog.index:
-
-            if eventLog[caseIDColName][ind] != caseId:
-                variants.add(sequence)
-                caseId = eventLog[caseIDColName][ind]
-                sequence = ""
-            sequence += eventLog["Activity"][ind] + "@"
+        variants = extract_variants(eventLog, caseIDColName=caseIDColName).variants
 
         traces = eventLog[caseIDColName].value_counts()
 
@@ -32,7 +24,7 @@ for dataset in datasets:
             row['variants'] = len(variants)
             row['cases'] = len(traces)
             print(row)
-            df = df.append(row,ignore_index=True)
+            rows.append(row)
             #print("Number of variants: " + str(number_variants.size))
             #print("Min cases for Variant: " + str(min(variants)))
             #print("Max cases for Variant: " + str(max(variants)))
@@ -44,4 +36,5 @@ for dataset in datasets:
 
             #print(variants.sort_values())
 csvPath = dictPath + "pretsa_event_logs_statistics.csv"
+df = pd.DataFrame(rows, columns=['Dataset', 'k', 'method','variants','cases'])
 df.to_csv(sep=";",path_or_buf=csvPath)
\ No newline at end of file
@@ -1,49 +1,40 @@
 import argparse
 import pandas as pd
-from levenshtein import levenshtein
+from collections import Counter
+from distance_matrix import DistanceCache
+from event_log_variants import extract_variants
+from event_log_variants import get_cases_dict as get_variant_cases_dict
 
 caseIDColName = "Case ID"
 activityColName = "Activity"
 
 def get_cases_dict(event_log):
-    caseToSequenceDict = dict()
-    currentCase = ""
-    sequence = None
-    for index, row in event_log.iterrows():
-        if row[caseIDColName] != currentCase:
-            if not sequence is None:
-                caseToSequenceDict[currentCase] = sequence
-            currentCase = row[caseIDColName]
-            sequence = ""
-        sequence = sequence + "@" + row[activityColName]
-    caseToSequenceDict[currentCase] = sequence
-    return caseToSequenceDict
+    return get_variant_cases_dict(extract_variants(event_log, caseIDColName=caseIDColName, activityColName=activityColName))
 
-def get_distance(variant1,variant2,distanceMatrix):
-    if distanceMatrix.get(variant1,None) is not None:
-        if distanceMatrix[variant1].get(variant2,None) is None:
-            distanceMatrix[variant1][variant2] = levenshtein(variant1,variant2)
-            if distanceMatrix.get(variant2,None) is None:
-                distanceMatrix[variant2] = dict()
-            distanceMatrix[variant2][variant1] = distanceMatrix[variant1][variant2]
-    else:
-        distanceMatrix[variant1] = dict()
-        distanceMatrix[variant1][variant2] = levenshtein(variant1, variant2)
-        if distanceMatrix.get(variant2,None) is None:
-            distanceMatrix[variant2] = dict()
-        distanceMatrix[variant2][variant1] = distanceMatrix[variant1][variant2]
-    return distanceMatrix[variant1][variant2]
+def get_variant_pairs(event_log1_dict, event_log2_dict):
+    """Number of cases per (variant in log 1, variant in log 2 or None if the case is missing)"""
+    return Counter((sequence, event_log2_dict.get(case, None)) for case, sequence in event_log1_dict.items())
 
 
-def get_sed_between_logs(event_log_original, path_algo_log,distanceMatrix=dict()):
-    event_log2 = pd.read_csv(path_algo_log,delimiter=";")
-    event_log1_dict = get_cases_dict(event_log_original)
+def get_sed_between_logs(event_log_original, path_algo_log, distanceCache=None):
+    # event_log_original is the original log or its get_cases_dict result
+    if isinstance(path_algo_log, pd.DataFrame):
+        event_log2 = path_algo_log
+    else:
+        event_log2 = pd.read_csv(path_algo_log,delimiter=";")
+    if isinstance(event_log_original, dict):
+        event_log1_dict = event_log_original
+    else:
+        event_log1_dict = get_cases_dict(event_log_original)
     event_log2_dict = get_cases_dict(event_log2)
+    if distanceCache is None:
+        distanceCache = DistanceCache()
+    # cases with the same original and anonymized variant have the same distance, compute it once per pair
     string_edit_distance = 0
-    for case in event_log1_dict.keys():
-        if event_log2_dict.get(case,None) is not None:
-            string_edit_distance = string_edit_distance + get_distance(event_log1_dict[case],event_log2_dict[case],distanceMatrix)
+    for (variant1, variant2), cases in get_variant_pairs(event_log1_dict, event_log2_dict).items():
+        if variant2 is not None:
+            string_edit_distance = string_edit_distance + cases * distanceCache.get_distance(variant1, variant2)
         else:
-            string_edit_distance = string_edit_distance + event_log1_dict[case].count("@")
+            string_edit_distance = string_edit_distance + cases * variant1.count("@")
     print(string_edit_distance)
-    return string_edit_distance
\ No newline at end of file
+    return string_edit_distance
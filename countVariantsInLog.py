@@ -1,18 +1,11 @@
+from event_log_variants import extract_variants, get_variant_strings
+
+
 def count_variants(event_log,return_variants=False):
-    current_case = ""
-    current_variant = ""
     caseIDColName = "Case ID"
     activityColName = "Activity"
-    variants = set()
-    for index, row in event_log.iterrows():
-        activity = row[activityColName]
-        if row[caseIDColName] != current_case:
-            variants.add(current_variant)
-            current_variant = ""
-            current_case = row[caseIDColName]
-        current_variant = current_variant + "@" + activity
-    variants.add(current_variant)
+    variants = extract_variants(event_log, caseIDColName=caseIDColName, activityColName=activityColName)
     if return_variants:
-        return len(variants) - 1, variants
+        return len(variants.variants), set(get_variant_strings(variants))
     else:
-        return len(variants) - 1
\ No newline at end of file
+        return len(variants.variants)
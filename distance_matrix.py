@@ -0,0 +1,107 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from levenshtein import levenshtein_fast
+
+
+class DistanceCache:
+    """Bounded LRU cache of distances between variants
+
+    Keeps at most maxsize variant pairs, the least recently used pair is dropped first. The cache
+    can be pickled, the evaluation context uses this to keep it across evaluator runs and the
+    release state (release_state.py) to keep it across release periods.
+    """
+    def __init__(self, maxsize=1000000):
+        self.maxsize = maxsize
+        self._distances = OrderedDict()
+        self._newDistances = None
+
+    def __setstate__(self, state):
+        # Caches pickled before the new distances were tracked
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_newDistances", None)
+
+    def __len__(self):
+        return len(self._distances)
+
+    def get_distance(self, variant1, variant2):
+        key = (variant1, variant2) if variant1 <= variant2 else (variant2, variant1)
+        distance = self._distances.get(key, None)
+        if distance is None:
+            distance = levenshtein_fast(variant1, variant2)
+            self.__store(key, distance)
+            if self._newDistances is not None:
+                self._newDistances[key] = distance
+        else:
+            self._distances.move_to_end(key)
+        return distance
+
+    def __store(self, key, distance):
+        self._distances[key] = distance
+        self._distances.move_to_end(key)
+        if len(self._distances) > self.maxsize:
+            self._distances.popitem(last=False)
+
+    def track_new_distances(self):
+        """Records the distances computed from now on, e.g. in a worker process whose copy of the cache is lost when it exits"""
+        self._newDistances = dict()
+
+    def pop_new_distances(self):
+        """The distances computed since track_new_distances or the last call, as {(variant1, variant2): distance}"""
+        newDistances = self._newDistances or dict()
+        if self._newDistances is not None:
+            self._newDistances = dict()
+        return newDistances
+
+    def add_distances(self, distances):
+        """Adds distances computed elsewhere (pop_new_distances of another copy of the cache), the unknown ones count as new"""
+        for key, distance in distances.items():
+            if self._newDistances is not None and key not in self._distances:
+                self._newDistances[key] = distance
+            self.__store(key, distance)
+
+
+class _LazyDistanceRow(Mapping):
+    """Distances from one sequence to all other sequences of a LazyDistanceMatrix"""
+    def __init__(self, matrix, sequence):
+        self.matrix = matrix
+        self.sequence = sequence
+
+    def __getitem__(self, otherSequence):
+        if otherSequence == self.sequence or otherSequence not in self.matrix.sequences:
+            raise KeyError(otherSequence)
+        return self.matrix.distance(self.sequence, otherSequence)
+
+    def __iter__(self):
+        return (otherSequence for otherSequence in self.matrix.sequences if otherSequence != self.sequence)
+
+    def __len__(self):
+        return len(self.matrix.sequences) - 1
+
+
+class LazyDistanceMatrix(Mapping):
+    """Drop-in replacement for the dict of dicts distance matrix that computes distances when they are looked up
+
+    matrix[sequence1][sequence2] is the Levenshtein distance of two different sequences, like in the
+    full matrix. Pretsa switches to it when the full matrix would exceed the memory budget. The looked
+    up distances are kept in a DistanceCache of cacheSize pairs, or in distanceCache if one is given.
+    """
+    def __init__(self, sequences, cacheSize=100000, distanceCache=None):
+        self.sequences = set(sequences)
+        self._cache = distanceCache if distanceCache is not None else DistanceCache(cacheSize)
+
+    def add_sequences(self, sequences):
+        self.sequences.update(sequences)
+
+    def distance(self, sequence1, sequence2):
+        return self._cache.get_distance(sequence1, sequence2)
+
+    def __getitem__(self, sequence):
+        if sequence not in self.sequences:
+            raise KeyError(sequence)
+        return _LazyDistanceRow(self, sequence)
+
+    def __iter__(self):
+        return iter(self.sequences)
+
+    def __len__(self):
+        return len(self.sequences)
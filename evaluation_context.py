@@ -0,0 +1,112 @@
+import os
+import pickle
+import statistics
+import pandas as pd
+from calculateSEDBetweenEventLogs import DistanceCache, get_cases_dict
+from event_log_loader import get_file_hash
+from sample_quality_as_function import get_original_log_matrix
+
+# Increase when the artefacts change, older cache files are then ignored
+CACHE_VERSION = 2
+
+
+def get_mean_cycle_times(filePath):
+    if isinstance(filePath, pd.DataFrame):
+        eventLog = filePath
+    else:
+        eventLog = pd.read_csv(filePath, delimiter=";")
+    mean_cycle_times = eventLog.groupby('Activity').Duration.agg("mean")
+    return mean_cycle_times
+
+
+def get_cycle_time_error(original_cycle_time, log_cycle_times):
+    """Mean relative error (capped at 1) of the mean cycle times over the activities of the original log"""
+    errors = list()
+    for activity in original_cycle_time.keys():
+        originalValue = original_cycle_time[activity]
+        if originalValue != 0.0:
+            algorithmValue = log_cycle_times.get(activity,0.0)
+            relativeError = abs((algorithmValue / originalValue) - 1.0)
+            if relativeError > 1:
+                relativeError = 1
+            errors.append(relativeError)
+    return statistics.mean(errors)
+
+
+class EvaluationContext:
+    """Artefacts of an original event log shared by the getResultsJournalExtension_* evaluators
+
+    Every artefact is computed on first use. The artefacts are kept in a cache file next to the
+    log (<log>_evaluation_cache.pickle) together with the SHA-256 of the log, so later runs reuse
+    them as long as the log did not change.
+    """
+    def __init__(self, filePathOriginalLog, cacheFilePath=None, useCache=True):
+        self.filePath = filePathOriginalLog
+        self.cacheFilePath = cacheFilePath or filePathOriginalLog.replace(".csv", "_evaluation_cache.pickle")
+        self.useCache = useCache
+        self.fileHash = get_file_hash(filePathOriginalLog)
+        self._artefacts = dict()
+        self._changed = False
+        self._event_log = None
+        if useCache and os.path.exists(self.cacheFilePath):
+            try:
+                with open(self.cacheFilePath, "rb") as cacheFile:
+                    cache = pickle.load(cacheFile)
+            except (EOFError, pickle.UnpicklingError):     # Truncated by a run of an older version, computed again
+                cache = dict()
+            if cache.get("version") == CACHE_VERSION and cache.get("hash") == self.fileHash:
+                self._artefacts = cache["artefacts"]
+        if "distance_cache" in self._artefacts:
+            self._artefacts["distance_cache"].track_new_distances()
+
+    def _get(self, name, compute):
+        if name not in self._artefacts:
+            self._artefacts[name] = compute()
+            self._changed = True
+        return self._artefacts[name]
+
+    @property
+    def event_log(self):
+        """The original log, only read if an artefact has to be computed"""
+        if self._event_log is None:
+            self._event_log = pd.read_csv(self.filePath, delimiter=";")
+        return self._event_log
+
+    @property
+    def cases_dict(self):
+        """Case ID to sequence (@activity1@activity2...) of the original log"""
+        return self._get("cases_dict", lambda: get_cases_dict(self.event_log))
+
+    @property
+    def original_log_matrix(self):
+        """Directly-follows matrix used by get_sample_quality"""
+        return self._get("original_log_matrix", lambda: get_original_log_matrix(self.filePath))
+
+    @property
+    def mean_cycle_times(self):
+        """Mean Duration per activity"""
+        return self._get("mean_cycle_times", lambda: get_mean_cycle_times(self.filePath))
+
+    @property
+    def distance_cache(self):
+        """Bounded cache of the variant distances the SED evaluator computed so far, grows while it runs"""
+        return self._get("distance_cache", self._new_distance_cache)
+
+    @staticmethod
+    def _new_distance_cache():
+        distanceCache = DistanceCache()
+        distanceCache.track_new_distances()     # save only rewrites the cache file if distances were added
+        return distanceCache
+
+    def save(self):
+        """Writes the artefacts to the cache file if new ones were computed or distances were added"""
+        distanceCache = self._artefacts.get("distance_cache")
+        if distanceCache is not None and distanceCache.pop_new_distances():
+            self._changed = True
+        if not self.useCache or not self._changed:
+            return
+        temporaryPath = self.cacheFilePath + ".%d.tmp" % os.getpid()
+        with open(temporaryPath, "wb") as cacheFile:
+            pickle.dump({"version": CACHE_VERSION, "hash": self.fileHash, "artefacts": self._artefacts}, cacheFile)
+        os.replace(temporaryPath, self.cacheFilePath)    # An interrupted or concurrent run never leaves a truncated file
+        self._changed = False
@@ -0,0 +1,115 @@
+import argparse
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from calculateSEDBetweenEventLogs import get_sed_between_logs
+from countVariantsInLog import count_variants
+from evaluation_context import EvaluationContext, get_cycle_time_error, get_mean_cycle_times
+from sample_quality_as_function import custom_na_values, get_sample_quality
+
+RESULT_COLUMNS = ["dataset", "k", "t", "algorithm", "metric", "value"]
+
+# Original-log artefacts of the worker processes, set once per process by _init_worker
+_original = dict()
+
+
+def get_result_file_path(dirPath, dataset, k, t, algorithm, extension=".csv"):
+    return os.path.join(dirPath, dataset + "_dataset_t" + str(t) + "_k" + str(k) + "_" + algorithm + extension)
+
+
+def _init_worker(cases_dict, original_log_matrix, mean_cycle_times, distance_cache):
+    _original["cases_dict"] = cases_dict
+    _original["original_log_matrix"] = original_log_matrix
+    _original["mean_cycle_times"] = mean_cycle_times
+    _original["distance_cache"] = distance_cache
+    distance_cache.track_new_distances()
+
+
+def evaluate_result(filePathAlgoLog, filePathPickle):
+    """All metrics of one anonymized log, which is read only once"""
+    metrics = dict()
+    if os.path.exists(filePathPickle):
+        with open(filePathPickle, "rb") as file:
+            data = pickle.load(file)
+        metrics["cases"] = len(data["cases"])
+        metrics["inflictedChanges"] = data["inflictedChanges"]
+        if "time" in data:
+            metrics["time"] = data["time"]
+    if os.path.exists(filePathAlgoLog):
+        event_log = pd.read_csv(filePathAlgoLog, delimiter=";", keep_default_na=False, na_values=custom_na_values)
+        metrics["sed"] = get_sed_between_logs(_original["cases_dict"], event_log, _original["distance_cache"])
+        metrics["variants"] = count_variants(event_log)
+        metrics["cycle_time_error"] = get_cycle_time_error(_original["mean_cycle_times"], get_mean_cycle_times(event_log))
+        metrics.update(get_sample_quality(_original["original_log_matrix"], event_log))
+    return metrics
+
+
+def _evaluate_job(dirPath, dataset, k, t, algorithm):
+    """Metrics of one result and the SED distances the worker computed for it, which the parent adds to the shared cache"""
+    metrics = evaluate_result(get_result_file_path(dirPath, dataset, k, t, algorithm),
+                              get_result_file_path(dirPath, dataset, k, t, algorithm, ".pickle"))
+    return metrics, _original["distance_cache"].pop_new_distances()
+
+
+def _finished_jobs(resultFilePath):
+    if not os.path.exists(resultFilePath):
+        return set()
+    results = pd.read_csv(resultFilePath, dtype={"dataset": str, "algorithm": str})
+    return set(zip(results["k"], results["t"], results["algorithm"]))
+
+
+def run_evaluation(dirPath, dataset, ks=(4,8,16,32,64), ts=(1.0,2.0,3.0,4.0,5.0),
+                   algorithms=("pretsa","heuristic_pretsa","pretsa_star"), resultFilePath=None, workers=None, rerun=False):
+    """Evaluates every (k, t, algorithm) result of a dataset into one long-format table
+
+    Every row holds one metric of one result. The rows of a result are appended to
+    resultFilePath (default: <dir>/<dataset>_evaluation_results.csv) as soon as it is evaluated,
+    results already in the file are skipped unless rerun is set. Returns the whole table.
+    """
+    if resultFilePath is None:
+        resultFilePath = os.path.join(dirPath, dataset + "_evaluation_results.csv")
+    if rerun and os.path.exists(resultFilePath):
+        os.remove(resultFilePath)
+    finished = _finished_jobs(resultFilePath)
+    jobs = [(k, t, algorithm) for k in ks for t in ts for algorithm in algorithms
+            if (k, t, algorithm) not in finished and
+            (os.path.exists(get_result_file_path(dirPath, dataset, k, t, algorithm)) or
+             os.path.exists(get_result_file_path(dirPath, dataset, k, t, algorithm, ".pickle")))]
+
+    start = time.time()
+    context = EvaluationContext(os.path.join(dirPath, dataset + "_dataset.csv"))
+    # every worker starts with the distances cached by earlier runs and returns the ones it computed
+    initargs = (context.cases_dict, context.original_log_matrix, context.mean_cycle_times, context.distance_cache)
+    context.save()
+    print("Prepared original log in %.2fs, evaluating %d results" % (time.time() - start, len(jobs)))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        futures = {executor.submit(_evaluate_job, dirPath, dataset, *job): job for job in jobs}
+        for future in as_completed(futures):
+            k, t, algorithm = futures[future]
+            metrics, newDistances = future.result()
+            context.distance_cache.add_distances(newDistances)
+            rows = [{"dataset": dataset, "k": k, "t": t, "algorithm": algorithm, "metric": metric, "value": value}
+                    for metric, value in metrics.items()]
+            pd.DataFrame(rows, columns=RESULT_COLUMNS).to_csv(resultFilePath, mode="a", index=False,
+                                                              header=not os.path.exists(resultFilePath))
+            print("k=%s t=%s %s: %d metrics" % (k, t, algorithm, len(rows)))
+    context.save()
+    return pd.read_csv(resultFilePath) if os.path.exists(resultFilePath) else pd.DataFrame(columns=RESULT_COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate all anonymized logs of a dataset into one long-format table")
+    parser.add_argument("dirPath")
+    parser.add_argument("dataset")
+    parser.add_argument("--k", type=int, nargs="+", default=[4,8,16,32,64])
+    parser.add_argument("--t", type=float, nargs="+", default=[1.0,2.0,3.0,4.0,5.0])
+    parser.add_argument("--algorithms", nargs="+", default=["pretsa","heuristic_pretsa","pretsa_star"])
+    parser.add_argument("--output", default=None, help="Results table (default: <dir>/<dataset>_evaluation_results.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--rerun", action="store_true", help="Start a new table instead of skipping evaluated results")
+    args = parser.parse_args()
+    run_evaluation(args.dirPath, args.dataset, ks=args.k, ts=args.t, algorithms=args.algorithms,
+                   resultFilePath=args.output, workers=args.workers, rerun=args.rerun)
@@ -0,0 +1,257 @@
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Columns PRETSA needs from an event log, everything else stays with the participant
+PRETSA_COLUMNS = ["Case ID", "Activity", "Duration"]
+DICTIONARY_COLUMNS = ["Case ID", "Activity"]
+
+_ALIGNMENT = 8
+
+
+def _code_dtype(number_of_categories):
+    """Smallest integer type pandas keeps for categorical codes, so decoding does not copy"""
+    if number_of_categories < np.iinfo(np.int8).max:
+        return np.dtype(np.int8)
+    if number_of_categories < np.iinfo(np.int16).max:
+        return np.dtype(np.int16)
+    if number_of_categories < np.iinfo(np.int32).max:
+        return np.dtype(np.int32)
+    return np.dtype(np.int64)
+
+
+class _BufferWriter:
+    """Collects aligned binary buffers and remembers where each one starts"""
+    def __init__(self):
+        self.buffers = []
+        self.size = 0
+
+    def add(self, data):
+        data = bytes(data)
+        offset = self.size
+        padding = (-len(data)) % _ALIGNMENT
+        self.buffers.append(data)
+        if padding:
+            self.buffers.append(b"\0" * padding)
+        self.size += len(data) + padding
+        return {"offset": offset, "length": len(data)}
+
+    def reserve(self, length, dtype):
+        """Room for an array of length bytes that is written later, its buffer is None"""
+        offset = self.size
+        padding = (-length) % _ALIGNMENT
+        self.buffers.append(None)
+        if padding:
+            self.buffers.append(b"\0" * padding)
+        self.size += length + padding
+        return {"offset": offset, "length": length, "dtype": np.dtype(dtype).str}
+
+    def add_array(self, array):
+        array = np.ascontiguousarray(array)
+        entry = self.add(array.tobytes())
+        entry["dtype"] = array.dtype.str
+        return entry
+
+
+def _encode_categories(uniques, writer):
+    uniques = np.asarray(uniques)
+    if uniques.dtype.kind in "biuf":
+        return {"kind": "raw", "data": writer.add_array(uniques)}
+    encoded = [str(value).encode("utf-8") for value in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {"kind": "utf8", "data": writer.add(b"".join(encoded)), "offsets": writer.add_array(offsets)}
+
+
+def _decode_array(buffer, entry):
+    dtype = np.dtype(entry["dtype"])
+    return np.frombuffer(buffer, dtype=dtype, count=entry["length"] // dtype.itemsize, offset=entry["offset"])
+
+
+def _decode_categories(buffer, description):
+    if description["kind"] == "raw":
+        return _decode_array(buffer, description["data"])
+    offsets = _decode_array(buffer, description["offsets"])
+    start = description["data"]["offset"]
+    blob = bytes(buffer[start:start + description["data"]["length"]])
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def encode_event_log(event_log, columns=None, dictionary_columns=DICTIONARY_COLUMNS):
+    """Serializes an event log into a compact columnar binary payload (no pickle involved)
+
+    Numeric columns are stored as raw buffers, all other columns (and the ones listed in
+    dictionary_columns) are dictionary-encoded into integer codes plus a category table.
+    """
+    if columns is not None:
+        event_log = event_log[[column for column in columns if column in event_log.columns]]
+    writer = _BufferWriter()
+    header = {"rows": len(event_log), "columns": []}
+    for column in event_log.columns:
+        values = event_log[column]
+        description = {"name": column}
+        if column not in dictionary_columns and values.dtype.kind in "biuf":
+            description["kind"] = "raw"
+            description["data"] = writer.add_array(values.to_numpy())
+        else:
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories.to_numpy()
+            else:
+                codes, uniques = pd.factorize(values)
+                uniques = np.asarray(uniques)
+            description["kind"] = "dictionary"
+            description["codes"] = writer.add_array(codes.astype(_code_dtype(len(uniques)), copy=False))
+            description["categories"] = _encode_categories(uniques, writer)
+        header["columns"].append(description)
+    encodedHeader = json.dumps(header).encode("utf-8")
+    headerPadding = (-(4 + len(encodedHeader))) % _ALIGNMENT
+    encodedHeader = encodedHeader + b" " * headerPadding
+    return len(encodedHeader).to_bytes(4, byteorder="big") + encodedHeader + b"".join(writer.buffers)
+
+
+class EventLogFileWriter:
+    """Writes an encode_event_log file chunk by chunk, for logs that do not fit in memory
+
+    Every column is spooled to a temporary file while chunks are appended. close() writes the header
+    and copies the columns behind it, the file is the same as encode_event_log of the whole log.
+    Dictionary-encoded columns keep their category table in memory.
+    """
+    def __init__(self, filePath, dictionary_columns=DICTIONARY_COLUMNS):
+        self.filePath = filePath
+        self.dictionary_columns = dictionary_columns
+        self.rows = 0
+        self.columns = None
+        self._spools = dict()
+        self._dtypes = dict()
+        self._categories = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exception, traceback):
+        if exceptionType is None:
+            self.close()
+        else:
+            self._discard()
+
+    def append(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            for column in self.columns:
+                self._spools[column] = tempfile.TemporaryFile()
+                if column not in self.dictionary_columns and chunk[column].dtype.kind in "biuf":
+                    self._dtypes[column] = chunk[column].dtype
+                else:
+                    self._categories[column] = dict()
+        elif list(chunk.columns) != self.columns:
+            raise ValueError("All chunks need the columns " + ", ".join(self.columns))
+        for column in self.columns:
+            values = chunk[column]
+            if column in self._dtypes:
+                data = values.to_numpy().astype(self._dtypes[column], copy=False)
+            else:
+                categories = self._categories[column]
+                codes, uniques = pd.factorize(values)
+                globalCodes = np.array([categories.setdefault(value, len(categories)) for value in uniques], dtype=np.int64)
+                data = globalCodes[codes] if len(globalCodes) else np.empty(0, dtype=np.int64)
+            self._spools[column].write(np.ascontiguousarray(data).tobytes())
+        self.rows += len(chunk)
+
+    def _discard(self):
+        for spool in self._spools.values():
+            spool.close()
+        self._spools = dict()
+
+    def close(self):
+        writer = _BufferWriter()
+        header = {"rows": self.rows, "columns": []}
+        spools = []     # (spool, dtype of the spool, dtype in the file) in the order of the reserved buffers
+        for column in self.columns or []:
+            description = {"name": column}
+            if column in self._dtypes:
+                dtype = np.dtype(self._dtypes[column])
+                description["kind"] = "raw"
+                description["data"] = writer.reserve(self.rows * dtype.itemsize, dtype)
+                spools.append((self._spools[column], dtype, dtype))
+            else:
+                uniques = np.asarray(list(self._categories[column].keys()))
+                codeDtype = _code_dtype(len(uniques))
+                description["kind"] = "dictionary"
+                description["codes"] = writer.reserve(self.rows * codeDtype.itemsize, codeDtype)
+                spools.append((self._spools[column], np.dtype(np.int64), codeDtype))
+                description["categories"] = _encode_categories(uniques, writer)
+            header["columns"].append(description)
+        encodedHeader = json.dumps(header).encode("utf-8")
+        headerPadding = (-(4 + len(encodedHeader))) % _ALIGNMENT
+        encodedHeader = encodedHeader + b" " * headerPadding
+        spools = iter(spools)
+        with open(self.filePath, "wb") as file:
+            file.write(len(encodedHeader).to_bytes(4, byteorder="big") + encodedHeader)
+            for data in writer.buffers:
+                if data is None:
+                    self._copy_spool(file, *next(spools))
+                else:
+                    file.write(data)
+        self._discard()
+
+    @staticmethod
+    def _copy_spool(file, spool, spoolDtype, fileDtype, rowsPerBlock=1 << 20):
+        spool.seek(0)
+        while True:
+            block = spool.read(rowsPerBlock * spoolDtype.itemsize)
+            if not block:
+                break
+            file.write(np.frombuffer(block, dtype=spoolDtype).astype(fileDtype, copy=False).tobytes())
+
+
+def decode_event_log(payload):
+    """Rebuilds the DataFrame of an encode_event_log payload
+
+    Column data is read directly from the payload buffer (zero-copy), dictionary-encoded
+    columns come back as pandas categoricals.
+    """
+    buffer = memoryview(payload)
+    headerLength = int.from_bytes(buffer[:4], byteorder="big")
+    header = json.loads(bytes(buffer[4:4 + headerLength]).decode("utf-8"))
+    data = buffer[4 + headerLength:]
+    columns = dict()
+    for description in header["columns"]:
+        if description["kind"] == "raw":
+            columns[description["name"]] = _decode_array(data, description["data"])
+        else:
+            codes = _decode_array(data, description["codes"])
+            categories = _decode_categories(data, description["categories"])
+            columns[description["name"]] = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.DataFrame(columns, index=pd.RangeIndex(header["rows"]), copy=False)
+
+
+def encode_message(message):
+    """Frames a flat message dict (str, number, None or bytes values) without pickle"""
+    fields = dict()
+    binaryParts = []
+    for key, value in message.items():
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = bytes(value)
+            fields[key] = {"bytes": len(value)}
+            binaryParts.append(value)
+        else:
+            fields[key] = {"value": value}
+    header = json.dumps(fields).encode("utf-8")
+    return len(header).to_bytes(4, byteorder="big") + header + b"".join(binaryParts)
+
+
+def decode_message(data):
+    """Inverse of encode_message"""
+    buffer = memoryview(data)
+    headerLength = int.from_bytes(buffer[:4], byteorder="big")
+    fields = json.loads(bytes(buffer[4:4 + headerLength]).decode("utf-8"))
+    position = 4 + headerLength
+    message = dict()
+    for key, field in fields.items():
+        if "bytes" in field:
+            message[key] = bytes(buffer[position:position + field["bytes"]])
+            position += field["bytes"]
+        else:
+            message[key] = field["value"]
+    return message
@@ -0,0 +1,104 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import pandas as pd
+from event_log_codec import PRETSA_COLUMNS, encode_event_log, decode_event_log
+
+# Columns the PRETSA entry points use, Participant_ID only exists in combined MPC logs
+LOG_COLUMNS = PRETSA_COLUMNS + ["Participant_ID"]
+CATEGORICAL_COLUMNS = ["Case ID", "Activity", "Participant_ID"]
+
+_SIDECAR_EXTENSION = ".evlog"
+_hashPattern = re.compile(r"[0-9a-f]{16}")
+
+
+def get_file_hash(filePath):
+    sha256 = hashlib.sha256()
+    with open(filePath, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def read_event_log_csv(filePath, columns=LOG_COLUMNS, delimiter=";"):
+    """Reads only the given columns (those missing in the file are skipped), ids and activities as categoricals
+
+    Values keep the types read_csv infers, so integer case ids stay integers.
+    """
+    header = pd.read_csv(filePath, delimiter=delimiter, nrows=0).columns
+    usecols = [column for column in columns if column in header]
+    eventLog = pd.read_csv(filePath, delimiter=delimiter, usecols=usecols)[usecols]
+    for column in CATEGORICAL_COLUMNS:
+        if column in eventLog.columns:
+            eventLog[column] = eventLog[column].astype("category")
+    return eventLog
+
+
+def get_columns_key(columns=LOG_COLUMNS):
+    return hashlib.sha256(json.dumps(list(columns)).encode("utf-8")).hexdigest()[:8]
+
+
+def get_sidecar_path(filePath, fileHash, columns=LOG_COLUMNS):
+    """<log>.<columns key>.<file hash>.evlog, sidecars of other column selections of the same CSV live next to it"""
+    return os.path.splitext(filePath)[0] + "." + get_columns_key(columns) + "." + fileHash[:16] + _SIDECAR_EXTENSION
+
+
+def _get_stale_sidecars(filePath, columns, sidecarPath):
+    #Sidecars of the same column selection written for an earlier content of the CSV, and those of the
+    #older <log>.<file hash>.evlog naming that had no columns key
+    for prefix in (os.path.splitext(filePath)[0] + "." + get_columns_key(columns) + ".", os.path.splitext(filePath)[0] + "."):
+        for candidate in glob.glob(glob.escape(prefix) + "*" + _SIDECAR_EXTENSION):
+            if candidate != sidecarPath and _hashPattern.fullmatch(candidate[len(prefix):-len(_SIDECAR_EXTENSION)]):
+                yield candidate
+
+
+def _remove_stale_sidecars(filePath, columns, sidecarPath):
+    try:
+        for staleSidecar in _get_stale_sidecars(filePath, columns, sidecarPath):
+            os.remove(staleSidecar)
+    except OSError as e:      # Read-only or shared directory, the stale sidecars are only wasted space
+        print("Stale sidecar not removed: %s" % e)
+
+
+def map_event_log(filePath):
+    """Memory-maps an event log written in the event_log_codec format (a sidecar or an EventLogFileWriter file)"""
+    with open(filePath, "rb") as sidecar:
+        mapped = mmap.mmap(sidecar.fileno(), 0, access=mmap.ACCESS_READ)
+    # The columns are views into the mapping and keep it open as long as they are used
+    return decode_event_log(mapped)
+
+
+def load_event_log(filePath, columns=LOG_COLUMNS, delimiter=";", useCache=True):
+    """Loads the columns PRETSA needs from an event log CSV
+
+    The parsed columns are cached in a binary sidecar next to the CSV (event_log_codec format,
+    named after the columns and the SHA-256 of the CSV). Later loads memory-map the sidecar
+    instead of parsing the CSV. A changed CSV gets a new sidecar and the old one of the same
+    columns is removed, the sidecars of other column selections are kept. If the sidecar can not
+    be written (e.g. a read-only directory) the parsed log is returned without caching it.
+    """
+    if not useCache:
+        return read_event_log_csv(filePath, columns=columns, delimiter=delimiter)
+    sidecarPath = get_sidecar_path(filePath, get_file_hash(filePath), columns)
+    if os.path.exists(sidecarPath):
+        _remove_stale_sidecars(filePath, columns, sidecarPath)
+        return map_event_log(sidecarPath)
+    eventLog = read_event_log_csv(filePath, columns=columns, delimiter=delimiter)
+    payload = encode_event_log(eventLog, dictionary_columns=[column for column in CATEGORICAL_COLUMNS if column in eventLog.columns])
+    _remove_stale_sidecars(filePath, columns, sidecarPath)
+    temporaryPath = sidecarPath + ".%d.tmp" % os.getpid()
+    try:
+        with open(temporaryPath, "wb") as sidecar:
+            sidecar.write(payload)
+        os.replace(temporaryPath, sidecarPath)    # Concurrent runs never see a half written sidecar
+    except OSError as e:
+        print("Event log not cached: %s" % e)
+        if os.path.exists(temporaryPath):
+            try:
+                os.remove(temporaryPath)
+            except OSError:
+                pass
+    return eventLog
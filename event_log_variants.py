@@ -0,0 +1,120 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+CASE_ID_COLUMN = "Case ID"
+ACTIVITY_COLUMN = "Activity"
+
+# One entry per trace in case_ids and variant_ids, variants[variant_id] is the tuple of activity codes
+# of that variant and activities[code] the activity name
+VariantTable = namedtuple("VariantTable", ["case_ids", "variant_ids", "variants", "activities"])
+
+
+class _VariantCollector:
+    """Assigns variant ids to traces given as activity codes, in order of first appearance"""
+    def __init__(self):
+        self.variantIndex = dict()
+        self.variants = []
+        self.caseIDs = []
+        self.variantIDs = []
+
+    def add_traces(self, caseIDs, codes, traceStarts):
+        if len(traceStarts) == 0:
+            return
+        variantIDs = np.empty(len(traceStarts), dtype=np.int64)
+        for trace, codesOfTrace in enumerate(np.split(codes, traceStarts[1:])):
+            key = codesOfTrace.tobytes()
+            variantID = self.variantIndex.get(key, None)
+            if variantID is None:
+                variantID = len(self.variants)
+                self.variantIndex[key] = variantID
+                self.variants.append(tuple(codesOfTrace.tolist()))
+            variantIDs[trace] = variantID
+        self.caseIDs.append(caseIDs[traceStarts])
+        self.variantIDs.append(variantIDs)
+
+    def table(self, activities):
+        caseIDs = np.concatenate(self.caseIDs) if self.caseIDs else np.empty(0, dtype=object)
+        variantIDs = np.concatenate(self.variantIDs) if self.variantIDs else np.empty(0, dtype=np.int64)
+        return VariantTable(caseIDs, variantIDs, self.variants, pd.Index(activities, dtype=object))
+
+
+def _trace_starts(caseIDs):
+    # a trace starts wherever the Case ID differs from the one of the previous event
+    if len(caseIDs) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate(([True], caseIDs[1:] != caseIDs[:-1])))
+
+
+def extract_variants(event_log, caseIDColName=CASE_ID_COLUMN, activityColName=ACTIVITY_COLUMN, consecutive=True, sortColName=None):
+    """Variant table of an event log
+
+    With consecutive (the default, like the row loops of the scripts) every run of events with the
+    same Case ID is a trace. Otherwise all events of a Case ID form one trace, ordered by
+    sortColName if given, and events without Case ID are ignored.
+    """
+    activityCodes, activities = pd.factorize(event_log[activityColName], use_na_sentinel=False)
+    activityCodes = activityCodes.astype(np.int64, copy=False)
+    caseIDs = event_log[caseIDColName].to_numpy()
+    if consecutive:
+        traceStarts = _trace_starts(caseIDs)
+    else:
+        traces, _ = pd.factorize(event_log[caseIDColName])
+        if sortColName is not None:
+            order = np.lexsort((event_log[sortColName].to_numpy(), traces))
+        else:
+            order = np.argsort(traces, kind="stable")
+        order = order[traces[order] >= 0]
+        activityCodes = activityCodes[order]
+        caseIDs = caseIDs[order]
+        traceStarts = _trace_starts(traces[order])
+    collector = _VariantCollector()
+    collector.add_traces(caseIDs, activityCodes, traceStarts)
+    return collector.table(activities)
+
+
+def extract_variants_from_csv(filePath, caseIDColName=CASE_ID_COLUMN, activityColName=ACTIVITY_COLUMN, chunksize=1000000, delimiter=";"):
+    """Variant table of an event log CSV read in chunks of chunksize events
+
+    Only the Case ID and activity columns are read and only one chunk is in memory at a time, so the
+    log can be larger than memory. Traces are runs of events with the same Case ID as in extract_variants.
+    """
+    collector = _VariantCollector()
+    activityIndex = dict()
+    carryCaseIDs = None
+    carryCodes = None
+    for chunk in pd.read_csv(filePath, delimiter=delimiter, usecols=[caseIDColName, activityColName], chunksize=chunksize):
+        localCodes, uniques = pd.factorize(chunk[activityColName], use_na_sentinel=False)
+        globalCodes = np.array([activityIndex.setdefault(activity, len(activityIndex)) for activity in uniques], dtype=np.int64)
+        codes = globalCodes[localCodes] if len(globalCodes) else np.empty(0, dtype=np.int64)
+        caseIDs = chunk[caseIDColName].to_numpy()
+        if carryCodes is not None:      # the last trace of the previous chunk may go on in this one
+            codes = np.concatenate((carryCodes, codes))
+            caseIDs = np.concatenate((carryCaseIDs, caseIDs))
+        traceStarts = _trace_starts(caseIDs)
+        if len(traceStarts) == 0:
+            continue
+        lastStart = traceStarts[-1]
+        collector.add_traces(caseIDs[:lastStart], codes[:lastStart], traceStarts[:-1])
+        carryCaseIDs = caseIDs[lastStart:]
+        carryCodes = codes[lastStart:]
+    if carryCodes is not None:
+        collector.add_traces(carryCaseIDs, carryCodes, np.zeros(1, dtype=np.int64))
+    return collector.table(list(activityIndex.keys()))
+
+
+def get_variant_strings(table, separator="@", prefix="@", suffix=""):
+    """Variants as strings, by default in the @activity1@activity2 form PRETSA uses"""
+    activities = [str(activity) for activity in table.activities]
+    return [prefix + separator.join([activities[code] for code in variant]) + suffix for variant in table.variants]
+
+
+def get_variant_counts(table):
+    """Number of traces per variant id"""
+    return np.bincount(table.variant_ids, minlength=len(table.variants))
+
+
+def get_cases_dict(table, separator="@", prefix="@"):
+    """Case ID to variant string, a Case ID with several traces gets the one of its last trace"""
+    strings = get_variant_strings(table, separator=separator, prefix=prefix)
+    return dict(zip(table.case_ids.tolist(), [strings[variantID] for variantID in table.variant_ids.tolist()]))
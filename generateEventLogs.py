@@ -1,13 +1,28 @@
+import argparse
 import sys
-import os
-filePath = sys.argv[1]
+from job_scheduler import add_scheduler_arguments, scheduler_from_arguments
+from pretsa_baseline import get_baseline_file_path
+
+parser = argparse.ArgumentParser(description="Generate the baseline event logs for k = 2..256 and t = 0.025..0.1")
+parser.add_argument("filePath")
+parser.add_argument("--runs", action="store_true", help="Also run PRETSA (runPretsa.py) for every (k, t)")
+add_scheduler_arguments(parser, timeout=24*60*60)
+args = parser.parse_args()
+filePath = args.filePath
 
 pathForbaseline = filePath.replace("_duration.csv",".csv")
 
-for i in range(1,9):
-    for j in range(0,4):
-        t = 0.1 - (0.025 * j)
-        t = round(t,3)
-        k = 2**i
-        os.system("time python generate_baseline_log.py %s %s %s &" % (filePath,str(k),str(t)))
-        #os.system("time python runPretsa.py %s %s %s &" % (filePath,str(k),t))
\ No newline at end of file
+ks = [2**i for i in range(1,9)]
+ts = [round(0.1 - (0.025 * j),3) for j in range(0,4)]
+outputs = [get_baseline_file_path(filePath, k) for k in ks] + [get_baseline_file_path(filePath, k, t) for k in ks for t in ts]
+
+# pretsa_baseline reads the log once and writes the logs of all (k, t) values
+scheduler = scheduler_from_arguments(args)
+scheduler.add([sys.executable, "pretsa_baseline.py", filePath, "--k"] + [str(k) for k in ks] + ["--t"] + [str(t) for t in ts],
+              outputs=outputs, name="baseline")
+if args.runs:
+    for k in ks:
+        for t in ts:
+            scheduler.add([sys.executable, "runPretsa.py", filePath, str(k), str(t)],
+                          outputs=[filePath.replace(".csv","_t%s_k%s_pretsa.csv" % (t,k))], name="pretsa k=%s t=%s" % (k,t))
+scheduler.run()
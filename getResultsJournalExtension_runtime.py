@@ -7,7 +7,7 @@ dirPath = sys.argv[1]
 dataset = sys.argv[2]
 resultFilePath = os.path.join(dirPath, dataset + "_runtime_results.csv")
 
-df = pd.DataFrame()
+rows = []
 t = 1.0
 
 for k in (4,8,16,32,64):
@@ -27,5 +27,5 @@ for k in (4,8,16,32,64):
         result["t"] = t
         result["algorithm"] = algorithm
         result["dataset"] = dataset
-        df = df.append(result, ignore_index=True)
-df.to_csv(resultFilePath)
+        rows.append(result)
+pd.DataFrame(rows).to_csv(resultFilePath)
@@ -2,17 +2,19 @@ import os
 import sys
 import pandas as pd
 from calculateSEDBetweenEventLogs import get_sed_between_logs
+from evaluation_context import EvaluationContext
 
 dirPath = sys.argv[1]
 dataset = sys.argv[2]
 resultFilePath = os.path.join(dirPath, dataset + "_sed_results.csv")
 
-df = pd.DataFrame()
+rows = []
 
 filePathOriginalLog = os.path.join(dirPath, dataset + "_dataset.csv")
 print(filePathOriginalLog)
-event_log_original = pd.read_csv(filePathOriginalLog, delimiter=";")
-distanceMatrix = dict()
+context = EvaluationContext(filePathOriginalLog)
+original_cases = context.cases_dict
+distanceCache = context.distance_cache
 
 for k in (4,8,16,32,64):
     for t in (1.0,2.0,3.0,4.0,5.0):
@@ -21,12 +23,13 @@ for k in (4,8,16,32,64):
             data = dict()
             if os.path.exists(filePathAlgoLog):
                 data["sed"] = \
-                     get_sed_between_logs(event_log_original,filePathAlgoLog,distanceMatrix)
+                     get_sed_between_logs(original_cases,filePathAlgoLog,distanceCache)
             else:
                 data["sed"] = -1
             data["k"] = k
             data["t"] = t
             data["algorithm"] = algorithm
             data["dataset"] = dataset
-            df = df.append(data, ignore_index=True)
-df.to_csv(resultFilePath)
\ No newline at end of file
+            rows.append(data)
+context.save()
+pd.DataFrame(rows).to_csv(resultFilePath)
\ No newline at end of file
@@ -7,7 +7,7 @@ dirPath = sys.argv[1]
 dataset = sys.argv[2]
 resultFilePath = os.path.join(dirPath, dataset + "_variant_results.csv")
 
-df = pd.DataFrame()
+rows = []
 
 
 for k in (4,8,16,32,64):
@@ -24,5 +24,5 @@ for k in (4,8,16,32,64):
             data["t"] = t
             data["algorithm"] = algorithm
             data["dataset"] = dataset
-            df = df.append(data, ignore_index=True)
-df.to_csv(resultFilePath)
+            rows.append(data)
+pd.DataFrame(rows).to_csv(resultFilePath)
@@ -0,0 +1,211 @@
+import json
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:     # Not available on Windows, jobs then run without memory ceiling
+    resource = None
+
+# ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+_MAX_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+class Job:
+    """One command (or function) of an experiment, finished once all its outputs exist"""
+    def __init__(self, command, outputs=(), name=None, timeout=None, memory_limit=None, retries=None,
+                 function=None, args=(), on_done=None):
+        self.command = [str(argument) for argument in command] if command is not None else None
+        self.function = function
+        self.args = args
+        self.on_done = on_done
+        self.outputs = list(outputs)
+        self.name = name or (" ".join(self.command) if command is not None else function.__name__)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.retries = retries
+        self.attempt = 0
+        self.resultPath = None
+
+    def is_finished(self):
+        return len(self.outputs) > 0 and all(os.path.exists(output) and os.path.getsize(output) > 0 for output in self.outputs)
+
+
+def _limit_memory(memory_limit):
+    def apply_limit():
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    return apply_limit
+
+
+class _ForkedFunction:
+    """Child process running a function job, with the part of the subprocess.Popen interface the scheduler uses"""
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def kill(self):
+        os.kill(self.pid, signal.SIGKILL)
+
+
+def _run_function_in_child(job, memory_limit):
+    # Runs in the forked child, never returns. The return value or the traceback goes to job.resultPath
+    exitCode = 1
+    try:
+        if memory_limit is not None and resource is not None:
+            _limit_memory(memory_limit)()
+        try:
+            outcome = {"result": job.function(*job.args)}
+            exitCode = 0
+        except BaseException:
+            outcome = {"error": traceback.format_exc()}
+        with open(job.resultPath, "wb") as resultFile:
+            pickle.dump(outcome, resultFile)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exitCode)
+
+
+class JobScheduler:
+    """Runs queued commands in at most workers child processes
+
+    Each job gets a memory ceiling (bytes of address space, enforced with RLIMIT_AS), a timeout
+    in seconds after which it is killed and a number of retries for failed or timed out attempts.
+    Jobs whose outputs already exist are skipped. For every attempt a JSON record with status,
+    wall time, CPU time and peak RSS is appended to record_file (one record per line).
+    Besides commands, functions can be queued with add_function. They run in a forked child, so
+    they share everything the scheduling process has built without pickling it, and their
+    return value (or traceback) is added to the record as result (or error).
+    """
+    def __init__(self, workers=None, memory_limit=None, timeout=None, retries=0, record_file=None,
+                 skip_finished=True, poll_interval=0.1):
+        self.workers = workers or os.cpu_count() or 1
+        self.memory_limit = memory_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.record_file = record_file
+        self.skip_finished = skip_finished
+        self.poll_interval = poll_interval
+        self.queue = []
+        self.records = []
+
+    def add(self, command, outputs=(), name=None, timeout=None, memory_limit=None, retries=None):
+        """Queues a command (list of arguments), settings left at None use the scheduler defaults"""
+        job = Job(command, outputs=outputs, name=name, timeout=timeout, memory_limit=memory_limit, retries=retries)
+        self.queue.append(job)
+        return job
+
+    def add_function(self, function, args=(), outputs=(), name=None, timeout=None, memory_limit=None, retries=None,
+                     on_done=None):
+        """Queues function(*args) to run in a forked child, on_done is called with the record of its last attempt"""
+        job = Job(None, outputs=outputs, name=name, timeout=timeout, memory_limit=memory_limit, retries=retries,
+                  function=function, args=args, on_done=on_done)
+        self.queue.append(job)
+        return job
+
+    def _write_record(self, record):
+        self.records.append(record)
+        if self.record_file is not None:
+            with open(self.record_file, "a") as recordFile:
+                recordFile.write(json.dumps(record, default=str) + "\n")
+        print("%s: %s (%.1fs wall, %.1fs cpu, %.0f MB peak rss)" % (record["name"], record["status"], record["wall_time"],
+              record["cpu_time"], record["max_rss"] / 2**20))
+
+    def _start(self, job):
+        job.attempt += 1
+        memory_limit = job.memory_limit if job.memory_limit is not None else self.memory_limit
+        if job.function is not None:
+            resultFile, job.resultPath = tempfile.mkstemp(suffix=".pickle")
+            os.close(resultFile)
+            sys.stdout.flush()      # Otherwise the child prints the buffered output again
+            sys.stderr.flush()
+            start = time.time()
+            pid = os.fork()
+            if pid == 0:
+                _run_function_in_child(job, memory_limit)
+            return _ForkedFunction(pid), start
+        preexec_fn = _limit_memory(memory_limit) if memory_limit is not None and resource is not None else None
+        process = subprocess.Popen(job.command, preexec_fn=preexec_fn)
+        return process, time.time()
+
+    def _read_outcome(self, job):
+        if job.resultPath is None:
+            return dict()
+        try:
+            with open(job.resultPath, "rb") as resultFile:
+                return pickle.load(resultFile)
+        except (OSError, EOFError, pickle.UnpicklingError):     # Killed or crashed before writing it
+            return dict()
+        finally:
+            os.remove(job.resultPath)
+            job.resultPath = None
+
+    def _finish(self, job, status, returncode, start, rusage):
+        record = {"name": job.name, "command": job.command, "status": status, "returncode": returncode,
+                  "attempt": job.attempt, "start": start, "wall_time": time.time() - start,
+                  "cpu_time": rusage.ru_utime + rusage.ru_stime if rusage is not None else 0.0,
+                  "max_rss": rusage.ru_maxrss * _MAX_RSS_UNIT if rusage is not None else 0}
+        record.update(self._read_outcome(job))
+        self._write_record(record)
+        retries = job.retries if job.retries is not None else self.retries
+        if status != "finished" and job.attempt <= retries:
+            self.queue.append(job)
+        elif job.on_done is not None:
+            job.on_done(record)
+
+    def run(self):
+        """Runs all queued jobs and returns the records of this run"""
+        firstRecord = len(self.records)
+        running = dict()
+        while self.queue or running:
+            while self.queue and len(running) < self.workers:
+                job = self.queue.pop(0)
+                if self.skip_finished and job.attempt == 0 and job.is_finished():
+                    record = {"name": job.name, "command": job.command, "status": "skipped", "returncode": None,
+                              "attempt": 0, "start": time.time(), "wall_time": 0.0, "cpu_time": 0.0, "max_rss": 0}
+                    self._write_record(record)
+                    if job.on_done is not None:
+                        job.on_done(record)
+                    continue
+                process, start = self._start(job)
+                running[process.pid] = (job, process, start)
+            time.sleep(self.poll_interval)
+            for pid, (job, process, start) in list(running.items()):
+                # wait4 instead of Popen.wait, only it reports the resource usage of this child
+                waitedPid, status, rusage = os.wait4(pid, os.WNOHANG)
+                if waitedPid == 0:
+                    timeout = job.timeout if job.timeout is not None else self.timeout
+                    if timeout is None or time.time() - start <= timeout:
+                        continue
+                    process.kill()
+                    waitedPid, status, rusage = os.wait4(pid, 0)
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    del running[pid]
+                    self._finish(job, "timeout", process.returncode, start, rusage)
+                    continue
+                process.returncode = os.waitstatus_to_exitcode(status)
+                del running[pid]
+                self._finish(job, "finished" if process.returncode == 0 else "failed", process.returncode, start, rusage)
+        return self.records[firstRecord:]
+
+
+def add_scheduler_arguments(parser, workers=None, timeout=None):
+    """Adds the scheduler options shared by the experiment launchers to an argparse parser"""
+    parser.add_argument("--workers", type=int, default=workers, help="Parallel jobs (default: CPU count)")
+    parser.add_argument("--memory_limit", type=float, default=None, help="Memory ceiling per job in GB")
+    parser.add_argument("--timeout", type=float, default=timeout, help="Seconds before a job is killed")
+    parser.add_argument("--retries", type=int, default=0, help="Retries of failed or timed out jobs")
+    parser.add_argument("--records", default=None, help="File the JSON records of all jobs are appended to")
+    parser.add_argument("--rerun", action="store_true", help="Also run jobs whose outputs already exist")
+
+
+def scheduler_from_arguments(args):
+    return JobScheduler(workers=args.workers, timeout=args.timeout, retries=args.retries, record_file=args.records,
+                        memory_limit=int(args.memory_limit * 2**30) if args.memory_limit is not None else None,
+                        skip_finished=not args.rerun)
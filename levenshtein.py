@@ -25,4 +25,44 @@ def levenshtein(s1, s2):
             substitutions = previous_row[j] + (c1 != c2)
             current_row.append(min(insertions, deletions, substitutions))
         previous_row = current_row
-    return previous_row[-1]
\ No newline at end of file
+    return previous_row[-1]
+
+def levenshtein_tokens(tokens1, tokens2):
+    """Levenshtein distance of two token lists, bit-parallel (Myers 1999, Hyyrö 2001)
+
+    Every column of the dynamic programming matrix is kept as bit vectors of vertical deltas,
+    so each token of tokens2 costs a few integer operations instead of a loop over tokens1.
+    """
+    if len(tokens1) < len(tokens2):
+        tokens1, tokens2 = tokens2, tokens1
+    if len(tokens2) == 0:
+        return len(tokens1)
+    # the shorter list is the pattern, Python integers hold bit vectors of any length
+    peq = dict()
+    for i, token in enumerate(tokens2):
+        peq[token] = peq.get(token, 0) | (1 << i)
+    mask = (1 << len(tokens2)) - 1
+    last = 1 << (len(tokens2) - 1)
+    pv = mask
+    mv = 0
+    score = len(tokens2)
+    for token in tokens1:
+        eq = peq.get(token, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def levenshtein_fast(s1, s2):
+    """Same result as levenshtein(s1, s2), computed with levenshtein_tokens"""
+    return levenshtein_tokens(s1.split(delimter), s2.split(delimter))
@@ -1,23 +1,72 @@
+import asyncio
+import concurrent.futures
+import os
 import threading
 import numpy as np
 import pandas as pd
 from cryptography.fernet import Fernet
-import pickle
 import socket
 import time
 from pretsa import Pretsa
+from event_log_codec import PRETSA_COLUMNS, encode_event_log, decode_event_log, encode_message, decode_message
+
+
+STAGES = ("receive", "decrypt", "decode", "combine", "pretsa", "split", "encrypt", "send")
+
+
+def _decrypt_payload(key, token):
+    """Decrypts a participant upload, returns the payload and the seconds it took (runs in the decode pool)"""
+    start = time.perf_counter()
+    payload = Fernet(key).decrypt(token)
+    return payload, time.perf_counter() - start
+
+
+def _decrypt_log(key, token):
+    """Decrypts and decodes a participant upload in one go (runs in a worker thread)"""
+    payload, decryptTime = _decrypt_payload(key, token)
+    start = time.perf_counter()
+    return decode_event_log(payload), decryptTime, time.perf_counter() - start
+
+
+def _encrypt_payload(key, payload):
+    """Encrypts a participant result, returns the token and the seconds it took (runs in the decode pool)"""
+    start = time.perf_counter()
+    token = Fernet(key).encrypt(payload)
+    return token, time.perf_counter() - start
+
 
 class MPCCoordinator:
-    """MPC coordinator for PRETSA analysis"""
-    def __init__(self, port=5001):
+    """MPC coordinator for PRETSA analysis
+
+    The coordinator runs an asyncio event loop in a background thread. Uploads are received and
+    decrypted concurrently, the blocking methods below can be called from any other thread.
+    Participant connections stay open for the whole session: participants can upload new cases
+    (deltas) and every computation reuses the combined log, tree and distance matrix of the last one.
+    """
+    def __init__(self, port=5001, host='0.0.0.0', backlog=1024, workers=None, use_processes=False):
         self.port = port
+        self.host = host
+        self.backlog = backlog
+        self.workers = workers
+        self.use_processes = use_processes      # Decrypt in a process pool instead of worker threads
+        self.executor = None
         self.participants = {}
-        self.logs = {}
+        self.logs = []                  # Decoded uploads (participant_id, log, timings) that are not part of the model yet
+        self.run_timings = []           # Seconds per stage for every computation
+        self.model = None
+        self._pristine = None
+        self._model_participants = set()
+        self._case_ids = set()          # Case IDs of the model and of the queued uploads
+        self.round = 0
         self.k = 3
         self.t = 0.2
         self.epsilon = 1.0
         self.server_thread = None
-        self.running = True
+        self.server = None
+        self.loop = None
+        self.running = False
+        self._registration = None
+        self._pending_uploads = set()
         
     def set_privacy_parameters(self, k, t, epsilon):
         """Sets privacy parameters"""
@@ -27,225 +76,393 @@ class MPCCoordinator:
         print(f"Privacy parameters set: k={k}, t={t}, epsilon={epsilon}")
         
     def start_server(self):
-        """Starts the server in a separate thread to listen for participant connections"""
-        self.server_thread = threading.Thread(target=self._run_server)
+        """Starts the event loop in a separate thread and listens for participant connections"""
+        self.loop = asyncio.new_event_loop()
+        if self.use_processes:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        ready = threading.Event()
+        self.server_thread = threading.Thread(target=self._run_server, args=(ready,))
         self.server_thread.daemon = True  # Allow the thread to exit when main program exits
         self.server_thread.start()
+        ready.wait()
+        if not self.running:
+            raise RuntimeError(f"MPC Coordinator could not listen on port {self.port}")
         print(f"MPC Coordinator started on port {self.port}")
         
-    def _run_server(self):
-        """Runs the server to accept participant connections"""
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.bind(('0.0.0.0', self.port))
-        self.server_socket.listen(5)
-        
-        while self.running:
-            try:
-                self.server_socket.settimeout(1.0)  # Add timeout to allow checking running flag
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    self._handle_participant(client_socket, address)
-                except socket.timeout:
-                    continue  # No connection received, check running flag and continue
-            except Exception as e:
-                print(f"Server error: {e}")
-                break
-                
+    def _run_server(self, ready):
+        """Runs the event loop serving participant connections"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(
+                self._handle_participant, self.host, self.port, backlog=self.backlog, reuse_address=True))
+            self._registration = asyncio.Condition()
+            self.running = True
+        except Exception as e:
+            print(f"Server error: {e}")
+        finally:
+            ready.set()
+        if self.running:
+            self.loop.run_forever()
+        self.loop.close()
         print("Server stopped")
         
     def stop_server(self):
         """Stops the server"""
+        if not self.running:
+            return
         self.running = False
-        if self.server_socket:
-            self.server_socket.close()
+        asyncio.run_coroutine_threadsafe(self._close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
         if self.server_thread:
             self.server_thread.join(2.0)  # Wait for server thread to finish
+        self.executor.shutdown(wait=False)
+
+    async def _close(self):
+        self.server.close()
+        for info in self.participants.values():
+            info['writer'].close()
+        await self.server.wait_closed()
+
+    def _call(self, coroutine):
+        """Runs a coroutine on the coordinator loop and waits for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
     
-    def _handle_participant(self, client_socket, address):
-        """Handles a participant connection"""
+    async def _handle_participant(self, reader, writer):
+        """Handles a participant connection, many of these run concurrently"""
+        address = writer.get_extra_info('peername')
         try: # to receive participant data
-            data = self._receive_message(client_socket)
+            timings = dict.fromkeys(STAGES, 0.0)
+            data = await self._receive_message(reader, timings)
             participant_id = data['id']
-            encrypted_log = data['log']
             key = data['key']
             
+            log = await self._decode_upload(key, data['log'], timings)    # Decrypt while other participants keep uploading
+            self._register_cases(log)
+            
             self.participants[participant_id] = {       # Store participant info
-                'socket': client_socket,
+                'writer': writer,
                 'address': address,
                 'key': key
             }
-            
-            # Store encrypted log
-            self.logs[participant_id] = encrypted_log
+            self.logs.append((participant_id, log, timings))
             print(f"Received log from participant {participant_id}")
             print(f"Total participants connected: {len(self.participants)}")
+            async with self._registration:
+                self._registration.notify_all()
+
+            await self._receive_deltas(participant_id, reader)
 
         except Exception as e:
             print(f"Error handling participant: {e}")
             try:
-                self._send_message(client_socket, {'error': str(e)})        # Send error back to client
-            except:
+                await self._send_message(writer, {'error': str(e)})        # Send error back to client
+            except Exception:
                 pass
-            client_socket.close()
+            writer.close()
+
+    async def _receive_deltas(self, participant_id, reader):
+        """Keeps the session open and queues new cases uploaded by the participant"""
+        info = self.participants[participant_id]
+        while True:
+            timings = dict.fromkeys(STAGES, 0.0)
+            try:
+                data = await self._receive_message(reader, timings)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            if 'delta' in data:
+                delta = await self._decode_upload(info['key'], data['delta'], timings)
+                try:
+                    self._register_cases(delta)
+                except ValueError as e:     # Only this delta is rejected, the session and the queued uploads stay
+                    print(f"Rejected delta of participant {participant_id}: {e}")
+                    await self._send_message(info['writer'], {'error': str(e)})
+                    continue
+                self.logs.append((participant_id, delta, timings))
+                print(f"Received {delta['Case ID'].nunique()} new cases from participant {participant_id}")
+        info['connected'] = False
+        print(f"Participant {participant_id} disconnected")
+
+    def _register_cases(self, log):
+        """Reserves the case IDs of an upload, raises ValueError if the model or a queued upload already has one"""
+        case_ids = set(log['Case ID'].unique())
+        known_cases = case_ids & self._case_ids
+        if known_cases:
+            raise ValueError("Cases are already part of the model: " + ", ".join(str(case) for case in sorted(known_cases, key=str)[:10]))
+        self._case_ids.update(case_ids)
+
+    async def _decode_upload(self, key, token, timings):
+        """Hands decryption and decoding of an upload to the worker pool as soon as it arrives"""
+        if self.use_processes:
+            work = self.loop.run_in_executor(self.executor, _decrypt_payload, key, token)
+        else:
+            work = self.loop.run_in_executor(self.executor, _decrypt_log, key, token)
+        upload = asyncio.ensure_future(work)
+        self._pending_uploads.add(upload)
+        try:
+            result = await upload
+        finally:
+            self._pending_uploads.discard(upload)
+        if self.use_processes:
+            payload, timings['decrypt'] = result
+            start = time.perf_counter()
+            log = decode_event_log(payload)         # Zero-copy, cheap enough for the event loop
+            timings['decode'] = time.perf_counter() - start
+        else:
+            log, timings['decrypt'], timings['decode'] = result
+        return log
+
+    def wait_for_participants(self, min_participants, timeout=None):
+        """Blocks until min_participants have registered or the timeout (seconds) passed
+
+        Returns the number of registered participants.
+        """
+        return self._call(self._wait_for_participants(min_participants, timeout))
+
+    async def _wait_for_participants(self, min_participants, timeout):
+        async def registered():
+            async with self._registration:
+                await self._registration.wait_for(lambda: len(self.participants) >= min_participants)
+        try:
+            await asyncio.wait_for(registered(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Deadline reached with {len(self.participants)} of {min_participants} participants")
+        return len(self.participants)
     
-    def execute_secure_computation(self):
-        """Triggers the secure computation"""
-        if len(self.participants) < 2:
+    def _connected_participants(self):
+        """Participants whose session is still open"""
+        return {participant_id: info for participant_id, info in self.participants.items() if info.get('connected', True)}
+
+    def execute_secure_computation(self, k=None, t=None):
+        """Triggers the secure computation, k and t default to the privacy parameters"""
+        if len(self._connected_participants()) < 2:
             print(f"Not enough participants connected")
             return False
-            
+        return self._call(self._execute_secure_computation(self.k if k is None else k, self.t if t is None else t))
+
+    async def _execute_secure_computation(self, k, t):
         try:
-            print(f"Starting computation with {len(self.participants)} participants...")
-            self._run_analysis()
+            self.round += 1
+            print(f"Starting computation {self.round} (k={k}, t={t}) with {len(self._connected_participants())} participants...")
+            await self._run_analysis(k, t)
             return True
         except Exception as e:
             print(f"Error during computation: {e}")
-            # Send error message back to participants
-            for pid, info in self.participants.items():
-                try:
-                    self._send_message(info['socket'], {'error': str(e)})
-                except:
-                    pass
+            # Send error message back to the participants that are still connected
+            await asyncio.gather(*(self._send_message(info['writer'], {'error': str(e)})
+                                   for info in self._connected_participants().values()), return_exceptions=True)
             return False
     
-    def _receive_message(self, socket):
+    async def _receive_message(self, reader, timings=None):
         """Receives a message from a participant"""
-        message_length = int.from_bytes(socket.recv(4), byteorder='big')
-        
-        # Receive the message
-        data = b''
-        bytes_received = 0
-        while bytes_received < message_length:
-            chunk = socket.recv(min(4096, message_length - bytes_received))
-            data += chunk
-            bytes_received += len(chunk)
-        return pickle.loads(data)
+        message_length = int.from_bytes(await reader.readexactly(4), byteorder='big')
+        start = time.perf_counter()
+        data = await reader.readexactly(message_length)
+        if timings is not None:
+            timings['receive'] += time.perf_counter() - start
+        return decode_message(data)
     
-    def _send_message(self, socket, message):
+    async def _send_message(self, writer, message):
         """Sends a message to a participant"""
-        serialized = pickle.dumps(message)
+        serialized = encode_message(message)
         length = len(serialized).to_bytes(4, byteorder='big')
-        socket.sendall(length + serialized)
+        writer.write(length + serialized)
+        await writer.drain()
     
-    def _run_analysis(self):
+    async def _run_analysis(self, k, t):
         """Runs secure PRETSA analysis on the combined data"""
-        # 1. Decrypt and combine logs
-        combined_log = self._combine_logs()
+        # 1. Take the uploads that arrived since the last computation, including the ones still being decrypted
+        await asyncio.gather(*self._pending_uploads, return_exceptions=True)
+        new_logs, self.logs = self.logs, []
+        timings = dict.fromkeys(STAGES, 0.0)
+        for participant_id, log, upload_timings in new_logs:
+            for stage in ("receive", "decrypt", "decode"):
+                timings[stage] += upload_timings[stage]
         
-        # 2. Run PRETSA on the combined data
-        pretsa = Pretsa(combined_log)
-        cutout_cases, log_distance = pretsa.runPretsa(self.k, self.t)
-        privatized_log = pretsa.getPrivatisedEventLog()
+        # 2. Update the model and run PRETSA on the combined data, off the event loop
+        try:
+            await self.loop.run_in_executor(None, self._update_model, new_logs, timings)
+        except Exception:
+            self.logs = new_logs + self.logs        # Not part of the model, keep them for the next computation
+            raise
+        self._model_participants.update(participant_id for participant_id, log, upload_timings in new_logs)
+        privatized_log = await self.loop.run_in_executor(None, self._run_pretsa, k, t, timings)
         
-        # 3. Split results by participant ID
-        for participant_id, info in self.participants.items():
-            # Filter log for this participant
-            participant_log = privatized_log[privatized_log['Participant_ID'] == participant_id]
-            
-            if 'Participant_ID' in participant_log.columns:     # Remove participant ID column
-                participant_log = participant_log.drop('Participant_ID', axis=1)
-            
-            cipher = Fernet(info['key'])                        # Encrypt the result with the participant's key
-            encrypted_result = cipher.encrypt(pickle.dumps(participant_log))
-            
-            self._send_message(info['socket'], {'result': encrypted_result})    # Send result to participant
-            print(f"Sent privatized log to participant {participant_id}")
-    
-    def _combine_logs(self):
-        """Combines the logs"""
-        combined_df = pd.DataFrame()
-        for participant_id, log in self.logs.items():
-            cipher = Fernet(self.participants[participant_id]['key'])     # Decrypt the log with the participant's key
-            log_data = pickle.loads(cipher.decrypt(log))
-            
-            log_df = pd.DataFrame(log_data)             
-            log_df['Participant_ID'] = participant_id                     # Add a Participant_ID column to track which rows belong to which participant
+        # 3. Split results by participant ID, each slice is encrypted and sent as soon as it is ready
+        sends = []
+        splitStart = time.perf_counter()
+        for participant_id, participant_log in self._split_by_participant(privatized_log):
+            info = self.participants[participant_id]
+            sends.append(asyncio.ensure_future(self._send_result(participant_id, info, participant_log, k, t, timings)))
+            await asyncio.sleep(0)      # Let the send start while the next slice is cut
+        timings['split'] = time.perf_counter() - splitStart
+        await asyncio.gather(*sends)
+        self.run_timings.append(timings)
+        print("Stage timings of computation %d: %s" % (self.round, ", ".join("%s %.3fs" % (stage, timings[stage]) for stage in STAGES)))
+
+    def _update_model(self, new_logs, timings):
+        """Adds new uploads to the warm model and resets it to its unpruned state"""
+        start = time.perf_counter()
+        combined_log = self._combine_logs(new_logs) if new_logs else None
+        timings['combine'] = time.perf_counter() - start
+        start = time.perf_counter()
+        if self.model is None:
+            model = Pretsa(combined_log)
+            self._pristine = model.snapshot()
+            self.model = model
+        else:
+            self.model.restoreSnapshot(self._pristine)
+            if combined_log is not None:
+                self.model.addEventLog(combined_log)
+                self._pristine = self.model.snapshot()
+        timings['pretsa'] = time.perf_counter() - start
+
+    def _run_pretsa(self, k, t, timings):
+        """Runs PRETSA on the updated model"""
+        start = time.perf_counter()
+        cutout_cases, log_distance = self.model.runPretsa(k, t)
+        privatized_log = self.model.getPrivatisedEventLog()
+        timings['pretsa'] += time.perf_counter() - start
+        return privatized_log
 
-            combined_df = pd.concat([combined_df, log_df])                # Combine the logs
-        return combined_df
+    def _split_by_participant(self, privatized_log):
+        """Yields (participant_id, log) pairs using a single groupby over the privatized log"""
+        columns = [column for column in privatized_log.columns if column != 'Participant_ID']
+        connected = self._connected_participants()
+        remaining = {participant_id for participant_id in self._model_participants if participant_id in connected}
+        if 'Participant_ID' in privatized_log.columns:
+            for participant_id, participant_log in privatized_log.groupby('Participant_ID', sort=False, observed=True):
+                if participant_id in remaining:
+                    remaining.discard(participant_id)
+                    yield participant_id, participant_log[columns]
+        for participant_id in remaining:        # All cases of these participants were removed
+            yield participant_id, privatized_log.iloc[0:0][columns]
+
+    async def _send_result(self, participant_id, info, participant_log, k, t, timings):
+        # Encrypt the result with the participant's key
+        payload = await self.loop.run_in_executor(None, encode_event_log, participant_log)
+        encrypted_result, encryptTime = await self.loop.run_in_executor(self.executor, _encrypt_payload, info['key'], payload)
+        timings['encrypt'] += encryptTime
+        
+        start = time.perf_counter()
+        await self._send_message(info['writer'], {'result': encrypted_result, 'k': k, 't': t, 'round': self.round})    # Send result to participant
+        timings['send'] += time.perf_counter() - start
+        print(f"Sent privatized log to participant {participant_id}")
+    
+    def _combine_logs(self, uploads):
+        """Combines (participant_id, log, timings) uploads with a single concatenation"""
+        participant_ids = list(dict.fromkeys(participant_id for participant_id, log_df, timings in uploads))
+        codes = {participant_id: code for code, participant_id in enumerate(participant_ids)}
+        logs = []
+        for participant_id, log_df, timings in uploads:
+            code = codes[participant_id]
+            # Add a categorical Participant_ID column to track which rows belong to which participant
+            participant_column = pd.Categorical.from_codes(np.full(len(log_df), code, dtype=np.int32), categories=participant_ids)
+            logs.append(log_df.assign(Participant_ID=participant_column))
+        return pd.concat(logs, ignore_index=True)
 
 
 class MPCParticipant:
     """MPC participant for PRETSA analysis"""
     
-    def __init__(self, participant_id, event_log, coordinator_host='localhost', coordinator_port=5001):
+    def __init__(self, participant_id, event_log, coordinator_host='localhost', coordinator_port=5001, output_dir='.'):
         self.id = participant_id
         self.event_log = event_log
         self.coordinator_host = coordinator_host
         self.coordinator_port = coordinator_port
+        self.output_dir = output_dir
         self.key = Fernet.generate_key()  # Generate a unique encryption key
     
-    def connect_to_coordinator(self):
-        """Connects to the MPC coordinator and submit log"""
+    def connect_to_coordinator(self, wait_for_result=True):
+        """Connects to the MPC coordinator and submit log
+
+        With wait_for_result the first privatized log is returned, otherwise the session stays
+        open for submit_delta and receive_result.
+        """
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)    # Connect to coordinator
             self.socket.connect((self.coordinator_host, self.coordinator_port))
             
-            cipher = Fernet(self.key)
-            encrypted_log = cipher.encrypt(pickle.dumps(self.event_log))        # Encrypt our event log
-            
             self._send_message({        # Send log to the coordinator
                 'id': self.id,
-                'log': encrypted_log,
+                'log': self._encrypt_log(self.event_log),
                 'key': self.key
             })
             
             print(f"Sent encrypted log to coordinator")
-            
-            try:    # to wait for the result
-                result = self._receive_message()
                 
-                if 'error' in result:
-                    print(f"Coordinator returned error: {result['error']}")
-                    return None
-                    
-                privatized_log = pickle.loads(cipher.decrypt(result['result']))     # Decrypt the result
-                
-                output_path = f"privatized_{self.id}.csv"               
-                privatized_log.to_csv(output_path, sep=";", index=False)            # Save the privatized log to a file 
-                print(f"Received and saved privatized log")
-                
-                return privatized_log
-            except Exception as e:
-                print(f"Error receiving result: {e}")
+        except Exception as e:
+            print(f"Error connecting to coordinator: {e}")
+            return None
+
+        if not wait_for_result:
+            return True
+        return self.receive_result()
+
+    def submit_delta(self, event_log):
+        """Uploads cases that are new since the last upload, the coordinator adds them to the next computation"""
+        self._send_message({'id': self.id, 'delta': self._encrypt_log(event_log)})
+        print(f"Sent {event_log['Case ID'].nunique()} new cases to coordinator")
+
+    def receive_result(self, timeout=300.0):
+        """Waits for the next privatized log of the session and saves it"""
+        try:    # to wait for the result
+            result = self._receive_message(timeout)
+            
+            if 'error' in result:
+                print(f"Coordinator returned error: {result['error']}")
                 return None
                 
+            privatized_log = decode_event_log(Fernet(self.key).decrypt(result['result']))     # Decrypt the result
+            
+            output_path = os.path.join(self.output_dir, f"privatized_{self.id}_k{result['k']}_t{result['t']}.csv")
+            privatized_log.to_csv(output_path, sep=";", index=False)            # Save the privatized log to a file 
+            print(f"Received and saved privatized log of round {result['round']} (k={result['k']}, t={result['t']})")
+            
+            return privatized_log
         except Exception as e:
-            print(f"Error connecting to coordinator: {e}")
+            print(f"Error receiving result: {e}")
             return None
+
+    def close(self):
+        """Ends the session"""
+        self.socket.close()
+
+    def _encrypt_log(self, event_log):
+        payload = encode_event_log(event_log, columns=PRETSA_COLUMNS)   # Only send the columns PRETSA uses
+        return Fernet(self.key).encrypt(payload)                        # Encrypt our event log
     
     def _send_message(self, message):
         """Sends a message to the coordinator"""
-        serialized = pickle.dumps(message)
+        serialized = encode_message(message)
         length = len(serialized).to_bytes(4, byteorder='big')
         self.socket.sendall(length + serialized)
+
+    def _receive_exactly(self, message_length):
+        data = bytearray()
+        while len(data) < message_length:
+            chunk_size = min(65536, message_length - len(data))
+            chunk = self.socket.recv(chunk_size)
+            if not chunk:
+                raise Exception(f"Connection closed after receiving {len(data)} of {message_length} bytes")
+            data += chunk
+        return data
     
-    def _receive_message(self):
-        """Receives a message from the coordinator with timeout"""
+    def _receive_message(self, timeout=300.0):
+        """Receives a message from the coordinator with timeout (None waits forever)"""
         try:
             # Set socket timeout to prevent hanging
-            self.socket.settimeout(300.0)  # 300 second timeout
+            self.socket.settimeout(timeout)
             
             # Get message length
-            length_bytes = self.socket.recv(4)
-            if not length_bytes or len(length_bytes) < 4:
-                raise Exception("Connection closed or invalid length received")
-                
-            message_length = int.from_bytes(length_bytes, byteorder='big')
+            message_length = int.from_bytes(self._receive_exactly(4), byteorder='big')
             
             # Receive the message
-            data = b''
-            bytes_received = 0
-            while bytes_received < message_length:
-                chunk_size = min(4096, message_length - bytes_received)
-                chunk = self.socket.recv(chunk_size)
-                if not chunk:
-                    raise Exception(f"Connection closed after receiving {bytes_received} of {message_length} bytes")
-                data += chunk
-                bytes_received += len(chunk)
+            data = self._receive_exactly(message_length)
             
             # Reset timeout
             self.socket.settimeout(None)
-            return pickle.loads(data)
+            return decode_message(data)
         except socket.timeout:
-            raise Exception("Connection timed out while receiving data")
\ No newline at end of file
+            raise Exception("Connection timed out while receiving data")
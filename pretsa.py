@@ -1,7 +1,11 @@
 from anytree import AnyNode, PreOrderIter
 from levenshtein import levenshtein
+from event_log_variants import extract_variants, get_variant_strings
+from tcloseness import ActivityDistribution, violates_t_closeness
+from pretsa_stats import RunStats, get_rss
+from distance_matrix import LazyDistanceMatrix
+from pretsa_checkpoint import Checkpoint, get_model_digest
 import sys
-from scipy.stats import wasserstein_distance
 from scipy.stats import normaltest
 import pandas as pd
 import numpy as np
@@ -10,9 +14,13 @@ import hashlib
 import uuid
 
 class Pretsa:
-    def __init__(self, current_log, previous_logs=None):
+    def __init__(self, current_log, previous_logs=None, memory_budget=None, memory_tracking=None, previous_traces=None, distance_cache=None):
         self.current_log = current_log
         self.previous_logs = previous_logs
+        # Optional distance_matrix.DistanceCache, e.g. the one a release_state.ReleaseState keeps across periods
+        self._distanceCache = distance_cache
+        # RSS in bytes above which the distance matrix is computed lazily (and Pretsa_star prunes its queue)
+        self._memoryBudget = memory_budget
 
         # Define standard column names
         self.__caseIDColName = "Case ID"
@@ -26,31 +34,72 @@ class Pretsa:
         
         # Rest of initialization code...
         root = AnyNode(id='Root', name="Root", cases=set(), sequence="", annotation=dict(),sequences=set())
-        current = root
-        currentCase = ""
-        caseToSequenceDict = dict()
-        sequence = None
+        self._tree = root
+        # Cases are integer handles into _caseIDs in the tree and in every dict keyed by case, the ids are only used at export
+        self._caseIDs = []
+        self._caseToSequenceDict = dict()
         self.__annotationDataOverAll = dict()
         self.__normaltest_alpha = 0.05
         self.__normaltest_result_storage = dict()
         self.__normalTCloseness = True
+        self._stats = RunStats(memory=memory_tracking)
+        self._checkpoint = None
+        self._resumeFromCheckpoint = False
         
-        # Track all traces seen in previous logs
+        # Track all traces seen in previous logs, previous_traces are the sequences of logs that were read before
+        self.__previous_traces = None
         if self.previous_logs:
             print("Extracting previous traces...")
             self.__previous_traces = set()
             self.__extract_previous_traces()
+        if previous_traces is not None:
+            self.__previous_traces = (self.__previous_traces or set()).union(previous_traces)
         
         # Process current log
-        for index, row in current_log.iterrows():
+        with self._stats.phase("tree_build"):
+            self.__addEventsToTree(current_log)
+        self.__numberOfTracesOriginal = len(self._tree.cases)
+        self._sequentialPrunning = True
+        self.__setMaxDifferences()
+        self.__haveAllValuesInActivitityDistributionTheSameValue = dict()
+        with self._stats.phase("distance_matrix"):
+            self._distanceMatrix = self.__generateDistanceMatrixSequences(self._getAllPotentialSequencesTree(self._tree))
+        self._closestSequencesCache = dict()
+        self._tClosenessCache = dict()
+        self._trajectory = None
+
+    def __internCaseIDs(self, caseIDs):
+        #New case ids get the next handles in their sorted order, known ones keep their handle.
+        #All events of a case share one int object, like the events of a categorical share one id string
+        codes, uniques = pd.factorize(caseIDs, sort=True, use_na_sentinel=False)
+        uniques = np.asarray(uniques, dtype=object)
+        handles = pd.Index(self._caseIDs, dtype=object).get_indexer(uniques)
+        isNew = handles < 0
+        handles[isNew] = len(self._caseIDs) + np.arange(np.count_nonzero(isNew))
+        self._caseIDs.extend(uniques[isNew].tolist())
+        handles = handles.tolist()
+        return [handles[code] for code in codes.tolist()]
+
+    def _getCaseIDs(self, cases):
+        """The case ids of a set of case handles"""
+        return {self._caseIDs[case] for case in cases}
+
+    def __addEventsToTree(self, eventLog):
+        root = self._tree
+        current = root
+        currentCase = None
+        caseToSequenceDict = self._caseToSequenceDict
+        sequence = None
+        caseHandles = self.__internCaseIDs(eventLog[self.__caseIDColName])
+        for (index, row), case in zip(eventLog.iterrows(), caseHandles):
             activity = row[self.__activityColName]
             annotation = row[self.__annotationColName]
-            if row[self.__caseIDColName] != currentCase:
+            if case != currentCase:
                 current = root
                 if not sequence is None:
                     caseToSequenceDict[currentCase] = sequence
                     current.sequences.add(sequence)
-                currentCase = row[self.__caseIDColName]
+                currentCase = case
                 current.cases.add(currentCase)
                 sequence = ""
                 
@@ -70,17 +119,85 @@ class Pretsa:
             current.cases.add(currentCase)
             current.annotations[currentCase] = annotation
             self.__addAnnotation(annotation, activity)
-        if currentCase:  # Check if we processed any cases
+        if currentCase is not None:  # Check if we processed any cases
             caseToSequenceDict[currentCase] = sequence
             root.sequences.add(sequence)
-            
-        self._tree = root
-        self._caseToSequenceDict = caseToSequenceDict
+
+    def addEventLog(self, eventLog):
+        """Adds the cases of eventLog to the model without rebuilding it
+
+        Must be called on an unpruned tree (e.g. right after restoreSnapshot) and eventLog may only
+        contain cases that are not in the model yet. Only the distances of new variants are computed.
+        """
+        knownCases = set(eventLog[self.__caseIDColName].unique()).intersection(self._caseIDs)
+        if knownCases:
+            raise ValueError("Cases are already part of the model: " + ", ".join(str(case) for case in list(knownCases)[:10]))
+        with self._stats.phase("tree_build"):
+            self.__addEventsToTree(eventLog)
         self.__numberOfTracesOriginal = len(self._tree.cases)
-        self._sequentialPrunning = True
         self.__setMaxDifferences()
         self.__haveAllValuesInActivitityDistributionTheSameValue = dict()
-        self._distanceMatrix = self.__generateDistanceMatrixSequences(self._getAllPotentialSequencesTree(self._tree))
+        self.__normaltest_result_storage = dict()
+        with self._stats.phase("distance_matrix"):
+            self.__extendDistanceMatrix(self._getAllPotentialSequencesTree(self._tree))
+        self._closestSequencesCache = dict()
+        self._tClosenessCache = dict()
+
+    def snapshot(self):
+        """Returns a copy of the current tree state that restoreSnapshot can reset the model to
+
+        The distance matrix and annotation distributions are not part of the snapshot, runPretsa does not change them.
+        """
+        return {
+            "tree": self._copyTree(self._tree),
+            "caseToSequenceDict": self._caseToSequenceDict.copy(),
+            "caseToParticipantDict": self.__caseToParticipantDict.copy()
+        }
+
+    def restoreSnapshot(self, snapshot):
+        """Resets the tree state to a snapshot, e.g. to run PRETSA again with other parameters"""
+        self._tree = self._copyTree(snapshot["tree"])
+        self._caseToSequenceDict = snapshot["caseToSequenceDict"].copy()
+        self.__caseToParticipantDict = snapshot["caseToParticipantDict"].copy()
+
+    @classmethod
+    def fromModel(cls, model, snapshot=None, **kwargs):
+        """Creates a new instance (of this class or a subclass) from an already built model
+
+        The input dependent parts (annotation distributions, distance matrix) are shared with model,
+        the tree state is copied from snapshot (default: the current state of model). Keyword
+        arguments are handed to _initializeRunState.
+        """
+        pretsa = cls.__new__(cls)
+        pretsa.__dict__.update(model.__dict__)
+        pretsa.restoreSnapshot(snapshot if snapshot is not None else model.snapshot())
+        pretsa._stats = model._stats.copy()
+        pretsa.__haveAllValuesInActivitityDistributionTheSameValue = dict()
+        pretsa.__normaltest_result_storage = dict()
+        pretsa._initializeRunState(**kwargs)
+        return pretsa
+
+    @staticmethod
+    def sweep(eventLog, ks, ts, algorithms=("pretsa",), filePath=None, workers=None, timeout=None, scheduler=None):
+        """Runs every (k, t, algorithm) combination from one model, see pretsa_sweep.run_sweep"""
+        from pretsa_sweep import run_sweep
+        return run_sweep(eventLog, ks, ts, algorithms=algorithms, filePath=filePath, workers=workers, timeout=timeout,
+                         scheduler=scheduler)
+
+    def _initializeRunState(self):
+        """Hook for subclasses to set up state that depends on the finished model"""
+        pass
+
+    def _copyTree(self, tree):
+        """Copies a tree; cheaper than copy.deepcopy as only the mutable case sets and annotations are copied"""
+        copies = dict()
+        for node in PreOrderIter(tree):
+            if node is tree:
+                nodeCopy = AnyNode(id=node.id, name=node.name, cases=node.cases.copy(), sequence=node.sequence, annotation=dict(), sequences=node.sequences.copy())
+            else:
+                nodeCopy = AnyNode(id=node.id, name=node.name, parent=copies[id(node.parent)], cases=node.cases.copy(), sequence=node.sequence, annotations=node.annotations.copy())
+            copies[id(node)] = nodeCopy
+        return copies[id(tree)]
 
     def __extract_previous_traces(self):
         """Extract all traces (sequences) from previous logs"""
@@ -89,27 +206,8 @@ class Pretsa:
             
         for prev_log in self.previous_logs:         # Iterate over all previous logs
             print(f"Processing previous log with {len(prev_log)} events...")
-            sequences = set()
-            current_case = None
-            current_sequence = ""
-            
-            for _, row in prev_log.iterrows():      # Iterate over all rows in that log
-                case_id = row[self.__caseIDColName]
-                activity = row[self.__activityColName]
-                
-                if case_id != current_case:         # New case
-                    if current_case is not None and current_sequence:   
-                        sequences.add(current_sequence)     
-                    current_case = case_id
-                    current_sequence = ""
-                
-                current_sequence = current_sequence + "@" + activity    # Append activity to sequence
-            
-            # Add the last sequence
-            if current_sequence:
-                sequences.add(current_sequence)
-                
-            self.__previous_traces.update(sequences)
+            variants = extract_variants(prev_log, caseIDColName=self.__caseIDColName, activityColName=self.__activityColName)
+            self.__previous_traces.update(get_variant_strings(variants))
 
     def set_privacy_parameters(self, epsilon=1.0, delta=0.0):      # Sets the privacy parameters
         """Set differential privacy parameters"""
@@ -124,10 +222,10 @@ class Pretsa:
 
     def __setMaxDifferences(self):
         self.annotationMaxDifferences = dict()
+        self.__activityDistributions = dict()
         for key in self.__annotationDataOverAll.keys():
-            maxVal = max(self.__annotationDataOverAll[key])
-            minVal = min(self.__annotationDataOverAll[key])
-            self.annotationMaxDifferences[key] = abs(maxVal - minVal)
+            self.__activityDistributions[key] = ActivityDistribution(self.__annotationDataOverAll[key])
+            self.annotationMaxDifferences[key] = self.__activityDistributions[key].maxDifference
 
     def _violatesTCloseness(self, activity, annotations, t, cases):
         distributionActivity = self.__annotationDataOverAll[activity]
@@ -142,20 +240,42 @@ class Pretsa:
         if maxDifference == 0.0: #All annotations have the same value(most likely= 0.0)
             return
         if self.__normalTCloseness == True:
-            return ((wasserstein_distance(distributionActivity,distributionEquivalenceClass)/maxDifference) >= t)
+            return violates_t_closeness(self.__activityDistributions[activity], distributionEquivalenceClass, t)
         else:
             return self._violatesStochasticTCloseness(distributionActivity,distributionEquivalenceClass,t,activity)
 
+    def __nodeViolatesTCloseness(self, node, t):
+        #The result only depends on the cases in the node and, for stochastic t-closeness, on the flag the first
+        #check of the activity in this run stored, remember it for the last case set of every node
+        self._stats.count("tcloseness_checks")
+        if self.__normalTCloseness or node.name in self.__haveAllValuesInActivitityDistributionTheSameValue:
+            key = (node.sequence, t, self.__normalTCloseness, self.__haveAllValuesInActivitityDistributionTheSameValue.get(node.name, None))
+            cached = self._tClosenessCache.get(key, None)
+            if cached is not None and cached[0] == node.cases:
+                self._stats.count("tcloseness_cache_hits")
+                return cached[1]
+        with self._stats.phase("tcloseness"):
+            violates = bool(self._violatesTCloseness(node.name, node.annotations, t, node.cases))
+        key = (node.sequence, t, self.__normalTCloseness, self.__haveAllValuesInActivitityDistributionTheSameValue.get(node.name, None))
+        self._tClosenessCache[key] = (frozenset(node.cases), violates)
+        return violates
+
     def _treePrunning(self, k,t):
+        self._stats.count("pruning_rounds")
         cutOutTraces = set()
+        minCasesBeforeCut = sys.maxsize
         for node in PreOrderIter(self._tree):
             if node != self._tree:
                 node.cases = node.cases.difference(cutOutTraces)
-                if len(node.cases) < k or self._violatesTCloseness(node.name, node.annotations, t, node.cases):
+                if len(node.cases) < k or self.__nodeViolatesTCloseness(node, t):
                     cutOutTraces = cutOutTraces.union(node.cases)
                     self._cutCasesOutOfTreeStartingFromNode(node,cutOutTraces)
                     if self._sequentialPrunning:
+                        #Nodes before the cut node passed with at least minCasesBeforeCut cases, so any k up to it cuts the same node
+                        self._lastPrunedNode = (node.sequence, minCasesBeforeCut)
                         return cutOutTraces
+                else:
+                    minCasesBeforeCut = min(minCasesBeforeCut, len(node.cases))
         return cutOutTraces
 
     def _cutCasesOutOfTreeStartingFromNode(self,node,cutOutTraces,tree=None):
@@ -192,50 +312,173 @@ class Pretsa:
                         currentNode = child
                         break
 
+    def __getClosestSequences(self, sequence):
+        #All other sequences ordered by distance and then alphabetically, the order the sorted search below visits them in
+        closestSequences = self._closestSequencesCache.get(sequence, None)
+        if closestSequences is None:
+            closestSequences = sorted((distance, otherSequence) for otherSequence, distance in self._distanceMatrix[sequence].items())
+            #With a lazy distance matrix these lists would add up to the full matrix again
+            if not isinstance(self._distanceMatrix, LazyDistanceMatrix):
+                self._closestSequencesCache[sequence] = closestSequences
+        return closestSequences
+
     def __combineTracesAndTree(self, traces):
-        #We transform the set of sequences into a list and sort it, to discretize the behaviour of the algorithm
-        sequencesTree = list(self._getAllPotentialSequencesTree(self._tree))
-        sequencesTree.sort()
+        #The closest sequence still in the tree wins, ties go to the alphabetically first one to discretize the behaviour of the algorithm
+        sequencesTree = self._getAllPotentialSequencesTree(self._tree)
+        assignments = []
         for trace in traces:
             bestSequence = ""
             #initial value as high as possible
             lowestDistance = sys.maxsize
             traceSequence = self._caseToSequenceDict[trace]
-            for treeSequence in sequencesTree:
-                currentDistance = self._getDistanceSequences(traceSequence, treeSequence)
-                if currentDistance < lowestDistance:
+            for currentDistance, treeSequence in self.__getClosestSequences(traceSequence):
+                self._stats.count("distance_lookups")
+                if treeSequence in sequencesTree:
                     bestSequence = treeSequence
                     lowestDistance = currentDistance
+                    break
             self._overallLogDistance += lowestDistance
             self._addCaseToTree(trace, bestSequence)
+            assignments.append((trace, bestSequence, lowestDistance))
+        return assignments
+
+    def stats(self):
+        """Phase timings (seconds and calls) and counters recorded since the model was built
+
+        Phases: tree_build, distance_matrix, replay, pruning, tcloseness (the checks not answered from the cache),
+        reassignment, differential_privacy, export and for Pretsa_star search and tcloseness_noise.
+        Counters: pruning_rounds, tcloseness_checks, tcloseness_cache_hits, distance_lookups, reassigned_cases,
+        replayed_steps and for Pretsa_star search_expansions, states_evaluated and max_queue_size.
+        With memory_tracking every phase also has its peak_memory in bytes. memory_budget_exceeded,
+        lazy_distance_matrix and for Pretsa_star pruned_operations count what the memory budget changed.
+        """
+        return self._stats.as_dict()
+
+    def getTrajectory(self):
+        """Pruning steps of the last sequential run, can be handed to runPretsa(warmStart=...) of a run with a larger k"""
+        return self._trajectory
+
+    def setCheckpoint(self, filePath, interval=600.0, resume=False):
+        """runPretsa saves its progress to filePath every interval seconds, see pretsa_checkpoint.Checkpoint
+
+        With resume runPretsa continues from the progress an interrupted run with the same parameters saved
+        for the same log, with the same result. The checkpoint is removed when runPretsa finishes.
+        """
+        self._checkpoint = Checkpoint(filePath, interval)
+        self._resumeFromCheckpoint = resume
+
+    def _getCheckpointKey(self, *parameters):
+        if self._checkpoint is None:
+            return None
+        return (type(self).__name__, parameters, get_model_digest(self._caseToSequenceDict))
+
+    def _loadCheckpoint(self, key):
+        #The random state is the one the interrupted run started with, so the random parts after the search are the same
+        if key is None or not self._resumeFromCheckpoint:
+            return None
+        state = self._checkpoint.load(key)
+        if state is not None:
+            print("Resuming from " + self._checkpoint.filePath)
+            np.random.set_state(state["randomState"])
+            self._stats.count("resumed_from_checkpoint")
+        return state
 
-    def runPretsa(self, k, t, normalTCloseness=True, differentialPrivacy=False):
+    def _saveCheckpointIfDue(self, key, state):
+        if key is not None and self._checkpoint.is_due():
+            with self._stats.phase("checkpoint"):
+                self._checkpoint.save(key, state)
+            self._stats.count("checkpoints_saved")
+
+    def _removeCheckpoint(self):
+        if self._checkpoint is not None:
+            self._checkpoint.remove()
+
+    def __getReusableSteps(self, warmStart, k, t, normalTCloseness):
+        #A recorded step is also the next step for a larger k as long as every node checked before its cut node had at least k cases
+        #and the cut node gets its t-closeness checked in both runs or in neither, so the same checks run in the same order
+        if warmStart is None or not self._sequentialPrunning:
+            return []
+        if warmStart["t"] != t or warmStart["normalTCloseness"] != normalTCloseness or warmStart["k"] > k or warmStart["traces"] != self.__numberOfTracesOriginal:
+            return []
+        steps = []
+        for step in warmStart["steps"]:
+            if step["minCasesBeforeCut"] < k or step["k"] <= len(step["cases"]) < k:
+                break
+            steps.append(step)
+        return steps
+
+    def __replayPrunningSteps(self, steps):
+        nodes = {node.sequence: node for node in PreOrderIter(self._tree)}
+        cutOutCases = set()
+        for step in steps:
+            node = nodes[step["node"]]
+            if node.cases != step["cases"]:     #Not the state the step was recorded in, continue without warm start
+                break
+            cutOutCase = set(node.cases)
+            self._cutCasesOutOfTreeStartingFromNode(node, cutOutCase)
+            for trace, sequence, distance in step["assignments"]:
+                self._overallLogDistance += distance
+                self._addCaseToTree(trace, sequence)
+            cutOutCases = cutOutCases.union(cutOutCase)
+            self.__haveAllValuesInActivitityDistributionTheSameValue = dict(step["sameValueFlags"])
+            self._trajectory["steps"].append(step)
+        return cutOutCases
+
+    def runPretsa(self, k, t, normalTCloseness=True, differentialPrivacy=False, warmStart=None):
+        """Runs PRETSA, warmStart is the trajectory of a run of the same model with a smaller or equal k and the same t
+
+        The steps of the warm start that provably are the same for k are replayed without checking the tree,
+        from the first step that could differ on the run continues like a cold start. A checkpoint
+        (see setCheckpoint) is the trajectory so far, resuming replays it like a warm start.
+        """
         # First run the original PRETSA algorithm
         self.__normalTCloseness = normalTCloseness
         if not self.__normalTCloseness:
             self.__haveAllValuesInActivitityDistributionTheSameValue = dict()
         self._overallLogDistance = 0.0
+        checkpointKey = self._getCheckpointKey(k, t, normalTCloseness, self._sequentialPrunning)
+        randomState = np.random.get_state()
+        checkpoint = self._loadCheckpoint(checkpointKey)
+        if checkpoint is not None:
+            randomState = checkpoint["randomState"]
+            warmStart = checkpoint["trajectory"]
         if self._sequentialPrunning:
-            cutOutCases = set()
-            cutOutCase = self._treePrunning(k,t)
+            self._trajectory = {"k": k, "t": t, "normalTCloseness": normalTCloseness, "traces": self.__numberOfTracesOriginal, "steps": []}
+            with self._stats.phase("replay"):
+                cutOutCases = self.__replayPrunningSteps(self.__getReusableSteps(warmStart, k, t, normalTCloseness))
+            self._trajectory["replayedSteps"] = len(self._trajectory["steps"])
+            self._stats.count("replayed_steps", self._trajectory["replayedSteps"])
+            with self._stats.phase("pruning"):
+                cutOutCase = self._treePrunning(k,t)
             while len(cutOutCase) > 0:
-                self.__combineTracesAndTree(cutOutCase)
+                prunedNode, minCasesBeforeCut = self._lastPrunedNode
+                with self._stats.phase("reassignment"):
+                    assignments = self.__combineTracesAndTree(cutOutCase)
+                self._trajectory["steps"].append({"node": prunedNode, "k": k, "minCasesBeforeCut": minCasesBeforeCut, "cases": cutOutCase, "assignments": assignments,
+                                                  "sameValueFlags": dict(self.__haveAllValuesInActivitityDistributionTheSameValue)})
                 cutOutCases = cutOutCases.union(cutOutCase)
-                cutOutCase = self._treePrunning(k,t)
+                self._saveCheckpointIfDue(checkpointKey, {"randomState": randomState, "trajectory": self._trajectory})
+                with self._stats.phase("pruning"):
+                    cutOutCase = self._treePrunning(k,t)
         else:
-            cutOutCases = self._treePrunning(k,t)
-            self.__combineTracesAndTree(cutOutCases)
+            with self._stats.phase("pruning"):
+                cutOutCases = self._treePrunning(k,t)
+            with self._stats.phase("reassignment"):
+                self.__combineTracesAndTree(cutOutCases)
+        self._stats.count("reassigned_cases", len(cutOutCases))
             
         if differentialPrivacy:     # If differential privacy is enabled apply it
-            self.__apply_differential_privacy(self.__epsilon)
+            with self._stats.phase("differential_privacy"):
+                self.__apply_differential_privacy(self.__epsilon)
+        self._removeCheckpoint()
             
-        return cutOutCases, self._overallLogDistance
+        return self._getCaseIDs(cutOutCases), self._overallLogDistance
         
     def __apply_differential_privacy(self, epsilon):
         """Apply differential privacy to the sanitized event log using Laplace mechanism."""
         print(f"Applying differential privacy with epsilon of {epsilon}")
         
-        if epsilon <= 0 or not self.previous_logs:
+        if epsilon <= 0 or self.__previous_traces is None:
             print("Invalid epsilon value or no previous logs provided. Skipping differential privacy.")
             return
 
@@ -253,7 +496,8 @@ class Pretsa:
         print("There are", len(self._tree.sequences), "sequences")
         matches_found = 0
         
-        for sequence in list(self._tree.sequences):
+        # Sequences and cases in sorted order, so that the random draws do not depend on the hash seed of the process
+        for sequence in sorted(self._tree.sequences):
             cases_with_sequence = {case for case in self._tree.cases if self._caseToSequenceDict.get(case) == sequence}
             sequence_count = len(cases_with_sequence)
             
@@ -274,7 +518,7 @@ class Pretsa:
                 
                 if noisy_count < sequence_count:            # If noisy count is significantly different, adjust the sequence
                     cases_to_remove = np.random.choice(
-                        list(cases_with_sequence), 
+                        sorted(cases_with_sequence), 
                         size=min(sequence_count - noisy_count, sequence_count), 
                         replace=False
                     ) 
@@ -297,7 +541,7 @@ class Pretsa:
         for i in range(len(sequences_to_remove)):
             case_id = removed_case_ids[i]
             if self._tree.sequences:
-                sequence = np.random.choice(list(self._tree.sequences))
+                sequence = np.random.choice(sorted(self._tree.sequences))
                 
                 if self.__participantIDColName and case_id in self.__caseToParticipantDict:     # Preserve the participant ID when creating a synthetic case (for mpc_pretsa)
                     self.__caseToParticipantDict[case_id] = self.__caseToParticipantDict[case_id]
@@ -335,7 +579,7 @@ class Pretsa:
     def getEvent(self,case,node):
         event = {
             self.__activityColName: node.name,
-            self.__caseIDColName: case,
+            self.__caseIDColName: self._caseIDs[case],
             self.__annotationColName: node.annotations.get(case, self.__generateNewAnnotation(node.name)),
             self.__constantEventNr: node.depth
         }
@@ -349,10 +593,15 @@ class Pretsa:
     def getEventsOfNode(self, node):
         events = []
         if node != self._tree:
-            events = events + [self.getEvent(case, node) for case in node.cases]
+            #Sorted, the generated annotations are drawn in this order
+            events = events + [self.getEvent(case, node) for case in sorted(node.cases)]
         return events
 
     def getPrivatisedEventLog(self):
+        with self._stats.phase("export"):
+            return self.__getPrivatisedEventLog()
+
+    def __getPrivatisedEventLog(self):
         events = []
         self.__normaltest_result_storage = dict()
         nodeEvents = [self.getEventsOfNode(node) for node in PreOrderIter(self._tree)]
@@ -364,19 +613,53 @@ class Pretsa:
         return eventLog
 
 
+    def _isOverMemoryBudget(self):
+        return self._memoryBudget is not None and get_rss() > self._memoryBudget
+
+    def __switchToLazyDistanceMatrix(self, sequences):
+        print("Memory budget exceeded, distances are computed when they are needed")
+        self._stats.count("memory_budget_exceeded")
+        self._stats.count("lazy_distance_matrix")
+        return LazyDistanceMatrix(sequences, distanceCache=self._distanceCache)
+
+    def __levenshtein(self, sequence1, sequence2):
+        if self._distanceCache is None:
+            return levenshtein(sequence1,sequence2)
+        return self._distanceCache.get_distance(sequence1,sequence2)
+
     def __generateDistanceMatrixSequences(self,sequences):
         distanceMatrix = dict()
         for sequence1 in sequences:
             distanceMatrix[sequence1] = dict()
             for sequence2 in sequences:
                 if sequence1 != sequence2:
-                    distanceMatrix[sequence1][sequence2] = levenshtein(sequence1,sequence2)
+                    distanceMatrix[sequence1][sequence2] = self.__levenshtein(sequence1,sequence2)
+            if self._isOverMemoryBudget():
+                return self.__switchToLazyDistanceMatrix(sequences)
         print("Generated Distance Matrix")
         return distanceMatrix
 
+    def __extendDistanceMatrix(self, sequences):
+        if isinstance(self._distanceMatrix, LazyDistanceMatrix):
+            self._distanceMatrix.add_sequences(sequences)
+            return
+        newSequences = [sequence for sequence in sequences if sequence not in self._distanceMatrix]
+        for sequence1 in newSequences:
+            self._distanceMatrix[sequence1] = dict()
+        for sequence1 in newSequences:
+            for sequence2 in sequences:
+                if sequence1 != sequence2 and sequence2 not in self._distanceMatrix[sequence1]:
+                    distance = self.__levenshtein(sequence1,sequence2)
+                    self._distanceMatrix[sequence1][sequence2] = distance
+                    self._distanceMatrix[sequence2][sequence1] = distance
+            if self._isOverMemoryBudget():
+                self._distanceMatrix = self.__switchToLazyDistanceMatrix(sequences)
+                return
+
     def _getDistanceSequences(self, sequence1, sequence2):
         if sequence1 == "" or sequence2 == "" or sequence1 == sequence2:
             return sys.maxsize
+        self._stats.count("distance_lookups")
         try:
             distance = self._distanceMatrix[sequence1][sequence2]
         except KeyError:
@@ -0,0 +1,115 @@
+import argparse
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from tcloseness import ActivityDistribution
+
+caseIdColName = "Case ID"
+variantColName = "Variant"
+activityColName = "Activity"
+durationColName = "Duration"
+
+# The log as read (all values as strings, so written logs keep them unchanged) and per event its
+# variant code, activity code and duration. variant_counts holds the number of cases per variant.
+BaselineLog = namedtuple("BaselineLog", ["event_log", "variant_codes", "activity_codes", "durations", "variant_counts"])
+
+
+def load_baseline_log(filePath):
+    eventLog = pd.read_csv(filePath, delimiter=";", dtype=str, keep_default_na=False)
+    variantCodes, variants = pd.factorize(eventLog[variantColName])
+    activityCodes, _ = pd.factorize(eventLog[activityColName])
+    durations = eventLog[durationColName].astype(float).to_numpy()
+    caseIDs = eventLog[caseIdColName].to_numpy()
+    # a case starts wherever the Case ID changes, it is counted for the variant of its first event
+    caseStarts = np.concatenate((caseIDs[:1] != "", caseIDs[1:] != caseIDs[:-1]))
+    variantCounts = np.bincount(variantCodes[caseStarts], minlength=len(variants))
+    return BaselineLog(eventLog, variantCodes, activityCodes, durations, variantCounts)
+
+
+def get_k_anonymous_events(baselineLog, k):
+    """Events of the variants with at least k cases"""
+    return (baselineLog.variant_counts >= k)[baselineLog.variant_codes]
+
+
+def get_tcloseness_scores(baselineLog, events):
+    """Per variant the largest normalized Wasserstein distance between the durations of one of its activities and
+    the durations of that activity in all given events
+
+    A variant violates t-closeness for every t up to its score, variants without events get -inf.
+    Activities whose durations all have the same value are never violated.
+    """
+    scores = np.full(len(baselineLog.variant_counts), -np.inf)
+    eventIndices = np.flatnonzero(events)
+    if len(eventIndices) == 0:
+        return scores
+    activityCodes = baselineLog.activity_codes[eventIndices]
+    order = np.argsort(activityCodes, kind="stable")
+    activityCodes = activityCodes[order]
+    variantCodes = baselineLog.variant_codes[eventIndices][order]
+    durations = baselineLog.durations[eventIndices][order]
+    activityStarts = np.flatnonzero(np.concatenate(([True], activityCodes[1:] != activityCodes[:-1])))
+    for activityStart, activityEnd in zip(activityStarts, np.append(activityStarts[1:], len(order))):
+        distributionActivity = ActivityDistribution(durations[activityStart:activityEnd])
+        if distributionActivity.maxDifference == 0.0:    # All annotations have the same value(most likely= 0.0)
+            continue
+        # every variant with events of the activity is one equivalence class, all are compared in one call
+        variants, classes = np.unique(variantCodes[activityStart:activityEnd], return_inverse=True)
+        distances = distributionActivity.wasserstein_distances(durations[activityStart:activityEnd], classes)
+        scores[variants] = np.maximum(scores[variants], distances / distributionActivity.maxDifference)
+    return scores
+
+
+def get_baseline_masks(baselineLog, ks, ts):
+    """Yields (k, t, events) for every k (with t None, only k-anonymity) and every (k, t)
+
+    The t-closeness distances of a k are computed once and then compared with all t.
+    """
+    for k in ks:
+        events = get_k_anonymous_events(baselineLog, k)
+        yield k, None, events
+        if len(ts) == 0:
+            continue
+        scores = get_tcloseness_scores(baselineLog, events)
+        for t in ts:
+            violating = scores >= t
+            yield k, t, events & ~violating[baselineLog.variant_codes]
+
+
+def get_baseline_file_path(filePath, k, t=None):
+    if t is None:
+        return filePath.replace(".csv", "_pretsa_baseline_k%s.csv" % k)
+    return filePath.replace(".csv", "_pretsa_baseline_k%s_t%s.csv" % (k, t))
+
+
+def write_baseline_log(baselineLog, events, writeFilePath):
+    baselineLog.event_log[events].to_csv(writeFilePath, sep=";", index=False, lineterminator="\r\n")
+    eventsBefore = len(events)
+    eventsAfter = int(np.count_nonzero(events))
+    print(writeFilePath)
+    print("Events before " + str(eventsBefore))
+    print("Events after " + str(eventsAfter))
+    print("Remaining " + str(eventsAfter/eventsBefore))
+
+
+def generate_baselines(filePath, ks, ts):
+    """Writes the baseline logs of all k and (k, t) values, the log is read once
+
+    <log>_pretsa_baseline_k<k>.csv keeps the variants with at least k cases, <log>_pretsa_baseline_k<k>_t<t>.csv
+    in addition drops the variants that violate t-closeness within that log. Returns the written paths.
+    """
+    baselineLog = load_baseline_log(filePath)
+    writtenFiles = []
+    for k, t, events in get_baseline_masks(baselineLog, ks, ts):
+        writeFilePath = get_baseline_file_path(filePath, k, t)
+        write_baseline_log(baselineLog, events, writeFilePath)
+        writtenFiles.append(writeFilePath)
+    return writtenFiles
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the k-anonymity and t-closeness baseline logs of an event log with durations")
+    parser.add_argument("filePath")
+    parser.add_argument("--k", type=int, nargs="+", default=[2**i for i in range(1,9)])
+    parser.add_argument("--t", type=float, nargs="*", default=[0.1, 0.075, 0.05, 0.025])
+    args = parser.parse_args()
+    generate_baselines(args.filePath, args.k, args.t)
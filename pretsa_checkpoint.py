@@ -0,0 +1,59 @@
+import gzip
+import hashlib
+import os
+import pickle
+import time
+
+CHECKPOINT_VERSION = 1
+
+
+def get_model_digest(caseToSequenceDict):
+    """SHA-256 of the variant of every case, identifies the log a checkpoint was saved for"""
+    digest = hashlib.sha256()
+    for case, sequence in sorted((str(case), sequence) for case, sequence in caseToSequenceDict.items()):
+        digest.update(("%s\t%s\n" % (case, sequence)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Progress of a running PRETSA or PRETSA* search, saved to filePath at most every interval seconds
+
+    The state is pickled and gzip compressed into a temporary file that then replaces filePath, a run
+    killed while saving leaves the previous checkpoint intact. key identifies the run (algorithm,
+    parameters and log), load only returns a state that was saved with the same key. An interval of
+    0 disables saving, a checkpoint saved earlier can still be loaded.
+    """
+    def __init__(self, filePath, interval=600.0):
+        self.filePath = filePath
+        self.interval = interval
+        self._lastSave = time.perf_counter()
+
+    def is_due(self):
+        return self.interval > 0 and time.perf_counter() - self._lastSave >= self.interval
+
+    def save(self, key, state):
+        temporaryPath = self.filePath + ".%d.tmp" % os.getpid()
+        with gzip.open(temporaryPath, "wb", compresslevel=1) as checkpointFile:
+            pickle.dump({"version": CHECKPOINT_VERSION, "key": key, "state": state}, checkpointFile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaryPath, self.filePath)
+        self._lastSave = time.perf_counter()
+
+    def load(self, key):
+        if not os.path.exists(self.filePath):
+            return None
+        with gzip.open(self.filePath, "rb") as checkpointFile:
+            checkpoint = pickle.load(checkpointFile)
+        if checkpoint.get("version") != CHECKPOINT_VERSION or checkpoint["key"] != key:
+            return None
+        return checkpoint["state"]
+
+    def remove(self):
+        if os.path.exists(self.filePath):
+            os.remove(self.filePath)
+
+
+def add_checkpoint_arguments(parser):
+    parser.add_argument("--checkpoint_interval", type=float, default=600,
+                        help="Seconds between checkpoints of the run (default: 600, 0 disables them)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the checkpoint of an interrupted run with the same parameters")
@@ -7,8 +7,11 @@ import math
 
 class Pretsa_star(Pretsa):
 
-    def __init__(self,eventLog,greedy=True):
-        super().__init__(eventLog)
+    def __init__(self,eventLog,greedy=True,memory_budget=None,memory_tracking=None):
+        super().__init__(eventLog,memory_budget=memory_budget,memory_tracking=memory_tracking)
+        self._initializeRunState(greedy)
+
+    def _initializeRunState(self,greedy=True):
         self._queue = list()
         self._minDistanceMatrix, self.__minClosestSequenceMatrix = self._calculateMinDistances(self._distanceMatrix)
         self.__variantDictCounterName = "Counter"
@@ -24,6 +27,7 @@ class Pretsa_star(Pretsa):
         self.__closestViolatingSequence = dict()
         self.__lastTargetSequence = None
         self.__lastStartSequence = None
+        self._maxQueueSize = None
 
     def runPretsa(self,k,t):
         tree = self._tree
@@ -33,29 +37,64 @@ class Pretsa_star(Pretsa):
         caseToSequenceDict = self._caseToSequenceDict
         bestOption = sys.maxsize
         bestTree = None
-        while True:
-            if self.__greedy:
-                self._queue = list()
-            if self.__stateIsNew(caseToSequenceDict,changedCases):
-                violatingCases, violatingVariants = self._getViolatingCases(tree, k,caseToSequenceDict)
-                print(len(violatingVariants))
-                if len(violatingCases) == 0 and currentCost < bestOption:
-                    bestOption = currentCost
-                    bestTree = tree
-                    bestChangedCases = changedCases
-                self._updateQueue(k,tree,violatingCases,violatingVariants, currentCost,changedCases,caseToSequenceDict)
-            if not self.__shouldAlgorithmContinue(self._queue,bestOption):
-                totalDistanceFromOriginalLog = bestOption
-                break
-            operation = self._queue.pop(0)
-            tree = copy.deepcopy(operation["start"])
-            tree = self._performOperation(tree,operation)
-            caseToSequenceDict = self._updateCaseToSequenceDict(operation)
-            currentCost = operation["realCost"]
-            changedCases = operation["changedCases"]
-            i += 1
-        self._tree = self._addDifferentialPrivateNosieToEnsureTCloseness(bestTree,t)
-        return bestChangedCases, totalDistanceFromOriginalLog
+        bestChangedCases = None
+        stats = self._stats
+        checkpointKey = self._getCheckpointKey(k, t, self.__greedy)
+        randomState = np.random.get_state()
+        checkpoint = self._loadCheckpoint(checkpointKey)
+        if checkpoint is not None:
+            randomState = checkpoint["randomState"]
+            tree, i, currentCost, changedCases, caseToSequenceDict = checkpoint["tree"], checkpoint["i"], checkpoint["currentCost"], checkpoint["changedCases"], checkpoint["caseToSequenceDict"]
+            bestOption, bestTree, bestChangedCases = checkpoint["bestOption"], checkpoint["bestTree"], checkpoint["bestChangedCases"]
+            self.__setSearchState(checkpoint["search"])
+        with stats.phase("search"):
+            while True:
+                self._saveCheckpointIfDue(checkpointKey, {"randomState": randomState, "tree": tree, "i": i, "currentCost": currentCost, "changedCases": changedCases,
+                                                          "caseToSequenceDict": caseToSequenceDict, "bestOption": bestOption, "bestTree": bestTree,
+                                                          "bestChangedCases": bestChangedCases, "search": self.__getSearchState()})
+                if self.__greedy:
+                    self._queue = list()
+                if self.__stateIsNew(caseToSequenceDict,changedCases):
+                    stats.count("states_evaluated")
+                    violatingCases, violatingVariants = self._getViolatingCases(tree, k,caseToSequenceDict)
+                    print(len(violatingVariants))
+                    if len(violatingCases) == 0 and currentCost < bestOption:
+                        bestOption = currentCost
+                        bestTree = tree
+                        bestChangedCases = changedCases
+                    self._updateQueue(k,tree,violatingCases,violatingVariants, currentCost,changedCases,caseToSequenceDict)
+                    stats.maximum("max_queue_size", len(self._queue))
+                    self._pruneQueueToMemoryBudget()
+                if not self.__shouldAlgorithmContinue(self._queue,bestOption):
+                    totalDistanceFromOriginalLog = bestOption
+                    break
+                operation = self._queue.pop(0)
+                tree = copy.deepcopy(operation["start"])
+                tree = self._performOperation(tree,operation)
+                caseToSequenceDict = self._updateCaseToSequenceDict(operation)
+                currentCost = operation["realCost"]
+                changedCases = operation["changedCases"]
+                stats.count("search_expansions")
+                i += 1
+        with stats.phase("tcloseness_noise"):
+            self._tree = self._addDifferentialPrivateNosieToEnsureTCloseness(bestTree,t)
+        self._removeCheckpoint()
+        return self._getCaseIDs(bestChangedCases), totalDistanceFromOriginalLog
+
+    def __getSearchState(self):
+        #Everything besides the loop variables of runPretsa the next search step depends on; the operations in the queue share their start trees
+        return {"queue": self._queue, "states": self.__states, "closestConformingSequence": self.__closestConformingSequence,
+                "closestViolatingSequence": self.__closestViolatingSequence, "lastTargetSequence": self.__lastTargetSequence,
+                "lastStartSequence": self.__lastStartSequence, "maxQueueSize": self._maxQueueSize}
+
+    def __setSearchState(self,state):
+        self._queue = state["queue"]
+        self.__states = state["states"]
+        self.__closestConformingSequence = state["closestConformingSequence"]
+        self.__closestViolatingSequence = state["closestViolatingSequence"]
+        self.__lastTargetSequence = state["lastTargetSequence"]
+        self.__lastStartSequence = state["lastStartSequence"]
+        self._maxQueueSize = state["maxQueueSize"]
 
     def _updateQueue(self,k,tree,violatingCases,violatingVariants,currentCost,changedCases,caseToSequenceDict):
         for variant in violatingVariants.values():
@@ -65,6 +104,19 @@ class Pretsa_star(Pretsa):
         else:
             self._queue = sorted(self._queue, key=lambda k: (k["cost"], -len(k["changedCases"])))
 
+    def _pruneQueueToMemoryBudget(self):
+        #Once the memory budget is exceeded the queue keeps only its cheapest operations, at most half of its size at that time.
+        #The search then is a beam search and no longer guaranteed to find the optimal solution
+        if self._maxQueueSize is None:
+            if not self._isOverMemoryBudget():
+                return
+            self._maxQueueSize = max(1, len(self._queue) // 2)
+            self._stats.count("memory_budget_exceeded")
+            print("Memory budget exceeded, the queue is limited to %d operations" % self._maxQueueSize)
+        if len(self._queue) > self._maxQueueSize:
+            self._stats.count("pruned_operations", len(self._queue) - self._maxQueueSize)
+            del self._queue[self._maxQueueSize:]
+
     def _updateCaseToSequenceDict(self,operation):
         caseToSequenceDict = operation["caseToSequenceDict"].copy()
         for case in operation[self.__operationDictCutOutTraces]:
@@ -102,7 +154,8 @@ class Pretsa_star(Pretsa):
                 if len(node.cases) < k:
                     newcases = set(node.cases.difference(cases))
                     cases = cases.union(node.cases)
-                    for newcase in newcases:
+                    #Sorted, the order of the violating variants decides between operations of the same cost
+                    for newcase in sorted(newcases):
                         variant = variants.get(caseToSequenceDict[newcase], dict())
                         variant[self.__variantDictCounterName] = variant.get(self.__variantDictCounterName, 0) + 1
                         variant[self.__variantDictCasesSetName] = variant.get(self.__variantDictCasesSetName, set())
@@ -234,7 +287,7 @@ class Pretsa_star(Pretsa):
         bestOperationCompliant, bestOperationViolating, minCostOfCurrentBestOption = self._initializeVariablesForaddOpertionsToFixVariantToQueue()
         violatingVariants = self.__getViolatingVariants(caseToSequenceDict,violatingCases)
         potentialTargetSequences = self._getPotentialTargetSequences(tree,violatingVariants,variantToFix,k)
-        for targetSequence in potentialTargetSequences:
+        for targetSequence in sorted(potentialTargetSequences):
             if not self.__areSequencesTheSame(targetSequence, variantToFix[self.__variantDictName]):
                 targetNode = find(tree, lambda node: node.sequence == targetSequence)
                 if targetNode == None:
@@ -0,0 +1,207 @@
+import cProfile
+import copy
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:     # Not available on Windows, get_rss then only works where /proc/self/statm exists
+    resource = None
+
+MEMORY_MODES = ["tracemalloc", "rss"]
+
+# ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+_MAX_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_rss():
+    """Current resident set size of the process in bytes (the peak RSS where the current one is not available)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAX_RSS_UNIT
+
+
+class RunStats:
+    """Phase timings and counters Pretsa and Pretsa_star record while they run
+
+    phase(name) is a context manager that adds the wall time of its block to the phase, count
+    increments a counter and maximum keeps the largest value seen (e.g. the queue size).
+
+    With memory "tracemalloc" or "rss" every phase also records the peak memory while it ran: the
+    peak of the memory traced by tracemalloc, or the largest RSS sampled every sampleInterval seconds
+    (and at the start and end of the outermost phase). Nested phases count towards all phases around
+    them, nested phases too short to be sampled have no RSS peak.
+    """
+    def __init__(self, memory=None, sampleInterval=0.01):
+        if memory is not None and memory not in MEMORY_MODES:
+            raise ValueError("Unknown memory tracking mode " + str(memory))
+        self.phases = dict()
+        self.counters = dict()
+        self.memory = memory
+        self.sampleInterval = sampleInterval
+        self.peaks = dict()
+        self._openPhases = []
+        self._sampler = None
+
+    def _measure(self):
+        if self.memory == "tracemalloc":
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            return peak
+        return get_rss()
+
+    def _recordPeak(self, value):
+        for name in list(self._openPhases):
+            if value > self.peaks.get(name, 0):
+                self.peaks[name] = value
+
+    def _sample(self, stop):
+        while not stop.wait(self.sampleInterval):
+            self._recordPeak(get_rss())
+
+    def _enterPhase(self, name):
+        if self.memory == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # Nested phases (e.g. the many tcloseness checks) only get the RSS samples, reading it on every call is too slow
+        measure = self.memory == "tracemalloc" or not self._openPhases
+        if measure:
+            self._recordPeak(self._measure())
+        self._openPhases.append(name)
+        if measure:
+            self._recordPeak(self._measure())
+        if self.memory == "rss" and self._sampler is None:
+            stop = threading.Event()
+            thread = threading.Thread(target=self._sample, args=(stop,), daemon=True)
+            thread.start()
+            self._sampler = (thread, stop)
+
+    def _exitPhase(self):
+        if self.memory == "tracemalloc" or len(self._openPhases) == 1:
+            self._recordPeak(self._measure())
+        self._openPhases.pop()
+        if not self._openPhases and self._sampler is not None:
+            thread, stop = self._sampler
+            stop.set()
+            thread.join()
+            self._sampler = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        if self.memory is not None:
+            self._enterPhase(name)
+        try:
+            yield
+        finally:
+            if self.memory is not None:
+                self._exitPhase()
+            entry = self.phases.get(name, None)
+            if entry is None:
+                entry = self.phases[name] = [0.0, 0]
+            entry[0] += time.perf_counter() - start
+            entry[1] += 1
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def maximum(self, name, value):
+        if name not in self.counters or value > self.counters[name]:
+            self.counters[name] = value
+
+    def copy(self):
+        stats = RunStats(self.memory, self.sampleInterval)
+        stats.phases = copy.deepcopy(self.phases)
+        stats.counters = dict(self.counters)
+        stats.peaks = dict(self.peaks)
+        return stats
+
+    def as_dict(self):
+        phases = dict()
+        for name, (seconds, calls) in self.phases.items():
+            phases[name] = {"seconds": seconds, "calls": calls}
+            if name in self.peaks:
+                phases[name]["peak_memory"] = self.peaks[name]
+        result = {"phases": phases, "counters": dict(self.counters)}
+        if self.memory is not None:
+            result["memory"] = self.memory
+        return result
+
+
+def write_stats(stats, filePath):
+    """Writes the dict of Pretsa.stats() as JSON"""
+    with open(filePath, "w") as file:
+        json.dump(stats, file, indent=2, sort_keys=True)
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", choices=["stats", "cprofile", "pyinstrument"], default=None,
+                        help="Write the phase timings and counters to <output>_stats.json, with cprofile also a "
+                             "cProfile dump (<output>.prof), with pyinstrument also a pyinstrument report (<output>_profile.html)")
+
+
+def add_memory_arguments(parser):
+    parser.add_argument("--memory", choices=MEMORY_MODES, default=None,
+                        help="Record the peak memory of every phase, traced by tracemalloc or sampled from the RSS")
+    parser.add_argument("--memory_budget", type=float, default=None,
+                        help="RSS in GB above which the distance matrix is computed lazily and PRETSA* prunes its queue")
+
+
+def get_memory_budget(args):
+    """--memory_budget in bytes, None if not given"""
+    return None if args.memory_budget is None else int(args.memory_budget * 2**30)
+
+
+def start_memory_tracking(mode):
+    """Starts tracemalloc right away (not only in the first phase), so the memory of the loaded log is traced as well"""
+    if mode == "tracemalloc" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def format_memory_report(stats):
+    """Lines with the peak memory (MB) of every phase of a Pretsa.stats() dict"""
+    lines = []
+    for name, phase in stats["phases"].items():
+        if "peak_memory" in phase:
+            lines.append("%s: %.1f MB peak (%s)" % (name, phase["peak_memory"] / 2**20, stats.get("memory", "")))
+    for counter in ("lazy_distance_matrix", "memory_budget_exceeded", "pruned_operations"):
+        if counter in stats["counters"]:
+            lines.append("%s: %d" % (counter, stats["counters"][counter]))
+    return lines
+
+
+@contextmanager
+def profiled(mode, basePath):
+    """Profiles the block with cProfile or pyinstrument and writes the output next to basePath (without extension)"""
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(basePath + ".prof")
+    elif mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("--profile pyinstrument needs the pyinstrument package (pip install pyinstrument)")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(basePath + "_profile.html", "w") as file:
+                file.write(profiler.output_html())
+    else:
+        yield
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from levenshtein import levenshtein_tokens
+from pretsa_stats import RunStats
+from tcloseness import ActivityDistribution
+
+caseIDColName = "Case ID"
+activityColName = "Activity"
+annotationColName = "Duration"
+constantEventNr = "Event_Nr"
+participantIDColName = "Participant_ID"
+
+
+class _Reservoir:
+    """Uniform sample of at most size values of an unbounded stream (algorithm R)"""
+    def __init__(self, size):
+        self.size = size
+        self.values = np.empty(0, dtype=np.float64)
+        self.seen = 0
+
+    def add(self, values, random):
+        values = np.asarray(values, dtype=np.float64)
+        free = max(0, min(self.size - len(self.values), len(values)))
+        if free:
+            self.values = np.concatenate((self.values, values[:free]))
+        rest = values[free:]
+        if len(rest):
+            # the i-th value of the stream replaces a random slot with probability size / (i + 1)
+            slots = np.floor(random.random(len(rest)) * (self.seen + free + np.arange(1, len(rest) + 1))).astype(np.int64)
+            replaced = slots < self.size
+            self.values[slots[replaced]] = rest[replaced]
+        self.seen += len(values)
+
+
+class StreamingPretsa:
+    """PRETSA for cases that arrive continuously, in micro-batches of completed cases
+
+    The buffered cases form a prefix tree, kept as the set of buffered cases of every prefix (the
+    full variants included). addCases adds a micro-batch and releases every buffered case it can: the
+    tree is pruned like PRETSA prunes it, without reassigning, until every prefix has at least k cases
+    and no prefix violates t-closeness. The cases left in the tree are released unchanged and leave
+    the buffer, the others wait for similar cases. The t-closeness reference of an activity is a
+    uniform sample of at most distribution_size of all its durations seen so far.
+
+    At most max_buffered_cases cases stay buffered between micro-batches. The oldest cases beyond that are released with the
+    closest variant released so far, like PRETSA reassigns cut out cases. Each released batch is
+    k-anonymous, so all of them together are as well, and a released variant stays one with more
+    cases. Reassigned cases keep their durations on the common prefix, the others are drawn from the
+    reference. Before anything was released, they are suppressed.
+    """
+    def __init__(self, k, t, max_buffered_cases=10000, distribution_size=10000, seed=0):
+        self.k = k
+        self.t = t
+        self.maxBufferedCases = max_buffered_cases
+        self.distributionSize = distribution_size
+        self._random = np.random.default_rng(seed)
+        # case -> (variant, durations, participant), in the order the cases arrived
+        self._cases = OrderedDict()
+        self._prefixCases = dict()
+        self._reservoirs = dict()
+        self._distributions = dict()
+        # Variants released so far (every one with at least k released cases) in the order of their release
+        self._releasedVariants = []
+        self._isReleasedVariant = set()
+        self._closestReleasedVariant = dict()
+        self._stats = RunStats()
+
+    def bufferedCases(self):
+        return len(self._cases)
+
+    def addCases(self, eventLog):
+        """Adds a micro-batch of completed cases (events of a case consecutive, in order), returns the released events"""
+        with self._stats.phase("ingest"):
+            self.__addCases(eventLog)
+        return self.__release(self.maxBufferedCases)
+
+    def flush(self):
+        """Releases all buffered cases, those that cannot be released as they are are reassigned or suppressed"""
+        return self.__release(0)
+
+    def stats(self):
+        """Phase timings and counters like Pretsa.stats(), with the throughput in cases per second
+
+        Phases: ingest, release (the pruning) and eviction. Counters: ingested_cases, released_cases
+        (including reassigned ones), reassigned_cases, suppressed_cases, release_rounds and max_buffered_cases.
+        """
+        stats = self._stats.as_dict()
+        seconds = sum(phase["seconds"] for phase in stats["phases"].values())
+        stats["cases_per_second"] = stats["counters"].get("ingested_cases", 0) / seconds if seconds > 0 else 0.0
+        return stats
+
+    def __addCases(self, eventLog):
+        if len(eventLog) == 0:
+            return
+        caseIDs = eventLog[caseIDColName].to_numpy()
+        activities = eventLog[activityColName].to_numpy()
+        durations = eventLog[annotationColName].to_numpy(dtype=np.float64)
+        participants = eventLog[participantIDColName].to_numpy() if participantIDColName in eventLog.columns else None
+        traceStarts = np.flatnonzero(np.concatenate(([True], caseIDs[1:] != caseIDs[:-1])))
+        knownCases = [case for case in caseIDs[traceStarts] if case in self._cases]
+        if knownCases or len(set(caseIDs[traceStarts])) != len(traceStarts):
+            raise ValueError("Cases are buffered already or not consecutive: " + ", ".join(str(case) for case in knownCases[:10]))
+        for start, end in zip(traceStarts, np.append(traceStarts[1:], len(caseIDs))):
+            case = caseIDs[start]
+            variant = tuple(activities[start:end])
+            self._cases[case] = (variant, durations[start:end].copy(), participants[start] if participants is not None else None)
+            for length in range(1, len(variant) + 1):
+                self._prefixCases.setdefault(variant[:length], set()).add(case)
+        for activity, values in pd.Series(durations).groupby(activities, sort=False):
+            reservoir = self._reservoirs.get(activity, None)
+            if reservoir is None:
+                reservoir = self._reservoirs[activity] = _Reservoir(self.distributionSize)
+            reservoir.add(values.to_numpy(), self._random)
+            self._distributions.pop(activity, None)
+        self._stats.count("ingested_cases", len(traceStarts))
+        self._stats.maximum("max_buffered_cases", len(self._cases))
+
+    def __getDistribution(self, activity):
+        distribution = self._distributions.get(activity, None)
+        if distribution is None:
+            distribution = self._distributions[activity] = ActivityDistribution(self._reservoirs[activity].values)
+        return distribution
+
+    def __getViolatingPrefixes(self, classes):
+        #t-closeness of the case set of every prefix in classes, one batched distance computation per activity
+        violating = []
+        prefixesOfActivity = dict()
+        for prefix in classes:
+            prefixesOfActivity.setdefault(prefix[-1], []).append(prefix)
+        for activity, prefixes in prefixesOfActivity.items():
+            distribution = self.__getDistribution(activity)
+            if distribution.maxDifference == 0.0:    # All annotations have the same value(most likely= 0.0)
+                continue
+            values = []
+            classNumbers = []
+            for classNumber, prefix in enumerate(prefixes):
+                values.extend(self._cases[case][1][len(prefix) - 1] for case in classes[prefix])
+                classNumbers.extend([classNumber] * len(classes[prefix]))
+            distances = distribution.wasserstein_distances(values, classNumbers) / distribution.maxDifference
+            violating.extend(prefix for prefix, distance in zip(prefixes, distances) if distance >= self.t)
+        return violating
+
+    def __getReleasableCases(self):
+        #Prunes like PRETSA without reassigning: every round cuts the cases of all prefixes with less than k cases or
+        #violating t-closeness, until a round cuts nothing. Prefixes whose cases did not change passed already
+        releasable = set(self._cases)
+        passed = dict()
+        while True:
+            self._stats.count("release_rounds")
+            cut = set()
+            classes = dict()
+            for prefix, cases in self._prefixCases.items():
+                cases = cases.intersection(releasable)
+                if len(cases) == 0 or passed.get(prefix, None) == len(cases):
+                    continue
+                if len(cases) < self.k:
+                    cut.update(cases)
+                else:
+                    classes[prefix] = cases
+            for prefix in self.__getViolatingPrefixes(classes):
+                cut.update(classes[prefix])
+            if not cut:
+                return releasable
+            for prefix, cases in classes.items():
+                passed[prefix] = len(cases)
+            releasable.difference_update(cut)
+
+    def __removeCase(self, case):
+        variant, durations, participant = self._cases.pop(case)
+        for length in range(1, len(variant) + 1):
+            prefixCases = self._prefixCases[variant[:length]]
+            prefixCases.discard(case)
+            if not prefixCases:
+                del self._prefixCases[variant[:length]]
+        return variant, durations, participant
+
+    def __getClosestReleasedVariant(self, variant):
+        #The closest released variant wins, ties go to the alphabetically first sequence like in PRETSA.
+        #Only the variants released since the last lookup of the variant are compared
+        closest, compared = self._closestReleasedVariant.get(variant, (None, 0))
+        for target in self._releasedVariants[compared:]:
+            targetSequence = "@" + "@".join(target)
+            candidate = (levenshtein_tokens(variant, target), targetSequence, target)
+            if closest is None or candidate < closest:
+                closest = candidate
+        self._closestReleasedVariant[variant] = (closest, len(self._releasedVariants))
+        return closest[2]
+
+    def __reassign(self, variant, durations):
+        target = self.__getClosestReleasedVariant(variant)
+        commonPrefix = 0
+        while commonPrefix < min(len(variant), len(target)) and variant[commonPrefix] == target[commonPrefix]:
+            commonPrefix += 1
+        newDurations = np.empty(len(target))
+        newDurations[:commonPrefix] = durations[:commonPrefix]
+        for position in range(commonPrefix, len(target)):
+            newDurations[position] = max(0.0, self._random.choice(self._reservoirs[target[position]].values))
+        return target, newDurations
+
+    def __release(self, maxBufferedCases):
+        with self._stats.phase("release"):
+            releasable = self.__getReleasableCases()
+            released = [(case, self.__removeCase(case)) for case in list(self._cases) if case in releasable]
+        with self._stats.phase("eviction"):
+            for _, (variant, _, _) in released:
+                if variant not in self._isReleasedVariant:
+                    self._isReleasedVariant.add(variant)
+                    self._releasedVariants.append(variant)
+            while len(self._cases) > maxBufferedCases:
+                case = next(iter(self._cases))
+                variant, durations, participant = self.__removeCase(case)
+                if self._releasedVariants:
+                    variant, durations = self.__reassign(variant, durations)
+                    released.append((case, (variant, durations, participant)))
+                    self._stats.count("reassigned_cases")
+                else:
+                    self._stats.count("suppressed_cases")
+        self._stats.count("released_cases", len(released))
+        return self.__toEventLog(released)
+
+    def __toEventLog(self, released):
+        columns = [activityColName, caseIDColName, annotationColName, constantEventNr]
+        withParticipants = any(participant is not None for _, (_, _, participant) in released)
+        if withParticipants:
+            columns.append(participantIDColName)
+        if not released:
+            return pd.DataFrame(columns=columns)
+        lengths = [len(variant) for _, (variant, _, _) in released]
+        eventLog = pd.DataFrame({
+            activityColName: np.concatenate([np.asarray(variant, dtype=object) for _, (variant, _, _) in released]),
+            caseIDColName: np.repeat(np.array([case for case, _ in released], dtype=object), lengths),
+            annotationColName: np.concatenate([durations for _, (_, durations, _) in released]),
+            constantEventNr: np.concatenate([np.arange(1, length + 1) for length in lengths])}, columns=columns[:4])
+        if withParticipants:
+            eventLog[participantIDColName] = np.repeat(np.array([participant for _, (_, _, participant) in released], dtype=object), lengths)
+        return eventLog
@@ -0,0 +1,156 @@
+import pickle
+import sys
+import time
+import pandas as pd
+from anytree import PreOrderIter
+from job_scheduler import JobScheduler
+from pretsa import Pretsa
+from pretsa_star import Pretsa_star
+
+# Same algorithm names, classes and settings as the runExperimentForJournalExtension_* scripts
+ALGORITHMS = {
+    "pretsa": (Pretsa, dict(), dict(normalTCloseness=False)),
+    "heuristic_pretsa": (Pretsa_star, dict(greedy=True), dict()),
+    "pretsa_star": (Pretsa_star, dict(greedy=False), dict()),
+}
+
+RESULT_COLUMNS = ["k", "t", "algorithm", "status", "cases", "inflictedChanges", "time", "modelTime", "error"]
+
+
+def get_target_file_path(filePath, k, t, algorithm, extension=".csv"):
+    """File name the runExperimentForJournalExtension_* scripts use for a (k, t, algorithm) result"""
+    return filePath.replace(".csv", "_t%s_k%s_%s%s" % (t, k, algorithm, extension))
+
+
+def _write_results(filePath, k, t, algorithm, eventLog, cutOutCases, distanceLog, runTime):
+    eventLog.to_csv(get_target_file_path(filePath, k, t, algorithm), index=None, header=True, sep=';')
+    with open(get_target_file_path(filePath, k, t, algorithm, ".pickle"), "wb") as pickleFile:
+        pickle.dump({"cases": cutOutCases, "inflictedChanges": distanceLog, "time": runTime}, pickleFile)
+
+
+def run_job(model, snapshot, k, t, algorithm, filePath=None, modelTime=0.0):
+    """Runs one combination on a copy of the snapshot and writes its event log and pickle"""
+    algorithmClass, initArguments, runArguments = ALGORITHMS[algorithm]
+    start = time.time()
+    pretsa = algorithmClass.fromModel(model, snapshot, **initArguments)
+    cutOutCases, distanceLog = pretsa.runPretsa(int(k), float(t), **runArguments)
+    eventLog = pretsa.getPrivatisedEventLog()
+    jobTime = time.time() - start
+    if filePath is not None:
+        # Same pickle as the single runs, time includes building the shared model to stay comparable
+        _write_results(filePath, k, t, algorithm, eventLog, cutOutCases, distanceLog, jobTime + modelTime)
+    return {"cases": len(cutOutCases), "inflictedChanges": distanceLog, "time": jobTime}
+
+
+def _read_results(filePath, k, t, algorithm):
+    # The time in the pickle includes the model of the earlier sweep, it is not comparable to the time of a job
+    with open(get_target_file_path(filePath, k, t, algorithm, ".pickle"), "rb") as pickleFile:
+        results = pickle.load(pickleFile)
+    return {"cases": len(results["cases"]), "inflictedChanges": results["inflictedChanges"], "time": None}
+
+
+def run_sweep(eventLog, ks, ts, algorithms=("pretsa",), filePath=None, workers=None, timeout=None, resultFilePath=None,
+              scheduler=None):
+    """Runs PRETSA for every (k, t, algorithm) combination while building the model only once
+
+    The tree, variants and distance matrix are built once and every job starts from a snapshot of
+    them. The jobs are queued in a job_scheduler.JobScheduler, which forks them from this process
+    and applies its worker count, timeout, memory ceiling, retries and JSON records. Without a
+    scheduler one with workers (default: CPU count) and timeout is used that reruns every job.
+    With a filePath the event logs and pickles are written next to it (same names as the single
+    runs), jobs whose outputs exist are skipped if the scheduler skips finished jobs, and all
+    results go to one consolidated CSV, by default filePath with the suffix
+    _sweep_results_<algorithms>.csv. Returns the results as a DataFrame.
+    """
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 3000))
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            raise ValueError("Unknown algorithm %s, expected one of %s" % (algorithm, ", ".join(ALGORITHMS)))
+    if scheduler is None:
+        scheduler = JobScheduler(workers=workers, timeout=timeout, skip_finished=False)
+    start = time.time()
+    model = Pretsa(eventLog)
+    snapshot = model.snapshot()
+    modelTime = time.time() - start
+    print("Built model in %.2fs" % modelTime)
+
+    jobs = [(k, t, algorithm) for k in ks for t in ts for algorithm in algorithms]
+    if resultFilePath is None and filePath is not None:
+        resultFilePath = filePath.replace(".csv", "_sweep_results_%s.csv" % "_".join(algorithms))
+    results = []
+    def finish(job, record):
+        row = dict(zip(("k", "t", "algorithm"), job))
+        row.update(record.get("result") or {"time": record["wall_time"]})
+        if record["status"] == "skipped":
+            row.update(_read_results(filePath, *job))
+        row["status"] = record["status"]
+        row["error"] = record.get("error")
+        row["modelTime"] = modelTime
+        results.append(row)
+        if resultFilePath is not None:      # Write after every job, a crash keeps the finished rows
+            pd.DataFrame(results, columns=RESULT_COLUMNS).to_csv(resultFilePath, index=False, sep=";")
+
+    for job in jobs:
+        outputs = [get_target_file_path(filePath, *job), get_target_file_path(filePath, *job, ".pickle")] if filePath is not None else []
+        scheduler.add_function(run_job, args=(model, snapshot) + job + (filePath, modelTime), outputs=outputs,
+                               name="k=%s t=%s %s" % job, on_done=lambda record, job=job: finish(job, record))
+    scheduler.run()
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+
+def _tree_state(pretsa):
+    return {node.sequence: frozenset(node.cases) for node in PreOrderIter(pretsa._tree)}
+
+
+def run_monotone_sweep(eventLog, ks, t, algorithm="pretsa", filePath=None, verify=False, resultFilePath=None):
+    """Runs sequential PRETSA for ascending k, warm-starting every run from the previous one
+
+    Each run replays the pruning steps of the previous (smaller) k that provably are the same for
+    the current k and only continues with a cold start from the first step that could differ (see
+    Pretsa.runPretsa). The t-closeness and closest-sequence caches of the model are kept across
+    runs. With verify every k is also run cold, with empty caches, and compared (modified cases,
+    distance and tree).
+    Only the PRETSA algorithm prunes sequentially, Pretsa_star based algorithms need run_sweep.
+    """
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 3000))
+    algorithmClass, initArguments, runArguments = ALGORITHMS[algorithm]
+    if algorithmClass is not Pretsa:
+        raise ValueError("Monotone sweeps only work for PRETSA, use run_sweep for %s" % algorithm)
+    start = time.time()
+    model = Pretsa(eventLog)
+    snapshot = model.snapshot()
+    modelTime = time.time() - start
+    if resultFilePath is None and filePath is not None:
+        resultFilePath = filePath.replace(".csv", "_monotone_sweep_results_%s.csv" % algorithm)
+
+    results = []
+    previousTrajectory = None
+    for k in sorted(ks):
+        runStart = time.time()
+        pretsa = Pretsa.fromModel(model, snapshot)
+        pretsaStart = time.time()
+        cutOutCases, distanceLog = pretsa.runPretsa(int(k), float(t), warmStart=previousTrajectory, **runArguments)
+        pretsaTime = time.time() - pretsaStart
+        previousTrajectory = pretsa.getTrajectory()
+        if filePath is not None:
+            eventLog = pretsa.getPrivatisedEventLog()
+        runTime = time.time() - runStart
+        if filePath is not None:
+            _write_results(filePath, k, t, algorithm, eventLog, cutOutCases, distanceLog, runTime + modelTime)
+        row = {"k": k, "t": t, "algorithm": algorithm, "cases": len(cutOutCases), "inflictedChanges": distanceLog,
+               "time": runTime, "pretsaTime": pretsaTime, "modelTime": modelTime, "steps": len(previousTrajectory["steps"]),
+               "replayedSteps": previousTrajectory["replayedSteps"]}
+        if verify:
+            cold = Pretsa.fromModel(model, snapshot)
+            # fromModel shares the caches of the warm runs, the cold run must not reuse their results
+            cold._tClosenessCache = dict()
+            cold._closestSequencesCache = dict()
+            coldStart = time.time()
+            coldCutOutCases, coldDistanceLog = cold.runPretsa(int(k), float(t), **runArguments)
+            row["coldPretsaTime"] = time.time() - coldStart
+            row["verified"] = coldCutOutCases == cutOutCases and coldDistanceLog == distanceLog and _tree_state(cold) == _tree_state(pretsa)
+        results.append(row)
+        print("k=%s t=%s: replayed %d of %d pruning steps, PRETSA took %.2fs" % (k, t, row["replayedSteps"], row["steps"], pretsaTime))
+        if resultFilePath is not None:
+            pd.DataFrame(results).to_csv(resultFilePath, index=False, sep=";")
+    return pd.DataFrame(results)
@@ -0,0 +1,72 @@
+import os
+import pickle
+from collections import OrderedDict
+from distance_matrix import DistanceCache
+from event_log_loader import get_file_hash, load_event_log
+from event_log_variants import extract_variants, get_variant_strings
+
+STATE_VERSION = 1
+
+
+class ReleaseState:
+    """What a release pipeline keeps from one release period to the next
+
+    For every released period (in the order of release) the SHA-256 of its log and its variants in
+    the @activity1@activity2 form of Pretsa. The variants of the earlier periods are the previous
+    traces of the next one, so the earlier logs are not read again. The variant distances computed
+    so far are kept in a DistanceCache, variants that recur in a later period are not compared again.
+    The state is pickled to filePath, like the evaluation context.
+    """
+    def __init__(self, filePath, maxDistances=1000000):
+        self.filePath = filePath
+        self.periods = OrderedDict()
+        self.distance_cache = DistanceCache(maxDistances)
+        if os.path.exists(filePath):
+            with open(filePath, "rb") as stateFile:
+                state = pickle.load(stateFile)
+            if state.get("version") != STATE_VERSION:
+                raise ValueError("%s was written by another version of the release pipeline" % filePath)
+            self.periods = state["periods"]
+            self.distance_cache = state["distance_cache"]
+
+    def has_period(self, name, fileHash):
+        period = self.periods.get(name, None)
+        return period is not None and period["hash"] == fileHash
+
+    def add_period(self, name, fileHash, eventLog):
+        """Records the variants of the log of a released period, a period released again keeps its place"""
+        variants = extract_variants(eventLog)
+        self.periods[name] = {"hash": fileHash, "variants": frozenset(get_variant_strings(variants))}
+
+    def add_period_file(self, filePath, eventLog=None):
+        """Records a released log file under its file name unless it is recorded already, returns True if it was new"""
+        name = os.path.basename(filePath)
+        fileHash = get_file_hash(filePath)
+        if self.has_period(name, fileHash):
+            return False
+        if eventLog is None:
+            eventLog = load_event_log(filePath)
+        self.add_period(name, fileHash, eventLog)
+        return True
+
+    def get_previous_periods(self, name):
+        """Names of the periods released before name (of all periods if name was not released yet)"""
+        previousPeriods = []
+        for periodName in self.periods:
+            if periodName == name:
+                break
+            previousPeriods.append(periodName)
+        return previousPeriods
+
+    def get_previous_traces(self, name):
+        """Variants of all periods released before name, None if there are none"""
+        previousPeriods = self.get_previous_periods(name)
+        if not previousPeriods:
+            return None
+        return set().union(*[self.periods[periodName]["variants"] for periodName in previousPeriods])
+
+    def save(self):
+        temporaryPath = self.filePath + ".%d.tmp" % os.getpid()
+        with open(temporaryPath, "wb") as stateFile:
+            pickle.dump({"version": STATE_VERSION, "periods": self.periods, "distance_cache": self.distance_cache}, stateFile)
+        os.replace(temporaryPath, self.filePath)    # An interrupted run leaves the previous state intact
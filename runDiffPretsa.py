@@ -2,7 +2,10 @@ import sys
 import os
 import argparse
 from pretsa import Pretsa
-import pandas as pd
+from event_log_variants import extract_variants, get_variant_strings
+from event_log_loader import load_event_log
+from release_state import ReleaseState
+from pretsa_stats import add_memory_arguments, format_memory_report, get_memory_budget, start_memory_tracking
 
 sys.setrecursionlimit(3000)
 
@@ -16,46 +19,55 @@ def parse_arguments():
                         help='Differential privacy parameter (smaller = more privacy)')
     parser.add_argument('--compare', action='store_true',
                         help='Also run original PRETSA and compare results')
+    parser.add_argument('--state', help='Release state file; previous periods and variant distances are taken from it '
+                                        'and the current log is recorded in it after the release')
+    add_memory_arguments(parser)
     return parser.parse_args()
 
 def count_patterns(log):
     """Count unique patterns in a log"""
-    patterns = set()
-    for case_id, group in log.groupby('Case ID'):
-        if 'Event_Nr' in group.columns:
-            sorted_group = group.sort_values('Event_Nr')
-        else:
-            sorted_group = group
-        pattern = '-'.join(sorted_group['Activity'].tolist())
-        patterns.add(pattern)
-    return patterns
+    sortColName = 'Event_Nr' if 'Event_Nr' in log.columns else None
+    variants = extract_variants(log, consecutive=False, sortColName=sortColName)
+    return set(get_variant_strings(variants, separator='-', prefix=''))
 
 def main():
     args = parse_arguments()
     target_file_path = args.current_log.replace(".csv", 
         f"_t{args.t}_k{args.k}_eps{args.epsilon}_dp.csv")
     
+    start_memory_tracking(args.memory)
     print("Loading current event log...")
-    current_log = pd.read_csv(args.current_log, delimiter=";")
+    current_log = load_event_log(args.current_log)
     
-    # Load previous logs if directory is provided
+    # Load previous logs if directory is provided, with a release state only those it does not know yet
+    state = ReleaseState(args.state) if args.state else None
     previous_logs = []
     if args.prev_logs_dir and os.path.isdir(args.prev_logs_dir):
         print(f"Loading previous event logs from {args.prev_logs_dir}...")
-        for filename in os.listdir(args.prev_logs_dir):
+        for filename in sorted(os.listdir(args.prev_logs_dir)):
             if filename.endswith('.csv'):
                 log_path = os.path.join(args.prev_logs_dir, filename)
                 try:
-                    log = pd.read_csv(log_path, delimiter=";")
+                    if state is not None:
+                        if state.add_period_file(log_path):
+                            print(f"  - Recorded {filename} in the release state")
+                        continue
+                    log = load_event_log(log_path)
                     previous_logs.append(log)
                     print(f"  - Loaded {filename} ({len(log)} events)")
                 except Exception as e:
                     print(f"  - Error loading {filename}: {e}")
+    previous_traces = None
+    distance_cache = None
+    if state is not None:
+        previous_traces = state.get_previous_traces(os.path.basename(args.current_log))
+        distance_cache = state.distance_cache
+        print(f"Release state: {len(state.periods)} periods, {len(distance_cache)} cached distances")
     
     # Run original PRETSA if requested
     if args.compare:
         print(f"\nRunning original PRETSA (k={args.k}, t={args.t})")
-        original_pretsa = Pretsa(current_log)
+        original_pretsa = Pretsa(current_log, distance_cache=distance_cache)
         original_cutout, original_distance = original_pretsa.runPretsa(args.k, args.t)
         original_log = original_pretsa.getPrivatisedEventLog()
         
@@ -66,8 +78,9 @@ def main():
     
     # Run DP-PRETSA
     print(f"\nRunning PRETSA with differential privacy (k={args.k}, t={args.t}, epsilon={args.epsilon})")
-    print("Previous logs:", len(previous_logs))
-    pretsa = Pretsa(current_log=current_log, previous_logs=previous_logs)
+    print("Previous logs:", len(previous_logs) if state is None else len(state.get_previous_periods(os.path.basename(args.current_log))))
+    pretsa = Pretsa(current_log=current_log, previous_logs=previous_logs, previous_traces=previous_traces, distance_cache=distance_cache,
+                    memory_budget=get_memory_budget(args), memory_tracking=args.memory)
     pretsa.set_privacy_parameters(epsilon=args.epsilon)
     
     cut_out_cases, log_distance = pretsa.runPretsa(args.k, args.t, differentialPrivacy=True)
@@ -76,6 +89,11 @@ def main():
     dp_log.to_csv(target_file_path, sep=";", index=False)
     print(f"Modified {len(cut_out_cases)} cases")
     print(f"DP-PRETSA log has {len(dp_log)} events and {len(dp_log['Case ID'].unique())} cases")
+    for line in format_memory_report(pretsa.stats()):
+        print(line)
+    if state is not None:
+        state.add_period_file(args.current_log, current_log)
+        state.save()
     
     # Simple comparison if original was run
     if args.compare:
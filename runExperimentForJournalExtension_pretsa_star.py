@@ -1,24 +1,42 @@
+import argparse
 import sys
 from pretsa_star import Pretsa_star
-import pandas as pd
 import pickle
 import time
+from pretsa_stats import add_memory_arguments, add_profile_argument, format_memory_report, get_memory_budget, profiled, start_memory_tracking, write_stats
+from event_log_loader import load_event_log
+from pretsa_checkpoint import add_checkpoint_arguments
 
-filePath = sys.argv[1]
-k = sys.argv[2]
-t = sys.argv[3]
+parser = argparse.ArgumentParser()
+parser.add_argument("filePath")
+parser.add_argument("k")
+parser.add_argument("t")
+add_profile_argument(parser)
+add_memory_arguments(parser)
+add_checkpoint_arguments(parser)
+args = parser.parse_args()
+filePath = args.filePath
+k = args.k
+t = args.t
 sys.setrecursionlimit(3000)
 targetFilePath = filePath.replace(".csv","_t%s_k%s_pretsa_star.csv" % (t,k))
 
-eventLog = pd.read_csv(filePath, delimiter=";")
+start_memory_tracking(args.memory)
+eventLog = load_event_log(filePath)
 start = time.time()
-pretsa_star = Pretsa_star(eventLog,greedy=False)
-cutOutCases, distanceLog = pretsa_star.runPretsa(int(k),float(t))
+with profiled(args.profile, targetFilePath.replace(".csv","")):
+    pretsa_star = Pretsa_star(eventLog,greedy=False,memory_budget=get_memory_budget(args),memory_tracking=args.memory)
+    pretsa_star.setCheckpoint(targetFilePath.replace(".csv","_checkpoint.gz"), interval=args.checkpoint_interval, resume=args.resume)
+    cutOutCases, distanceLog = pretsa_star.runPretsa(int(k),float(t))
 
-eventLog = pretsa_star.getPrivatisedEventLog()
-eventLog.to_csv(targetFilePath,index=None,header=True,sep=';')
+    eventLog = pretsa_star.getPrivatisedEventLog()
+    eventLog.to_csv(targetFilePath,index=None,header=True,sep=';')
 end = time.time()
 
 
 targetFilePathPickle = filePath.replace(".csv","_t%s_k%s_pretsa_star.pickle" % (t,k))
-pickle.dump({"cases": cutOutCases, "inflictedChanges":distanceLog,"time":(end-start)}, open(targetFilePathPickle, "wb" ))
\ No newline at end of file
+pickle.dump({"cases": cutOutCases, "inflictedChanges":distanceLog,"time":(end-start),"stats":pretsa_star.stats()}, open(targetFilePathPickle, "wb" ))
+if args.profile or args.memory:
+    write_stats(pretsa_star.stats(), targetFilePath.replace(".csv","_stats.json"))
+for line in format_memory_report(pretsa_star.stats()):
+    print(line)
@@ -1,20 +1,37 @@
+import argparse
 import sys
 from pretsa import Pretsa
-import pandas as pd
-import profile
+from pretsa_stats import add_memory_arguments, add_profile_argument, format_memory_report, get_memory_budget, profiled, start_memory_tracking, write_stats
+from event_log_loader import load_event_log
+from pretsa_checkpoint import add_checkpoint_arguments
 
-filePath = sys.argv[1]
-k = sys.argv[2]
-t = sys.argv[3]
+parser = argparse.ArgumentParser(description="Run PRETSA on an event log")
+parser.add_argument("filePath")
+parser.add_argument("k")
+parser.add_argument("t")
+add_profile_argument(parser)
+add_memory_arguments(parser)
+add_checkpoint_arguments(parser)
+args = parser.parse_args()
+filePath = args.filePath
+k = args.k
+t = args.t
 sys.setrecursionlimit(3000)
 targetFilePath = filePath.replace(".csv","_t%s_k%s_pretsa.csv" % (t,k))
 
 
 print("Load Event Log")
-eventLog = pd.read_csv(filePath, delimiter=";")
+start_memory_tracking(args.memory)
+eventLog = load_event_log(filePath)
 print("Starting experiments")
-pretsa = Pretsa(eventLog)
-cutOutCases = pretsa.runPretsa(int(k),float(t))
-print("Modified " + str(len(cutOutCases)) + " cases for k=" + str(k))
-privateEventLog = pretsa.getPrivatisedEventLog()
-privateEventLog.to_csv(targetFilePath, sep=";",index=False)
\ No newline at end of file
+with profiled(args.profile, targetFilePath.replace(".csv","")):
+    pretsa = Pretsa(eventLog, memory_budget=get_memory_budget(args), memory_tracking=args.memory)
+    pretsa.setCheckpoint(targetFilePath.replace(".csv","_checkpoint.gz"), interval=args.checkpoint_interval, resume=args.resume)
+    cutOutCases, distanceLog = pretsa.runPretsa(int(k),float(t))
+    print("Modified " + str(len(cutOutCases)) + " cases for k=" + str(k))
+    privateEventLog = pretsa.getPrivatisedEventLog()
+privateEventLog.to_csv(targetFilePath, sep=";",index=False)
+if args.profile or args.memory:
+    write_stats(pretsa.stats(), targetFilePath.replace(".csv","_stats.json"))
+for line in format_memory_report(pretsa.stats()):
+    print(line)
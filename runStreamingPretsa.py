@@ -0,0 +1,49 @@
+import argparse
+import sys
+import time
+from pretsa_stream import StreamingPretsa
+from pretsa_stats import add_profile_argument, profiled, write_stats
+from event_log_loader import load_event_log
+
+parser = argparse.ArgumentParser(description="Replay an event log as a stream of completed cases through streaming PRETSA")
+parser.add_argument("filePath")
+parser.add_argument("k", type=int)
+parser.add_argument("t", type=float)
+parser.add_argument("--batch_cases", type=int, default=100, help="Cases per micro-batch (default: 100)")
+parser.add_argument("--max_buffered_cases", type=int, default=10000, help="Cases kept back at most (default: 10000)")
+parser.add_argument("--distribution_size", type=int, default=10000, help="Durations per activity kept as t-closeness reference (default: 10000)")
+parser.add_argument("--seed", type=int, default=0)
+add_profile_argument(parser)
+args = parser.parse_args()
+sys.setrecursionlimit(3000)
+targetFilePath = args.filePath.replace(".csv","_t%s_k%s_stream.csv" % (args.t,args.k))
+
+eventLog = load_event_log(args.filePath)
+caseIDs = eventLog["Case ID"].to_numpy()
+traceStarts = [0] + [index for index in range(1, len(caseIDs)) if caseIDs[index] != caseIDs[index - 1]] + [len(caseIDs)]
+stream = StreamingPretsa(args.k, args.t, max_buffered_cases=args.max_buffered_cases,
+                         distribution_size=args.distribution_size, seed=args.seed)
+releasedEvents = 0
+start = time.time()
+with profiled(args.profile, targetFilePath.replace(".csv","")), open(targetFilePath, "w", newline="") as targetFile:
+    header = True
+    for batch in range(0, len(traceStarts) - 1, args.batch_cases):
+        released = stream.addCases(eventLog.iloc[traceStarts[batch]:traceStarts[min(batch + args.batch_cases, len(traceStarts) - 1)]])
+        if not released.empty:     # The header goes with the first batch that released anything
+            released.to_csv(targetFile, sep=";", index=False, header=header)
+            header = False
+        releasedEvents += len(released)
+    released = stream.flush()
+    if header or not released.empty:
+        released.to_csv(targetFile, sep=";", index=False, header=header)
+    releasedEvents += len(released)
+end = time.time()
+
+stats = stream.stats()
+counters = stats["counters"]
+print("Released %d cases (%d events), %d reassigned, %d suppressed" % (counters.get("released_cases", 0), releasedEvents,
+      counters.get("reassigned_cases", 0), counters.get("suppressed_cases", 0)))
+print("%.0f cases per second, %.1fs in total, at most %d cases buffered" % (stats["cases_per_second"], end - start,
+      counters.get("max_buffered_cases", 0)))
+if args.profile:
+    write_stats(stats, targetFilePath.replace(".csv","_stats.json"))
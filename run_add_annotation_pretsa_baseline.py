@@ -1,12 +1,19 @@
+import argparse
 import sys
-import os
+from job_scheduler import add_scheduler_arguments, scheduler_from_arguments
 
-dictPath = sys.argv[1]
+parser = argparse.ArgumentParser(description="Add durations to the PRETSA baseline event logs of CoSeLoG and Sepsis")
+parser.add_argument("dictPath")
+add_scheduler_arguments(parser)
+args = parser.parse_args()
+dictPath = args.dictPath
 
+scheduler = scheduler_from_arguments(args)
 datasets = ["CoSeLoG", "Sepsis"]
 for dataset in datasets:
-    print(dataset)
     for k in range(1,9):
         k = 2**k
         filePath = dictPath + dataset + "_duration_pretsa_baseline_k" + str(k) + ".csv"
-        os.system("time python add_annotation_duration.py normal %s" % (filePath))
\ No newline at end of file
+        scheduler.add([sys.executable, "add_annotation_duration.py", "normal", filePath],
+                      outputs=[filePath.replace(".csv","_duration.csv")], name="%s k=%s" % (dataset,k))
+scheduler.run()
@@ -1,36 +1,37 @@
-import os
-import time
 import argparse
 from mpc_pretsa import MPCCoordinator
 
 def main():
     parser = argparse.ArgumentParser(description="Run MPC Coordinator with privacy parameters.")
-    parser.add_argument("--k", type=int, default=3, help="k-anonymity parameter (default: 3)")
-    parser.add_argument("--t", type=float, default=0.2, help="t-closeness parameter (default: 0.2)")
+    parser.add_argument("--k", type=int, nargs="+", default=[3],
+                        help="k-anonymity parameter, several values run one after another on the same session (default: 3)")
+    parser.add_argument("--t", type=float, nargs="+", default=[0.2],
+                        help="t-closeness parameter, several values run one after another on the same session (default: 0.2)")
+    parser.add_argument("--port", type=int, default=5001, help="Port to listen on (default: 5001)")
+    parser.add_argument("--participants", type=int, default=2,
+                        help="Start the computation once this many participants registered (default: 2)")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Start the computation after this many seconds, even if fewer participants registered")
+    parser.add_argument("--workers", type=int, default=None, help="Size of the pool decrypting uploads (default: CPU based)")
+    parser.add_argument("--processes", action="store_true", help="Decrypt uploads in a process pool instead of threads")
     args = parser.parse_args()
 
     # Create and start the MPC coordinator
-    coordinator = MPCCoordinator(port=5001)
+    coordinator = MPCCoordinator(port=args.port, workers=args.workers, use_processes=args.processes)
     coordinator.start_server()
-    coordinator.set_privacy_parameters(args.k, args.t, 0)
+    coordinator.set_privacy_parameters(args.k[0], args.t[0], 0)
     
     # Wait for participants to connect
-    print("Waiting for participants to connect...")
-    time.sleep(10)
+    print(f"Waiting for {args.participants} participants to connect...")
+    coordinator.wait_for_participants(args.participants, timeout=args.deadline)
     
-    # Set privacy parameters
-    
-    # Wait for user input to start computation
-    while True:
-        cmd = input("Press 'c' to start computation or 'q' to quit: ")
-        if cmd.lower() == 'c':
-            # Execute secure computation
-            coordinator.execute_secure_computation()
-        elif cmd.lower() == 'q':
-            break
-        else:
-            print("Invalid input. Please press 'c' to start computation or 'q' to quit.")
-        time.sleep(1)
+    # Execute secure computation for every (k, t), the combined log and distance matrix are kept between runs
+    try:
+        for k in args.k:
+            for t in args.t:
+                coordinator.execute_secure_computation(k, t)
+    finally:
+        coordinator.stop_server()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
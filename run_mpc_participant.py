@@ -1,37 +1,58 @@
+import argparse
+import os
 import sys
-import pandas as pd
+import threading
 import time
 from mpc_pretsa import MPCParticipant
+from event_log_loader import load_event_log
+
+def receive_results(participant):
+    """Saves every privatized log the coordinator sends until the session ends"""
+    while participant.receive_result(timeout=None) is not None:
+        pass
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python run_mpc_participant.py <participant_id> <log_file> [coordinator_host]")
-        sys.exit(1)
-    
-    participant_id = sys.argv[1]
-    log_file = sys.argv[2]
-    coordinator_host = sys.argv[3] if len(sys.argv) > 3 else 'localhost'
+    parser = argparse.ArgumentParser(description="Run an MPC participant for one long-lived session.")
+    parser.add_argument("participant_id")
+    parser.add_argument("log_file")
+    parser.add_argument("coordinator_host", nargs="?", default="localhost")
+    parser.add_argument("--port", type=int, default=5001, help="Coordinator port (default: 5001)")
+    parser.add_argument("--deltas_dir", help="Directory watched for CSV files with new cases, each new file is uploaded as a delta")
+    parser.add_argument("--poll_interval", type=float, default=5.0, help="Seconds between checks of the deltas directory (default: 5)")
+    args = parser.parse_args()
     
     # Load event log
-    print(f"Loading event log from {log_file}...")
-    event_log = pd.read_csv(log_file, delimiter=';')
+    print(f"Loading event log from {args.log_file}...")
+    event_log = load_event_log(args.log_file)
     
     # Create and connect participant
-    participant = MPCParticipant(participant_id, event_log, coordinator_host)
-    connected = participant.connect_to_coordinator()
+    participant = MPCParticipant(args.participant_id, event_log, args.coordinator_host, args.port)
+    connected = participant.connect_to_coordinator(wait_for_result=False)
     
     if connected is None:
         print("Failed to connect to coordinator")
         sys.exit(1)
     
-    print(f"Participant {participant_id} connected and waiting for instructions...")
+    print(f"Participant {args.participant_id} connected and waiting for instructions...")
+    receiver = threading.Thread(target=receive_results, args=(participant,))
+    receiver.daemon = True
+    receiver.start()
     
-    # Keep participant running
+    # Keep participant running and upload new cases as they show up
+    submitted = set()
+    if args.deltas_dir:
+        submitted.update(os.listdir(args.deltas_dir))      # Only files that appear after the start are deltas
     try:
-        while True:
-            time.sleep(1)
+        while receiver.is_alive():
+            if args.deltas_dir:
+                for filename in sorted(os.listdir(args.deltas_dir)):
+                    if filename.endswith('.csv') and filename not in submitted:
+                        participant.submit_delta(load_event_log(os.path.join(args.deltas_dir, filename)))
+                        submitted.add(filename)
+            receiver.join(args.poll_interval)
     except KeyboardInterrupt:
         print("Stopping participant...")
+    participant.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from mpc_pretsa import MPCCoordinator, MPCParticipant
+from event_log_loader import load_event_log
+
+sys.setrecursionlimit(3000)
+
+def split_log_by_cases(event_log, number_of_participants):
+    """Splits an event log into number_of_participants logs with disjoint cases"""
+    cases = event_log["Case ID"].unique()
+    return [event_log[event_log["Case ID"].isin(part)] for part in np.array_split(cases, number_of_participants)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate an MPC run with many local participants.")
+    parser.add_argument("log_file", help="Event log that is split between the participants")
+    parser.add_argument("--participants", type=int, default=50, help="Number of simulated participants (default: 50)")
+    parser.add_argument("--k", type=int, default=4, help="k-anonymity parameter (default: 4)")
+    parser.add_argument("--t", type=float, default=1.0, help="t-closeness parameter (default: 1.0)")
+    parser.add_argument("--port", type=int, default=5001, help="Coordinator port (default: 5001)")
+    parser.add_argument("--deadline", type=float, default=60.0, help="Registration deadline in seconds (default: 60)")
+    parser.add_argument("--workers", type=int, default=None, help="Size of the pool decrypting uploads (default: CPU based)")
+    parser.add_argument("--processes", action="store_true", help="Decrypt uploads in a process pool instead of threads")
+    args = parser.parse_args()
+
+    event_log = load_event_log(args.log_file)
+    logs = split_log_by_cases(event_log, args.participants)
+
+    coordinator = MPCCoordinator(port=args.port, workers=args.workers, use_processes=args.processes)
+    coordinator.start_server()
+    coordinator.set_privacy_parameters(args.k, args.t, 0)
+
+    results = dict()
+    outputDir = tempfile.mkdtemp(prefix="mpc_simulation_")
+    def participate(participant_id, log):
+        participant = MPCParticipant(participant_id, log, coordinator_port=args.port, output_dir=outputDir)
+        results[participant_id] = participant.connect_to_coordinator()
+
+    start = time.time()
+    threads = [threading.Thread(target=participate, args=("participant_%d" % i, log)) for i, log in enumerate(logs)]
+    for thread in threads:
+        thread.start()
+    registered = coordinator.wait_for_participants(args.participants, timeout=args.deadline)
+    registrationTime = time.time() - start
+    succeeded = coordinator.execute_secure_computation()
+    for thread in threads:
+        thread.join()
+    coordinator.stop_server()
+
+    # Every participant must get back its own (and only its own) cases
+    failures = []
+    for i, log in enumerate(logs):
+        participant_id = "participant_%d" % i
+        result = results.get(participant_id)
+        if result is None:
+            failures.append(participant_id)
+        elif not set(result["Case ID"].astype(str)).issubset(set(log["Case ID"].astype(str))):
+            failures.append(participant_id)
+    print("Registered %d of %d participants in %.2fs, total %.2fs" % (registered, args.participants, registrationTime, time.time() - start))
+    print("Results written to " + outputDir)
+    if not succeeded or failures:
+        print("Simulation failed for: " + ", ".join(failures))
+        sys.exit(1)
+    print("All %d participants received their privatized log" % args.participants)
+
+if __name__ == "__main__":
+    main()
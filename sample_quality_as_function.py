@@ -3,73 +3,60 @@ import pandas as pd
 from collections import namedtuple
 import sys
 
+# set custom na values (exludes "NA" to keep lines with Case ID "NA")
+custom_na_values = ['-1.#IND', '1.#QNAN', '1.#IND', '-1.#QNAN', '#N/A', 'N/A', '#NA', 'NULL', 'NaN', '-NaN', 'nan',
+                    '-nan']
+
+# Directly-follows matrix of an original event log, can be reused for all samples of that log
+OriginalLogMatrix = namedtuple("OriginalLogMatrix", ["activities", "matrix", "traces"])
+
+
+def _read_event_log(event_log):
+    if isinstance(event_log, pd.DataFrame):
+        return event_log
+    return pd.read_csv(event_log, delimiter=";", keep_default_na=False, na_values=custom_na_values,
+                       usecols=['Case ID', 'Activity'])
+
+
+def _directly_follows_matrix(event_log, activity_codes, number_of_activities):
+    # consecutive events of the same case are one behaviour, every change of the Case ID starts a trace
+    caseIDs = event_log['Case ID'].to_numpy()
+    same_case = caseIDs[1:] == caseIDs[:-1]
+    traces = len(caseIDs) - int(np.count_nonzero(same_case))
+    behaviours = activity_codes[:-1][same_case] * number_of_activities + activity_codes[1:][same_case]
+    matrix = np.bincount(behaviours, minlength=number_of_activities * number_of_activities)
+    return matrix.reshape((number_of_activities, number_of_activities)), traces
+
+
+def get_original_log_matrix(input_eventlog):
+    """Directly-follows matrix of the original event log (path or DataFrame)"""
+    event_log = _read_event_log(input_eventlog)
+    activity_codes, activities = pd.factorize(event_log['Activity'], use_na_sentinel=False)
+    matrix, traces = _directly_follows_matrix(event_log, activity_codes.astype(np.int64), len(activities))
+    return OriginalLogMatrix(pd.Index(activities), matrix, traces)
+
+
 def get_sample_quality(input_eventlog, input_sample):
-    # print results to console as well?
-    # 0 = no || 1 = yes
-    also_print_to_console = 0
-
-    # set custom na values (exludes "NA" to keep lines with Case ID "NA")
-    custom_na_values = ['-1.#IND', '1.#QNAN', '1.#IND', '-1.#QNAN', '#N/A', 'N/A', '#NA', 'NULL', 'NaN', '-NaN', 'nan',
-                        '-nan']
-    event_log = pd.read_csv(input_eventlog, delimiter=";", keep_default_na=False, na_values=custom_na_values)
-    sample_log = pd.read_csv(input_sample, delimiter=";", keep_default_na=False, na_values=custom_na_values)
-
-    # reduce columns to Case IDs and Activities, group by case ID
-    caseIDs = pd.Series(event_log['Case ID'].unique())
-    activities = pd.Series(event_log['Activity'].unique())
-    act_list = activities.tolist()
-    col_list = ['Case ID', 'Activity']
-    small_event_log = event_log[col_list]
-    small_sample = sample_log[col_list]
-
-    ##directly follows matrices
-    ##count total occurrences of behaviours
-    elog_matrix = np.zeros((activities.size, activities.size), dtype=np.int)
-    sample_matrix = np.zeros((activities.size, activities.size), dtype=np.int)
-
-    traces_elog = 0
-    traces_sample = 0
-    last_caseID = ""
-    last_activity = ""
-
-    # parsing original event log
-    for index, row in small_event_log.iterrows():
-        current_caseID = row['Case ID']
-        current_activity = row['Activity']
-
-        if last_caseID == current_caseID:
-            index_a = act_list.index(last_activity)
-            index_b = act_list.index(current_activity)
-            elog_matrix[index_a][index_b] = elog_matrix[index_a][index_b] + 1
-            last_activity = current_activity
-
-        else:
-            traces_elog = traces_elog + 1
-            last_caseID = current_caseID
-            last_activity = current_activity
-
-    # parsing sample event log
-    last_caseID = ""
-    last_activity = ""
-
-    for index, row in small_sample.iterrows():
-        current_caseID = row['Case ID']
-        current_activity = row['Activity']
-
-        if last_caseID == current_caseID:
-            index_a = act_list.index(last_activity)
-            index_b = act_list.index(current_activity)
-            sample_matrix[index_a][index_b] = sample_matrix[index_a][index_b] + 1
-            last_activity = current_activity
-
-        else:
-            traces_sample = traces_sample + 1
-            last_caseID = current_caseID
-            last_activity = current_activity
+    """Sample quality of a sample compared to an event log
+
+    Both arguments can be CSV paths or already loaded DataFrames, input_eventlog can also be the
+    OriginalLogMatrix of get_original_log_matrix to reuse it for several samples.
+    """
+    if isinstance(input_eventlog, OriginalLogMatrix):
+        original = input_eventlog
+    else:
+        original = get_original_log_matrix(input_eventlog)
+    sample_log = _read_event_log(input_sample)
+    activities = original.activities
+    elog_matrix = original.matrix
+    traces_elog = original.traces
+
+    sample_codes = activities.get_indexer(sample_log['Activity'])
+    if (sample_codes < 0).any():
+        raise ValueError("The sample contains activities that are not in the event log")
+    sample_matrix, traces_sample = _directly_follows_matrix(sample_log, sample_codes.astype(np.int64), activities.size)
 
     expected_sample_ratio = traces_sample / traces_elog
-    num_of_behaviours_elog = np.sum(elog_matrix)
-    num_of_behaviours_sample = np.sum(sample_matrix)
 
     ##unsampled behaviours
     unique_behaviours_elog = np.count_nonzero(elog_matrix)
@@ -77,33 +64,20 @@ def get_sample_quality(input_eventlog, input_sample):
     unsampled = (unique_behaviours_elog - unique_behaviours_sample) / unique_behaviours_elog * 100
 
     # create sample ratio matrix, non-behaviours are NaN
-    sample_ratio_matrix = np.zeros((activities.size, activities.size), dtype=np.float64)
-    for x in range(0, activities.size):
-        for y in range(0, activities.size):
-            if elog_matrix[x, y] != 0:
-                sample_ratio_matrix[x, y] = sample_matrix[x, y] / elog_matrix[x, y]
-            else:
-                sample_ratio_matrix[x, y] = np.nan
+    behaviours = elog_matrix != 0
+    sample_ratio_matrix = np.full(elog_matrix.shape, np.nan, dtype=np.float64)
+    sample_ratio_matrix[behaviours] = sample_matrix[behaviours] / elog_matrix[behaviours]
 
     # calculating mu and sigma
     mean = np.nanmean(sample_ratio_matrix, dtype=np.float64)
     std_dev = np.nanstd(sample_ratio_matrix, dtype=np.float64)
 
-    # count total number of over- under- un- and truly sampled behaviours
-    count_truly_sampled = 0
-    count_under_sampled = 0
-    count_over_sampled = 0
-
-    for x in range(0, activities.size):
-        for y in range(0, activities.size):
-            if elog_matrix[x, y] != 0:
-                if sample_ratio_matrix[x, y] < expected_sample_ratio - std_dev or sample_ratio_matrix[x, y] == 0:
-                    count_under_sampled = count_under_sampled + 1
-                if sample_ratio_matrix[x, y] > expected_sample_ratio + std_dev:
-                    count_over_sampled = count_over_sampled + 1
-                if sample_ratio_matrix[x, y] >= expected_sample_ratio - std_dev and sample_ratio_matrix[
-                    x, y] <= expected_sample_ratio + std_dev and sample_ratio_matrix[x, y] != 0:
-                    count_truly_sampled = count_truly_sampled + 1
+    # count total number of over- under- and truly sampled behaviours
+    ratios = sample_ratio_matrix[behaviours]
+    count_under_sampled = np.count_nonzero((ratios < expected_sample_ratio - std_dev) | (ratios == 0))
+    count_over_sampled = np.count_nonzero(ratios > expected_sample_ratio + std_dev)
+    count_truly_sampled = np.count_nonzero((ratios >= expected_sample_ratio - std_dev) &
+                                           (ratios <= expected_sample_ratio + std_dev) & (ratios != 0))
 
     truly_sampled_percent = count_truly_sampled / unique_behaviours_elog * 100
     under_sampled_percent = count_under_sampled / unique_behaviours_elog * 100
@@ -119,6 +93,3 @@ def get_sample_quality(input_eventlog, input_sample):
     sample_quality_results["unsampled"] = unsampled
 
     return sample_quality_results
-
-
-
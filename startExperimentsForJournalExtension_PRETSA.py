@@ -1,10 +1,24 @@
-import pretsa
-import os
-import sys
+import argparse
+from pretsa import Pretsa
+from pretsa_sweep import run_monotone_sweep
+from event_log_loader import load_event_log
+from job_scheduler import add_scheduler_arguments, scheduler_from_arguments
 
-filePath = sys.argv[1]
+parser = argparse.ArgumentParser(description="Run the journal extension experiments for pretsa in one process pool")
+parser.add_argument("filePath")
+parser.add_argument("--k", type=int, nargs="+", default=[4,8,16,32,64])
+parser.add_argument("--t", type=float, nargs="+", default=[1.0])
+add_scheduler_arguments(parser, timeout=24*60*60)
+parser.add_argument("--incremental", action="store_true", help="Run the k values in ascending order, each run warm-started from the previous one")
+parser.add_argument("--verify", action="store_true", help="With --incremental also run every k from scratch and compare the results")
+args = parser.parse_args()
 
-for k in (4,8,16,32,64):
-    #for t in (1.0,2.0,3.0,4.0,5.0):
-    t = 1.0
-    os.system("timeout 1d time python runExperimentForJournalExtension_pretsa.py %s %s %s &" % (filePath,str(k),str(t)))
\ No newline at end of file
+eventLog = load_event_log(args.filePath)
+if args.incremental:
+    for t in args.t:
+        results = run_monotone_sweep(eventLog, args.k, t, filePath=args.filePath, verify=args.verify,
+                                     resultFilePath=args.filePath.replace(".csv", "_monotone_sweep_results_pretsa_t%s.csv" % t))
+        if args.verify and not results["verified"].all():
+            raise SystemExit("Incremental results differ from the runs from scratch for t=%s" % t)
+else:
+    Pretsa.sweep(eventLog, args.k, args.t, algorithms=("pretsa",), filePath=args.filePath, scheduler=scheduler_from_arguments(args))
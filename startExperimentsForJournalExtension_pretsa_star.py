@@ -1,10 +1,14 @@
-import pretsa
-import os
-import sys
+import argparse
+from pretsa import Pretsa
+from event_log_loader import load_event_log
+from job_scheduler import add_scheduler_arguments, scheduler_from_arguments
 
-filePath = sys.argv[1]
+parser = argparse.ArgumentParser(description="Run the journal extension experiments for pretsa_star in one process pool")
+parser.add_argument("filePath")
+parser.add_argument("--k", type=int, nargs="+", default=[4,8,16,32,64])
+parser.add_argument("--t", type=float, nargs="+", default=[1.0])
+add_scheduler_arguments(parser, timeout=24*60*60)
+args = parser.parse_args()
 
-for k in (4,8,16,32,64):
-    #for t in (1.0,2.0,3.0,4.0,5.0):
-    t = 1.0
-    os.system("timeout 1d time python runExperimentForJournalExtension_pretsa_star.py %s %s %s &" % (filePath,str(k),str(t)))
\ No newline at end of file
+eventLog = load_event_log(args.filePath)
+Pretsa.sweep(eventLog, args.k, args.t, algorithms=("pretsa_star",), filePath=args.filePath, scheduler=scheduler_from_arguments(args))
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from event_log_codec import EventLogFileWriter
+from event_log_variants import extract_variants
+
+SYNTHETIC_COLUMNS = ["Case ID", "Activity", "Duration"]
+LENGTH_DISTRIBUTIONS = ["poisson", "geometric", "uniform", "fixed"]
+# Activity names of the process models, the walk starts in START and a trace ends when it reaches END
+START = "start"
+END = "end"
+
+
+def zipf_weights(numberOfVariants, skew):
+    """Probability of the variant of every rank, proportional to 1 / rank^skew (skew 0 is uniform)"""
+    weights = 1.0 / np.arange(1, numberOfVariants + 1, dtype=np.float64) ** skew
+    return weights / weights.sum()
+
+
+def draw_trace_length(traceLength, lengthDistribution, random):
+    """Trace length (at least 1) with mean about traceLength"""
+    if lengthDistribution == "poisson":
+        return max(1, int(random.poisson(traceLength)))
+    if lengthDistribution == "geometric":
+        return int(random.geometric(1.0 / max(traceLength, 1)))
+    if lengthDistribution == "uniform":
+        return int(random.integers(1, 2 * traceLength, endpoint=False)) if traceLength > 1 else 1
+    if lengthDistribution == "fixed":
+        return max(1, int(traceLength))
+    raise ValueError("Unknown trace length distribution " + str(lengthDistribution))
+
+
+def generate_variants(numberOfVariants, traceLength, numberOfActivities, random, lengthDistribution="poisson"):
+    """Distinct random activity sequences, their lengths follow lengthDistribution around traceLength"""
+    variants = []
+    seen = set()
+    attempts = 0
+    while len(variants) < numberOfVariants:
+        length = draw_trace_length(traceLength, lengthDistribution, random)
+        variant = tuple(random.integers(0, numberOfActivities, size=length).tolist())
+        attempts += 1
+        if variant not in seen:
+            seen.add(variant)
+            variants.append(variant)
+        elif attempts > 100 * numberOfVariants:
+            raise ValueError("Cannot draw %d distinct variants from %d activities" % (numberOfVariants, numberOfActivities))
+    return variants
+
+
+class SyntheticLogModel:
+    """What a synthetic log is drawn from: variants with their probabilities and a duration distribution per activity
+
+    variants are tuples of activity codes into activities. Durations are either exponential with
+    durationMeans[activity] or drawn from the observed values durationSamples[activity]. The first
+    event of a case always has duration 0, like in the logs of add_annotation_duration.py.
+    """
+    def __init__(self, variants, activities, variantWeights=None, durationMeans=None, durationSamples=None):
+        if len(variants) == 0:
+            raise ValueError("A synthetic log model needs at least one variant")
+        if (durationMeans is None) == (durationSamples is None):
+            raise ValueError("Give either durationMeans or durationSamples")
+        self.variants = [tuple(variant) for variant in variants]
+        self.activities = list(activities)
+        if variantWeights is None:
+            variantWeights = np.ones(len(self.variants))
+        variantWeights = np.asarray(variantWeights, dtype=np.float64)
+        self.variantWeights = variantWeights / variantWeights.sum()
+        self.durationMeans = None if durationMeans is None else np.asarray(durationMeans, dtype=np.float64)
+        self.durationSamples = None if durationSamples is None else [np.asarray(samples, dtype=np.float64) for samples in durationSamples]
+        self._lengths = np.array([len(variant) for variant in self.variants], dtype=np.int64)
+        self._variantCodes = np.concatenate([np.asarray(variant, dtype=np.int64) for variant in self.variants])
+        self._variantStarts = np.concatenate(([0], np.cumsum(self._lengths)[:-1]))
+        self._cumulativeWeights = np.cumsum(self.variantWeights)
+        self._cumulativeWeights[-1] = 1.0
+
+    def _draw_durations(self, activityCodes, random):
+        if self.durationMeans is not None:
+            return np.round(random.standard_exponential(len(activityCodes)) * self.durationMeans[activityCodes], 0)
+        positions = random.random(len(activityCodes))
+        durations = np.zeros(len(activityCodes))
+        for activity in np.unique(activityCodes):
+            samples = self.durationSamples[activity]
+            if len(samples) == 0:
+                continue
+            ofActivity = activityCodes == activity
+            durations[ofActivity] = samples[(positions[ofActivity] * len(samples)).astype(np.int64)]
+        return durations
+
+    def generate(self, cases, seed=0, chunkCases=100000, caseIDPrefix="Case "):
+        """Yields the log in DataFrames of at most chunkCases cases
+
+        Variants and durations come from separate random streams that are consumed in order, so a
+        seed gives the same log for every chunkCases.
+        """
+        variantRandom, durationRandom = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(2)]
+        activityNames = np.array(self.activities, dtype=object)
+        for firstCase in range(0, cases, chunkCases):
+            numberOfCases = min(chunkCases, cases - firstCase)
+            variantOfCase = np.searchsorted(self._cumulativeWeights, variantRandom.random(numberOfCases), side="right")
+            variantOfCase = np.minimum(variantOfCase, len(self.variants) - 1)
+            lengths = self._lengths[variantOfCase]
+            caseStarts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            # position of every event in the concatenated variants: start of its variant plus its index in the case
+            eventIndex = np.arange(lengths.sum()) - np.repeat(caseStarts, lengths)
+            activityCodes = self._variantCodes[np.repeat(self._variantStarts[variantOfCase], lengths) + eventIndex]
+            durations = self._draw_durations(activityCodes, durationRandom)
+            durations[caseStarts] = 0.0
+            caseIDs = np.array([caseIDPrefix + str(case) for case in range(firstCase, firstCase + numberOfCases)], dtype=object)
+            yield pd.DataFrame({"Case ID": np.repeat(caseIDs, lengths),
+                                "Activity": activityNames[activityCodes],
+                                "Duration": durations}, columns=SYNTHETIC_COLUMNS)
+
+
+def random_model(variants=50, activities=20, traceLength=10, lengthDistribution="poisson", skew=0.0, seed=0):
+    """Model with distinct random variants over activities, Zipf distributed with skew, exponential durations
+    with a random mean per activity"""
+    random = np.random.default_rng(seed)
+    variantList = generate_variants(variants, traceLength, activities, random, lengthDistribution)
+    durationMeans = random.uniform(60.0, 86400.0, size=activities)
+    return SyntheticLogModel(variantList, ["Activity %d" % activity for activity in range(activities)],
+                             variantWeights=zipf_weights(len(variantList), skew), durationMeans=durationMeans)
+
+
+def process_model(transitions, variants=50, durationMeans=None, maxLength=100, skew=0.0, seed=0):
+    """Model whose variants are random walks through a process model
+
+    transitions maps every activity (and START) to a dict of successors with their probabilities,
+    END as successor ends the trace. Walks longer than maxLength are dropped. Up to variants
+    distinct walks are kept, in the order they were found, and Zipf distributed with skew.
+    durationMeans maps activities to their mean duration (default: random between a minute and a day).
+    """
+    random = np.random.default_rng(seed)
+    activities = sorted(set(activity for activity in transitions if activity != START) |
+                        set(successor for successors in transitions.values() for successor in successors if successor != END))
+    activityCodes = {activity: code for code, activity in enumerate(activities)}
+    choices = dict()
+    for activity, successors in transitions.items():
+        names = list(successors)
+        probabilities = np.array([successors[name] for name in names], dtype=np.float64)
+        choices[activity] = (names, probabilities / probabilities.sum())
+    if START not in choices:
+        raise ValueError("The process model has no transitions from '%s'" % START)
+    variantList = []
+    seen = set()
+    for _ in range(100 * variants):
+        if len(variantList) == variants:
+            break
+        walk = []
+        current = START
+        while len(walk) <= maxLength:
+            if current not in choices:
+                raise ValueError("Activity '%s' of the process model has no successors" % current)
+            names, probabilities = choices[current]
+            current = names[random.choice(len(names), p=probabilities)]
+            if current == END:
+                break
+            walk.append(activityCodes[current])
+        if current == END and walk and tuple(walk) not in seen:
+            seen.add(tuple(walk))
+            variantList.append(tuple(walk))
+    if not variantList:
+        raise ValueError("No walk through the process model ended within %d activities" % maxLength)
+    if durationMeans is None:
+        means = random.uniform(60.0, 86400.0, size=len(activities))
+    else:
+        means = np.array([durationMeans[activity] for activity in activities], dtype=np.float64)
+    return SyntheticLogModel(variantList, activities, variantWeights=zipf_weights(len(variantList), skew), durationMeans=means)
+
+
+def model_from_log(eventLog, variants=None, skew=None):
+    """Model with the variants and the per-activity durations of an existing log (Case ID, Activity, Duration)
+
+    Keeps the variants most frequent variants (default: all). The variants keep their observed
+    frequencies, unless skew is given, then they are Zipf distributed by their observed rank.
+    Durations are drawn from the observed durations of the activity, without the first events of the cases.
+    """
+    table = extract_variants(eventLog)
+    counts = np.bincount(table.variant_ids, minlength=len(table.variants))
+    ranked = np.argsort(-counts, kind="stable")
+    if variants is not None:
+        ranked = ranked[:variants]
+    activityCodes = table.activities.get_indexer(eventLog["Activity"])
+    durations = eventLog["Duration"].to_numpy(dtype=np.float64)
+    caseIDs = eventLog["Case ID"].to_numpy()
+    # the first event of a case has duration 0 by construction, it is not a sample of its activity
+    notFirst = np.concatenate(([False], caseIDs[1:] == caseIDs[:-1])) if len(caseIDs) else np.empty(0, dtype=bool)
+    durationSamples = [durations[notFirst & (activityCodes == code)] for code in range(len(table.activities))]
+    weights = counts[ranked] if skew is None else zipf_weights(len(ranked), skew)
+    return SyntheticLogModel([table.variants[variant] for variant in ranked], list(table.activities),
+                             variantWeights=weights, durationSamples=durationSamples)
+
+
+def generate_synthetic_log(cases=1000, variants=50, traceLength=10, activities=20, seed=0, skew=0.0, lengthDistribution="poisson"):
+    """Event log (Case ID, Activity, Duration) of random_model in one DataFrame"""
+    model = random_model(variants=variants, activities=activities, traceLength=traceLength,
+                         lengthDistribution=lengthDistribution, skew=skew, seed=seed)
+    chunks = list(model.generate(cases, seed=seed))
+    if not chunks:
+        return pd.DataFrame(columns=SYNTHETIC_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_synthetic_log(model, cases, filePath, seed=0, chunkCases=100000):
+    """Streams cases of the model to filePath, a CSV (; separated) or an .evlog file (event_log_codec format)
+
+    Only one chunk of cases is in memory at a time. Returns the number of events written.
+    """
+    events = 0
+    if os.path.splitext(filePath)[1] == ".evlog":
+        with EventLogFileWriter(filePath) as writer:
+            for chunk in model.generate(cases, seed=seed, chunkCases=chunkCases):
+                writer.append(chunk)
+                events += len(chunk)
+        return events
+    with open(filePath, "w", newline="") as file:
+        file.write(";".join(SYNTHETIC_COLUMNS) + "\r\n")
+        for chunk in model.generate(cases, seed=seed, chunkCases=chunkCases):
+            chunk.to_csv(file, sep=";", index=False, header=False, lineterminator="\r\n")
+            events += len(chunk)
+    return events
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic event log (Case ID, Activity, Duration) as CSV or .evlog")
+    parser.add_argument("output", help="Output file, .evlog writes the event_log_codec format, everything else a ; separated CSV")
+    parser.add_argument("--cases", type=int, default=10000)
+    parser.add_argument("--variants", type=int, default=None, help="Number of variants (default: 50, from a log all of its variants)")
+    parser.add_argument("--activities", type=int, default=20, help="Size of the activity alphabet of random variants")
+    parser.add_argument("--trace_length", type=float, default=10, help="Mean trace length of random variants")
+    parser.add_argument("--length_distribution", choices=LENGTH_DISTRIBUTIONS, default="poisson")
+    parser.add_argument("--skew", type=float, default=None,
+                        help="Zipf exponent of the variant frequencies (default: uniform, from a log the observed frequencies)")
+    parser.add_argument("--from_log", default=None, help="Take variants and durations from this event log (CSV with durations)")
+    parser.add_argument("--process", default=None, help="JSON file with the transition probabilities of a process model")
+    parser.add_argument("--max_length", type=int, default=100, help="Longest walk through the process model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk_cases", type=int, default=100000, help="Cases generated and written at a time")
+    args = parser.parse_args()
+
+    if args.from_log is not None:
+        from event_log_loader import load_event_log
+        model = model_from_log(load_event_log(args.from_log), variants=args.variants, skew=args.skew)
+    elif args.process is not None:
+        with open(args.process) as processFile:
+            transitions = json.load(processFile)
+        model = process_model(transitions, variants=args.variants or 50, maxLength=args.max_length,
+                              skew=args.skew or 0.0, seed=args.seed)
+    else:
+        model = random_model(variants=args.variants or 50, activities=args.activities, traceLength=args.trace_length,
+                             lengthDistribution=args.length_distribution, skew=args.skew or 0.0, seed=args.seed)
+    events = write_synthetic_log(model, args.cases, args.output, seed=args.seed, chunkCases=args.chunk_cases)
+    print("%d cases, %d events, %d variants written to %s" % (args.cases, events, len(model.variants), args.output))
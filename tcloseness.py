@@ -0,0 +1,96 @@
+import numpy as np
+
+
+class ActivityDistribution:
+    """The annotations of one activity over the whole log, prepared for Wasserstein distances to many equivalence classes
+
+    The distribution is sorted once into the grid of its distinct values with the CDF on every grid
+    interval and the prefix integral of the CDF. The 1-D Wasserstein distance to an equivalence class
+    is the integral of |F_activity - F_class|. F_class is constant between two values of the class,
+    and on such a piece the integral only needs the point where the monotone F_activity crosses that
+    constant, found with searchsorted. A class of m values therefore costs O(m log n) instead of
+    sorting all n + m values as scipy.stats.wasserstein_distance does.
+    """
+    def __init__(self, values):
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        if len(values) == 0:
+            raise ValueError("An activity distribution needs at least one value")
+        self.size = len(values)
+        self.grid, counts = np.unique(values, return_counts=True)
+        # cdf[i] is the CDF on [grid[i], grid[i+1]), the last value is 1
+        self.cdf = np.cumsum(counts) / self.size
+        # area[i] is the integral of the CDF from grid[0] to grid[i]
+        self.area = np.concatenate(([0.0], np.cumsum(self.cdf[:-1] * np.diff(self.grid))))
+        self.maxDifference = abs(self.grid[-1] - self.grid[0])
+
+    def _integral(self, x):
+        # integral of the CDF from grid[0] to x, 0 left of grid[0]
+        index = np.searchsorted(self.grid, x, side="right") - 1
+        inside = index >= 0
+        index = np.maximum(index, 0)
+        return np.where(inside, self.area[index] + self.cdf[index] * (x - self.grid[index]), 0.0)
+
+    def _crossing(self, constants):
+        # smallest x with CDF(x) >= constant, -inf for constants <= 0
+        index = np.searchsorted(self.cdf, constants, side="left")
+        return np.where(constants <= 0.0, -np.inf, self.grid[np.minimum(index, len(self.grid) - 1)])
+
+    def wasserstein_distances(self, values, classes):
+        """Wasserstein distance to every equivalence class
+
+        values holds the annotations of all classes and classes the class number (0..number of classes - 1)
+        of each value. Returns one distance per class, NaN for class numbers without values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        classes = np.asarray(classes, dtype=np.int64)
+        numberOfClasses = int(classes.max()) + 1 if len(classes) else 0
+        distances = np.full(numberOfClasses, np.nan)
+        if len(values) == 0:
+            return distances
+        order = np.lexsort((values, classes))
+        values = values[order]
+        classes = classes[order]
+        classSizes = np.bincount(classes, minlength=numberOfClasses)
+        classStarts = np.concatenate(([0], np.cumsum(classSizes)[:-1]))
+
+        # The CDF of a class jumps at its distinct values: the last occurrence of every value in the class
+        lastOfValue = np.concatenate(((values[1:] != values[:-1]) | (classes[1:] != classes[:-1]), [True]))
+        stepClasses = classes[lastOfValue]
+        stepValues = values[lastOfValue]
+        stepCDF = (np.flatnonzero(lastOfValue) - classStarts[stepClasses] + 1) / classSizes[stepClasses]
+
+        # Pieces of constant class CDF: from every step to the next step of the class, before the first step of
+        # a class the CDF is 0 and after its last step 1, both outer pieces reach to the ends of the common range
+        low = min(self.grid[0], values.min())
+        high = max(self.grid[-1], values.max())
+        lastStepOfClass = np.concatenate((stepClasses[1:] != stepClasses[:-1], [True]))
+        firstStepOfClass = np.concatenate(([True], stepClasses[1:] != stepClasses[:-1]))
+        pieceStart = np.concatenate((np.full(np.count_nonzero(firstStepOfClass), low), stepValues))
+        pieceEnd = np.concatenate((stepValues[firstStepOfClass], np.where(lastStepOfClass, high, np.roll(stepValues, -1))))
+        pieceCDF = np.concatenate((np.zeros(np.count_nonzero(firstStepOfClass)), stepCDF))
+        pieceClass = np.concatenate((stepClasses[firstStepOfClass], stepClasses))
+
+        # integral of |CDF - c| from a to b, split where the CDF crosses c
+        crossing = np.clip(self._crossing(pieceCDF), pieceStart, pieceEnd)
+        integralStart = self._integral(pieceStart)
+        integralCrossing = self._integral(crossing)
+        integralEnd = self._integral(pieceEnd)
+        below = pieceCDF * (crossing - pieceStart) - (integralCrossing - integralStart)
+        above = (integralEnd - integralCrossing) - pieceCDF * (pieceEnd - crossing)
+        pieceDistances = np.maximum(below, 0.0) + np.maximum(above, 0.0)
+        distances[classSizes > 0] = np.bincount(pieceClass, weights=pieceDistances, minlength=numberOfClasses)[classSizes > 0]
+        return distances
+
+    def wasserstein_distance(self, values):
+        """Wasserstein distance to a single equivalence class"""
+        return self.wasserstein_distances(values, np.zeros(len(values), dtype=np.int64))[0]
+
+
+def violates_t_closeness(distribution, values, t):
+    """True if the equivalence class values violates t-closeness for the activity distribution
+
+    Activities whose values are all the same (most likely 0.0) never violate t-closeness.
+    """
+    if distribution.maxDifference == 0.0:
+        return False
+    return (distribution.wasserstein_distance(values) / distribution.maxDifference) >= t
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+import unittest
+from evaluation_context import EvaluationContext
+
+LOG_FILE = "yearly_logs/Sepsis/Sepsis_dataset_2015.csv"
+
+
+class EvaluationContextTest(unittest.TestCase):
+    """Cache file of the evaluation context on a copy of a yearly log"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join(self.directory.name, os.path.basename(LOG_FILE))
+        shutil.copy(LOG_FILE, self.filePath)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _save(self, distances=()):
+        """Runs an evaluator that computes the given distances, returns whether the cache file was rewritten"""
+        context = EvaluationContext(self.filePath)
+        distanceCache = context.distance_cache
+        for variant1, variant2 in distances:
+            distanceCache.get_distance(variant1, variant2)
+        if os.path.exists(context.cacheFilePath):
+            os.utime(context.cacheFilePath, ns=(0, 0))      # A rewritten file gets a new modification time
+        context.save()
+        rewritten = os.stat(context.cacheFilePath).st_mtime_ns != 0
+        self.assertEqual(sorted(os.listdir(self.directory.name)), sorted([os.path.basename(self.filePath), os.path.basename(context.cacheFilePath)]))
+        return rewritten, len(distanceCache)
+
+    def test_saves_only_new_distances(self):
+        self.assertEqual(self._save([("@A@B", "@A@C")]), (True, 1))
+        self.assertEqual(self._save([("@A@B", "@A@C")]), (False, 1))
+        self.assertEqual(self._save(), (False, 1))
+        self.assertEqual(self._save([("@A", "@A@C")]), (True, 2))
+        self.assertEqual(len(EvaluationContext(self.filePath).distance_cache), 2)
+
+    def test_truncated_cache_file_is_computed_again(self):
+        context = EvaluationContext(self.filePath)
+        with open(context.cacheFilePath, "wb") as cacheFile:
+            cacheFile.write(b"\x80\x05")
+        self.assertEqual(self._save([("@A@B", "@A@C")]), (True, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import event_log_loader
+from event_log_loader import get_file_hash, get_sidecar_path, load_event_log
+
+LOG_FILE = "yearly_logs/Sepsis/Sepsis_dataset_2015.csv"
+
+
+class EventLogLoaderTest(unittest.TestCase):
+    """Sidecar cache of load_event_log on a copy of a yearly log"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join(self.directory.name, os.path.basename(LOG_FILE))
+        shutil.copy(LOG_FILE, self.filePath)
+        self.expected = load_event_log(self.filePath, useCache=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _sidecars(self):
+        return sorted(glob.glob(os.path.join(self.directory.name, "*.evlog")))
+
+    def test_loads_without_writable_directory(self):
+        with mock.patch.object(event_log_loader.os, "replace", side_effect=PermissionError("read-only")):
+            eventLog = load_event_log(self.filePath)
+        self.assertTrue(eventLog.equals(self.expected))
+        self.assertEqual(self._sidecars(), [])
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(self.filePath)])
+
+    def test_removes_stale_sidecars_only(self):
+        base = os.path.splitext(self.filePath)[0]
+        legacySidecar = base + ".0123456789abcdef.evlog"                 # <log>.<file hash>.evlog of older versions
+        staleSidecar = base + "." + event_log_loader.get_columns_key() + ".fedcba9876543210.evlog"
+        otherColumns = get_sidecar_path(self.filePath, get_file_hash(self.filePath), ["Case ID", "Activity"])
+        unrelated = base + ".notes.evlog"
+        for path in (legacySidecar, staleSidecar, otherColumns, unrelated):
+            open(path, "wb").close()
+
+        eventLog = load_event_log(self.filePath)
+        self.assertTrue(eventLog.equals(self.expected))
+        sidecarPath = get_sidecar_path(self.filePath, get_file_hash(self.filePath))
+        self.assertEqual(self._sidecars(), sorted([sidecarPath, otherColumns, unrelated]))
+
+        open(legacySidecar, "wb").close()         # Also removed when the current sidecar already exists
+        self.assertTrue(load_event_log(self.filePath).equals(self.expected))
+        self.assertFalse(os.path.exists(legacySidecar))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import pandas as pd
+from event_log_loader import load_event_log
+from mpc_pretsa import MPCCoordinator, MPCParticipant
+from run_mpc_simulation import split_log_by_cases
+
+LOG_FILE = "yearly_logs/bpic2013/bpic2013_dataset_2012.csv"
+PARTICIPANTS = 50
+ROUNDS = ((4, 1.0), (8, 1.0))
+TIMEOUT = 120.0     # Seconds for registration and each round
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("localhost", 0))
+        return probe.getsockname()[1]
+
+
+def _run_with_timeout(function, timeout):
+    """Runs function in a thread, returns (finished within timeout, return value)"""
+    result = dict()
+    thread = threading.Thread(target=lambda: result.update(value=function()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive(), result.get("value")
+
+
+class MPCSimulationTest(unittest.TestCase):
+    """Coordinator and 50 participants on one machine, each holding a disjoint part of a yearly log"""
+
+    def setUp(self):
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 3000))
+        self.eventLog = load_event_log(LOG_FILE)
+        self.logs = split_log_by_cases(self.eventLog, PARTICIPANTS)
+        self.port = _free_port()
+        self.coordinator = MPCCoordinator(port=self.port, host="localhost")
+        self.coordinator.start_server()
+        self.outputDir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.coordinator.stop_server()
+        self.outputDir.cleanup()
+
+    def test_participants_receive_only_their_own_cases(self):
+        results = {i: [] for i in range(PARTICIPANTS)}
+        def participate(i):
+            participant = MPCParticipant("participant_%d" % i, self.logs[i], coordinator_port=self.port, output_dir=self.outputDir.name)
+            results[i].append(participant.connect_to_coordinator())
+            for _ in ROUNDS[1:]:
+                results[i].append(participant.receive_result(timeout=TIMEOUT))
+            participant.close()
+        threads = [threading.Thread(target=participate, args=(i,), daemon=True) for i in range(PARTICIPANTS)]
+        for thread in threads:
+            thread.start()
+
+        self.assertEqual(self.coordinator.wait_for_participants(PARTICIPANTS, timeout=TIMEOUT), PARTICIPANTS)
+        for k, t in ROUNDS:
+            finished, succeeded = _run_with_timeout(lambda: self.coordinator.execute_secure_computation(k, t), TIMEOUT)
+            self.assertTrue(finished, "Round k=%s t=%s did not finish within %ss" % (k, t, TIMEOUT))
+            self.assertTrue(succeeded, "Round k=%s t=%s failed" % (k, t))
+        for thread in threads:
+            thread.join(TIMEOUT)
+            self.assertFalse(thread.is_alive(), "A participant did not receive all results within %ss" % TIMEOUT)
+
+        receivedCases = 0
+        for i, log in enumerate(self.logs):
+            self.assertEqual(len(results[i]), len(ROUNDS))
+            ownCases = set(log["Case ID"].astype(str))
+            for (k, t), result in zip(ROUNDS, results[i]):
+                self.assertIsNotNone(result, "participant_%d got no result for k=%s t=%s" % (i, k, t))
+                self.assertTrue(set(result["Case ID"].astype(str)) <= ownCases,
+                                "participant_%d received cases of other participants for k=%s t=%s" % (i, k, t))
+                receivedCases += result["Case ID"].nunique()
+        self.assertGreater(receivedCases, 0)
+
+    def test_no_round_without_two_connected_participants(self):
+        participants = [MPCParticipant("participant_%d" % i, log, coordinator_port=self.port, output_dir=self.outputDir.name)
+                        for i, log in enumerate(self.logs[:2])]
+        for participant in participants:
+            self.assertTrue(participant.connect_to_coordinator(wait_for_result=False))
+        self.assertEqual(self.coordinator.wait_for_participants(2, timeout=TIMEOUT), 2)
+        participants[1].close()
+        deadline = time.time() + TIMEOUT
+        while self.coordinator.participants["participant_1"].get("connected", True) and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(self.coordinator.execute_secure_computation(4, 1.0))
+        self.assertEqual(self.coordinator.round, 0)
+        participants[0].close()
+
+    def test_delta_with_known_cases_is_rejected(self):
+        logs = split_log_by_cases(self.eventLog, 3)
+        uploads, deltas = [], []
+        for log in logs:
+            cases = log["Case ID"].unique()
+            uploads.append(log[log["Case ID"].isin(cases[:len(cases) // 2])])
+            deltas.append(log[~log["Case ID"].isin(cases[:len(cases) // 2])])
+        deltas[0] = uploads[1][uploads[1]["Case ID"] == uploads[1]["Case ID"].iloc[0]]     # A case participant_1 already uploaded
+        participants = [MPCParticipant("participant_%d" % i, upload, coordinator_port=self.port, output_dir=self.outputDir.name)
+                        for i, upload in enumerate(uploads)]
+        for participant in participants:
+            self.assertTrue(participant.connect_to_coordinator(wait_for_result=False))
+        self.assertEqual(self.coordinator.wait_for_participants(len(participants), timeout=TIMEOUT), len(participants))
+
+        def computation(k, t):
+            finished, results = _run_with_timeout(lambda: [participant.receive_result(timeout=TIMEOUT) for participant in participants], TIMEOUT)
+            self.assertTrue(finished, "Results of k=%s t=%s were not received within %ss" % (k, t, TIMEOUT))
+            return results
+        round = threading.Thread(target=self.coordinator.execute_secure_computation, args=(4, 1.0), daemon=True)
+        round.start()
+        self.assertTrue(all(result is not None for result in computation(4, 1.0)))
+        round.join(TIMEOUT)
+
+        for participant, delta in zip(participants, deltas):
+            participant.submit_delta(delta)
+        self.assertIsNone(participants[0].receive_result(timeout=TIMEOUT), "participant_0 got no error for its delta")
+        deadline = time.time() + TIMEOUT
+        while len(self.coordinator.logs) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        round = threading.Thread(target=self.coordinator.execute_secure_computation, args=(8, 1.0), daemon=True)
+        round.start()
+        results = computation(8, 1.0)
+        round.join(TIMEOUT)
+        for i, (log, result) in enumerate(zip(logs, results)):
+            self.assertIsNotNone(result, "participant_%d got no result after the rejected delta" % i)
+            self.assertTrue(set(result["Case ID"].astype(str)) <= set(log["Case ID"].astype(str)))
+        expectedCases = pd.concat(uploads + deltas[1:])["Case ID"].astype(str)
+        self.assertEqual(set(str(case) for case in self.coordinator.model._caseIDs), set(expectedCases))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import contextlib
+import io
+import sys
+import unittest
+from event_log_loader import load_event_log
+from pretsa import Pretsa
+from pretsa_sweep import ALGORITHMS, run_monotone_sweep
+
+LOG_FILE = "yearly_logs/Sepsis/Sepsis_dataset_2015.csv"
+KS = (2, 4, 8, 16, 32)
+T = 1.0
+
+
+class MonotoneSweepTest(unittest.TestCase):
+    """Warm-started runs of the monotone sweep against runs from scratch on a yearly log"""
+
+    def setUp(self):
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 3000))
+        self.eventLog = load_event_log(LOG_FILE)
+
+    def test_warm_start_equals_cold_start(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_monotone_sweep(self.eventLog, KS, T, verify=True)
+        self.assertEqual(list(results["k"]), list(KS))
+        self.assertTrue(results["verified"].all(), results[["k", "verified"]].to_string())
+        self.assertGreater(results["replayedSteps"].sum(), 0)
+
+        runArguments = ALGORITHMS["pretsa"][2]
+        for row in results.itertuples():
+            # A model of its own, nothing is shared with the sweep
+            with contextlib.redirect_stdout(io.StringIO()):
+                cutOutCases, distanceLog = Pretsa(self.eventLog).runPretsa(row.k, T, **runArguments)
+            self.assertEqual(row.cases, len(cutOutCases), "Modified cases differ for k=%s" % row.k)
+            self.assertEqual(row.inflictedChanges, distanceLog, "Inflicted changes differ for k=%s" % row.k)
+
+
+if __name__ == "__main__":
+    unittest.main()